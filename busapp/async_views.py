@@ -0,0 +1,168 @@
+"""
+ASYNC LIVE TRACKING API for ASGI deployments (busproject/asgi.py).
+
+    /api/async/driver/update-location/            -> update_bus_location_async
+    /api/async/student/bus-location/<route_id>/   -> get_bus_location_async
+    /api/async/student/routes/                    -> api_get_routes_async
+    /api/async/fleet/                             -> api_fleet_async
+
+Same requests and responses as the synchronous views in busapp/views.py,
+whose helpers they share; only where the waiting happens differs.
+
+Design:
+- Reads never touch the database on the event loop. Positions come from
+  tracking.fleet.fleet_index and routes from the topology snapshot; their
+  periodic rebuilds run in a worker thread (aquery / aget_topology), so an
+  idle poll holds a coroutine, not a thread.
+- The driver lookup on ingest uses the async ORM. Fixes are written by
+  the tracking.ingest_queue writer threads, as for the sync view; the
+  coroutine awaits the result without holding a thread. The stale sweep
+  runs in a bounded pool of DB_WORKERS threads.
+- Under WSGI these views still work, but each request pays for an event
+  loop; point WSGI clients at the synchronous URLs.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST
+
+from .views import (
+    _coalesced,
+    _fleet_filters,
+    _fleet_response,
+    _live_bus,
+    _location_response,
+    _poll_throttled,
+    _queued,
+    _read_fixes,
+    _routes_response,
+    _shed,
+)
+
+
+DB_WORKERS = getattr(settings, 'TRACKING_ASYNC_DB_WORKERS', 8)
+
+_db_pool = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix='async-db')
+
+
+def _with_connection(func, *args):
+    # Pool threads live outside the request cycle: honour CONN_MAX_AGE here
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+async def _in_db_pool(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(
+        _db_pool, _with_connection, func, *args
+    )
+
+
+async def _maybe_sweep():
+    from tracking.sweeper import maybe_sweep, sweep_due
+
+    if sweep_due():
+        await _in_db_pool(maybe_sweep)
+
+
+# ==========================================================
+# 🔴 LIVE TRACKING API — DRIVER SENDS LOCATION
+# ==========================================================
+@require_POST
+async def update_bus_location_async(request):
+    from users.models import Driver
+    from tracking.ingest_queue import WAIT_SECONDS, ingest_queue
+    from tracking.ratelimit import ingest_limiter
+
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({"error": "Unauthorized"}, status=401)
+
+    driver = await Driver.objects.filter(user=user).values_list("id", "assigned_route_id").afirst()
+    if driver is None:
+        return JsonResponse({"error": "Not a driver"}, status=403)
+
+    driver_id, route_id = driver
+    if not route_id:
+        return JsonResponse({"error": "No route assigned"}, status=403)
+
+    fixes = _read_fixes(request)
+    if fixes is None:
+        return JsonResponse({"error": "Invalid data"}, status=400)
+
+    wait = ingest_limiter.admit(driver_id, route_id, fixes[-1])
+    if wait:
+        return _coalesced(wait)
+
+    future = ingest_queue.submit(driver_id, route_id, fixes)
+    if future is None:
+        return _shed(driver_id, route_id, fixes)
+    try:
+        # shield: timing out must not cancel the write itself
+        status, payload = await asyncio.wait_for(
+            asyncio.shield(asyncio.wrap_future(future)), WAIT_SECONDS
+        )
+    except asyncio.TimeoutError:
+        return _queued(route_id)
+    return JsonResponse(payload, status=status)
+
+
+# ==========================================================
+# 🟢 LIVE TRACKING API — STUDENT GETS LOCATION BY ROUTE
+# ==========================================================
+async def get_bus_location_async(request, route_id):
+    from transport.topology import aget_topology
+    from tracking.fleet import fleet_index
+    from tracking.polling import poll_governor
+
+    user = await request.auser()
+    if user.is_authenticated:
+        client_key = f"user:{user.pk}"
+    else:
+        client_key = f"addr:{request.META.get('REMOTE_ADDR', '')}"
+
+    admitted, backoff = poll_governor.admit(route_id, client_key)
+    if not admitted:
+        return _poll_throttled(backoff)
+
+    await _maybe_sweep()
+
+    await fleet_index.aquery(route_ids={route_id})
+    bus = _live_bus(route_id)
+    if bus is None:
+        await aget_topology()   # the timetable fallback reads the snapshot
+    return _location_response(route_id, bus)
+
+
+# =========================================================
+# API: GET ALL ROUTES
+# =========================================================
+async def api_get_routes_async(request):
+    """API endpoint to get all active routes"""
+    from transport.topology import aget_topology
+    from tracking.fleet import fleet_index
+
+    await _maybe_sweep()
+
+    running = {entry[0] for entry in await fleet_index.aquery()}
+    return _routes_response(await aget_topology(), running)
+
+
+# ==========================================================
+# 🟢 LIVE TRACKING API — ALL BUSES IN A MAP VIEWPORT
+# ==========================================================
+async def api_fleet_async(request):
+    """Active buses inside a viewport; same parameters as views.api_fleet."""
+    from tracking.fleet import fleet_index
+
+    try:
+        bbox, route_ids = _fleet_filters(request)
+    except ValueError:
+        return JsonResponse({"error": "Invalid bbox or routes"}, status=400)
+
+    return _fleet_response(await fleet_index.aquery(bbox, route_ids))
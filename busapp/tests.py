@@ -1,3 +1,151 @@
-from django.test import TestCase
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase, TransactionTestCase
+
+from payments.models import FeeRecord
+from tracking.fleet import fleet_index
+from tracking.models import BusTracker
+from transport.models import Route, Stop
+from transport.topology import invalidate_topology
+from users.models import Driver, Student
+from .views import api_my_bus
+
+
+class MyBusQueryBudgetTests(TestCase):
+    """The student home endpoint must stay within two queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.route = Route.objects.create(
+            name='Route 1', bus_number='BUS001', start_location='A', end_location='B'
+        )
+        stops = [
+            Stop.objects.create(
+                route=cls.route, name=f'Stop {i}', order=i,
+                latitude=17.40 + i * 0.01, longitude=78.40, arrival_time=time(8, i * 5),
+            )
+            for i in range(4)
+        ]
+        cls.user = User.objects.create_user('student1')
+        student = Student.objects.create(
+            user=cls.user, hall_ticket='HT001', active_route=cls.route, boarding_stop=stops[2]
+        )
+        for i in range(3):
+            FeeRecord.objects.create(
+                student=student, amount=Decimal('1000.00'),
+                due_date=date.today() + timedelta(days=i * 30 - 1),
+            )
+        driver = Driver.objects.create(
+            user=User.objects.create_user('driver1'), license_number='LIC001', assigned_route=cls.route
+        )
+        cls.driver = driver
+
+    def get(self):
+        request = RequestFactory().get('/api/student/my-bus/')
+        request.user = self.user
+        return api_my_bus(request)
+
+    def setUp(self):
+        invalidate_topology()
+        self.get()   # warm the topology and timetable caches
+
+    def test_without_live_bus(self):
+        with self.assertNumQueries(2):
+            response = self.get()
+        data = json.loads(response.content)
+        self.assertEqual(data['route']['id'], self.route.id)
+        self.assertEqual(len(data['route']['stops']), 4)
+        self.assertEqual(data['boarding_stop']['name'], 'Stop 2')
+        self.assertIsNone(data['bus'])
+        self.assertEqual(data['fees'], {
+            'outstanding': '3000.00', 'pending': 3, 'overdue': 1,
+            'next_due': str(date.today() - timedelta(days=1)),
+        })
+
+    def test_with_live_bus(self):
+        BusTracker.objects.create(
+            route=self.route, driver=self.driver, latitude=17.405, longitude=78.40, speed=30,
+            is_active=True,
+        )
+        with self.assertNumQueries(2):
+            response = self.get()
+        data = json.loads(response.content)
+        self.assertEqual(data['bus']['latitude'], 17.405)
+        self.assertEqual(data['eta']['source'], 'timetable')
+        self.assertEqual(data['eta']['seconds'], 450)   # half of 5 min + 5 min
+
+
+class IngestParsingTests(TestCase):
+    """Malformed driver posts are refused before they reach the ingest queue."""
+
+    def setUp(self):
+        route = Route.objects.create(
+            name='Route 1', bus_number='BUS001', start_location='A', end_location='B'
+        )
+        user = User.objects.create_user('driver1')
+        Driver.objects.create(user=user, license_number='LIC001', assigned_route=route)
+        self.client.force_login(user)
+
+    def post(self, **fields):
+        return self.client.post('/api/driver/update-location/', dict(latitude=17.4, longitude=78.4, **fields))
+
+    def test_implausible_device_time(self):
+        tomorrow = (datetime.now().timestamp() + 86400) * 1000
+        for timestamp in ('1e20', 'nan', 'inf', '-5', str(tomorrow)):
+            self.assertEqual(self.post(timestamp=timestamp).status_code, 400, timestamp)
+
+    def test_packed_time_out_of_range(self):
+        from tracking.wire import PACKED_CONTENT_TYPE, pack_fixes
+
+        body = pack_fixes([{"latitude": 17.4, "longitude": 78.4, "timestamp": 10 ** 17}])
+        response = self.client.post('/api/driver/update-location/', body, content_type=PACKED_CONTENT_TYPE)
+        self.assertEqual(response.status_code, 400)
+
+
+class FleetApiTests(TestCase):
+    """Viewport filters outside the globe are a 400, not an error in the index."""
+
+    def test_bbox_validation(self):
+        for bbox in ('nan,0,1,1', '0,0,1e400,1', '0,0,inf,1', '-91,0,1,1', '0,0,1,181', '1,0,0,1', '0,0,1'):
+            for url in ('/api/fleet/', '/api/async/fleet/'):
+                self.assertEqual(self.client.get(url, {'bbox': bbox}).status_code, 400, (url, bbox))
+        response = self.client.get('/api/fleet/', {'bbox': '-90,-180,90,180'})
+        self.assertEqual(response.status_code, 200)
+
+
+class AsyncLiveApiTests(TransactionTestCase):
+    """The async endpoints answer like their synchronous counterparts."""
+
+    def setUp(self):
+        invalidate_topology()
+        self.route = Route.objects.create(
+            name='Route 1', bus_number='BUS001', start_location='A', end_location='B'
+        )
+        self.user = User.objects.create_user('driver1')
+        Driver.objects.create(user=self.user, license_number='LIC001', assigned_route=self.route)
+        fleet_index.refresh()
+
+    async def test_ingest_then_read(self):
+        response = await self.async_client.get(f'/api/async/student/bus-location/{self.route.id}/')
+        self.assertEqual(json.loads(response.content)['error'], 'Bus not started yet')
+
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post(
+            '/api/async/driver/update-location/',
+            {'latitude': 17.4, 'longitude': 78.4, 'speed': 20},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(await BusTracker.objects.filter(route=self.route, is_active=True).aexists())
+
+        response = await self.async_client.get(f'/api/async/student/bus-location/{self.route.id}/')
+        data = json.loads(response.content)
+        self.assertEqual((data['latitude'], data['longitude'], data['speed']), (17.4, 78.4, 20.0))
+
+        response = await self.async_client.get('/api/async/fleet/', {'routes': str(self.route.id)})
+        self.assertEqual(json.loads(response.content)['buses'][0][:3], [self.route.id, 17.4, 78.4])
+
+        response = await self.async_client.get('/api/async/student/routes/')
+        self.assertEqual(json.loads(response.content)[0]['bus_running'], True)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     # -------------------------
@@ -32,6 +32,7 @@ urlpatterns = [
     path('admin-panel/manage-drivers/', views.manage_drivers, name='manage-drivers'),
     path('admin-panel/manage-routes/', views.manage_routes, name='manage-routes'),
     path('admin-panel/manage-fees/', views.manage_fees, name='manage-fees'),
+    path('admin-panel/fleet/', views.fleet_overview, name='fleet-overview'),
 
     # ==================================================
     # 🔴 DRIVER → SEND LIVE LOCATION
@@ -42,6 +43,12 @@ urlpatterns = [
         name='update_bus_location'
     ),
 
+    path(
+        'api/admin/ingest-metrics/',
+        views.ingest_metrics,
+        name='ingest_metrics'
+    ),
+
     # ==================================================
     # 🟢 STUDENT → GET BUS LOCATION BY ROUTE
     # ==================================================
@@ -50,11 +57,44 @@ urlpatterns = [
         views.get_bus_location,
         name='get_bus_location'
     ),
+    path('api/student/my-bus/', views.api_my_bus, name='api_my_bus'),
+    path('api/student/stop-alerts/', views.api_stop_alerts, name='api_stop_alerts'),
+    path(
+        'api/student/stop-alerts/<int:alert_id>/delete/',
+        views.api_stop_alert_delete,
+        name='api_stop_alert_delete'
+    ),
 
     # ==================================================
     # 📡 API ROUTES
     # ==================================================
     path('api/student/routes/', views.api_get_routes, name='api_get_routes'),
+    path('api/fleet/', views.api_fleet, name='api_fleet'),
+    path(
+        'gtfs-rt/vehicle-positions.pb',
+        views.gtfs_rt_vehicle_positions,
+        name='gtfs_rt_vehicle_positions'
+    ),
+    path('api/routes/summary/', views.api_routes_summary, name='api_routes_summary'),
+    path('api/admin/adherence/', views.api_adherence_report, name='api_adherence_report'),
+    path('api/admin/segment-stats/<int:route_id>/', views.api_segment_stats, name='api_segment_stats'),
+    path('api/admin/heatmap/', views.api_heatmap, name='api_heatmap'),
+
+    # ==================================================
+    # ⚡ ASYNC LIVE TRACKING (serve under busproject/asgi.py)
+    # ==================================================
+    path(
+        'api/async/driver/update-location/',
+        async_views.update_bus_location_async,
+        name='update_bus_location_async'
+    ),
+    path(
+        'api/async/student/bus-location/<int:route_id>/',
+        async_views.get_bus_location_async,
+        name='get_bus_location_async'
+    ),
+    path('api/async/student/routes/', async_views.api_get_routes_async, name='api_get_routes_async'),
+    path('api/async/fleet/', async_views.api_fleet_async, name='api_fleet_async'),
 ]
 
 
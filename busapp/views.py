@@ -2,17 +2,20 @@ from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
 from django.views.decorators.csrf import csrf_protect
+from django.db import DatabaseError
 from django.http import JsonResponse
+from django.utils.cache import patch_cache_control
 from django.views.decorators.http import require_POST
 from django.contrib.auth.models import User
 from functools import wraps
+import json
+import math
 
 from .models import (
     Profile,
     Student,
     Driver,
-    Route,
-    BusLocation
+    Route
 )
 
 
@@ -122,7 +125,18 @@ def driver_dashboard(request):
 # -------------------------
 @role_required('admin')
 def admin_dashboard(request):
-    return render(request, "admin/home.html")
+    from transport.timetable import get_timetable
+    from transport.topology import get_topology
+
+    routes = get_topology().routes
+    timetable = get_timetable()
+    return render(request, "admin/home.html", {
+        "running_now": [routes[route_id] for route_id in timetable.active_routes()],
+        "starting_soon": [
+            (departure, routes[route_id])
+            for departure, route_id in timetable.departures_within(60)
+        ],
+    })
 
 
 # -------------------------
@@ -178,7 +192,10 @@ def manage_fees(request):
 # -------------------------
 @role_required('student')
 def routes_page(request):
-    return render(request, "routes.html")
+    from transport.topology import get_topology
+
+    routes = [route.as_dict() for route in get_topology().active if route.stop_count]
+    return render(request, "routes.html", {"routes": routes})
 
 
 @role_required('student')
@@ -188,7 +205,15 @@ def drivers_page(request):
 
 @role_required('student')
 def stops_page(request):
-    return render(request, "stops.html")
+    from transport.bundles import route_bundle_url
+    from transport.topology import get_topology
+
+    # Geometry comes from the cached static bundle; embed it only as a fallback
+    bundle_url = route_bundle_url()
+    routes = []
+    if bundle_url is None:
+        routes = [route.as_dict() for route in get_topology().active if route.stop_count]
+    return render(request, "stops.html", {"routes": routes, "route_bundle_url": bundle_url})
 
 
 @role_required('student')
@@ -198,22 +223,19 @@ def fees_page(request):
 
 @role_required('student')
 def live_tracker_page(request):
-    from transport.models import Route
+    from transport.topology import get_topology
     from users.models import Student
     
-    routes = Route.objects.filter(is_active=True).order_by('name')
+    topology = get_topology()
     
     # Get current student's route if logged in
     student_route = None
     if request.user.is_authenticated:
-        try:
-            student = Student.objects.select_related('active_route').get(user=request.user)
-            student_route = student.active_route
-        except:
-            pass
+        route_id = Student.objects.filter(user=request.user).values_list('active_route_id', flat=True).first()
+        student_route = topology.routes.get(route_id)
     
     context = {
-        'routes': routes,
+        'routes': topology.active,
         'student_route': student_route
     }
     return render(request, "live-tracker.html", context)
@@ -230,58 +252,591 @@ def live_tracker_debug(request):
 # =========================================================
 # API: GET ALL ROUTES
 # =========================================================
+def _routes_response(topology, running):
+    routes = [
+        {
+            'id': route.id,
+            'name': route.name,
+            'bus_number': route.bus_number,
+            'is_active': route.is_active,
+            'bus_running': route.id in running,
+        }
+        for route in topology.active
+    ]
+    return JsonResponse(routes, safe=False)
+
+
 def api_get_routes(request):
     """API endpoint to get all active routes"""
-    from transport.models import Route
-    routes = Route.objects.filter(is_active=True).values('id', 'name', 'bus_number', 'is_active')
-    return JsonResponse(list(routes), safe=False)
+    from transport.topology import get_topology
+    from tracking.models import BusTracker
+    from tracking.sweeper import maybe_sweep
 
+    maybe_sweep()
+
+    running = set(
+        BusTracker.objects.filter(is_active=True).values_list('route_id', flat=True)
+    )
+    return _routes_response(get_topology(), running)
+
+
+# =========================================================
+# API: ROUTE SUMMARY (stops / drivers / students per route)
+# =========================================================
+@role_required('admin')
+def api_routes_summary(request):
+    """Per-route counts, served from cache (see transport.stats)"""
+    from transport.stats import route_summary
+    return JsonResponse(route_summary(), safe=False)
+
+
+# =========================================================
+# API: SCHEDULE ADHERENCE (on-time performance report)
+# =========================================================
+@role_required('admin')
+def api_adherence_report(request):
+    """
+    On-time performance from stored StopArrival rows (tracking.adherence).
+
+    Query params: from, to (YYYY-MM-DD, default the last 30 days) and
+    by=route|driver.
+    """
+    from datetime import date, timedelta
+    from django.utils import timezone
+    from tracking.adherence import on_time_performance
+
+    by = request.GET.get("by", "route")
+    if by not in ("route", "driver"):
+        return JsonResponse({"error": "by must be 'route' or 'driver'"}, status=400)
+    try:
+        end = date.fromisoformat(request.GET["to"]) if "to" in request.GET else timezone.localdate()
+        start = date.fromisoformat(request.GET["from"]) if "from" in request.GET else end - timedelta(days=29)
+    except ValueError:
+        return JsonResponse({"error": "Dates must be YYYY-MM-DD"}, status=400)
+
+    return JsonResponse({
+        "from": start,
+        "to": end,
+        "by": by,
+        "results": on_time_performance(start, end, by=by),
+    })
+
+
+# =========================================================
+# API: SEGMENT STATISTICS (planned vs typical stop times)
+# =========================================================
+@role_required('admin')
+def api_segment_stats(request, route_id):
+    """Typical travel/dwell per stop and suggested arrival times (tracking.segments)"""
+    from tracking.segments import suggest_arrival_times
+
+    return JsonResponse({"route_id": route_id, "stops": suggest_arrival_times(route_id)})
+
+
+# =========================================================
+# API: SPEED / COVERAGE HEATMAP (precomputed grid cells)
+# =========================================================
+@role_required('admin')
+def api_heatmap(request):
+    """
+    Heatmap cells inside a bounding box (tracking.heatmap).
+
+    Query params: bbox=min_lat,min_lon,max_lat,max_lon (required),
+    from/to (YYYY-MM-DD, default the last 7 days), level (optional,
+    otherwise picked from the bbox size).
+    Cells are [south lat, west lon, points, mean speed, dwell p90].
+    """
+    from datetime import date, timedelta
+    from django.utils import timezone
+    from tracking.heatmap import LEVELS, cell_size, heatmap_cells
+
+    try:
+        bbox = [float(v) for v in request.GET.get("bbox", "").split(",")]
+        if len(bbox) != 4 or bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+            raise ValueError
+        end = date.fromisoformat(request.GET["to"]) if "to" in request.GET else timezone.localdate()
+        start = date.fromisoformat(request.GET["from"]) if "from" in request.GET else end - timedelta(days=6)
+        level = int(request.GET["level"]) if "level" in request.GET else None
+        if level is not None and not 0 <= level < LEVELS:
+            raise ValueError
+    except ValueError:
+        return JsonResponse({"error": "Invalid bbox, dates or level"}, status=400)
+
+    level, cells = heatmap_cells(bbox, start, end, level=level)
+    response = JsonResponse({
+        "level": level,
+        "cell_deg": cell_size(level),
+        "from": start,
+        "to": end,
+        "cells": cells,
+    })
+    patch_cache_control(response, private=True, max_age=300)
+    return response
 
 
 # ==========================================================
 # 🔴 LIVE TRACKING API — DRIVER SENDS LOCATION
 # ==========================================================
+def _parse_fix(request):
+    """
+    Read one GPS fix from a form-encoded or JSON POST body.
+
+    Returns a dict of floats (optional fields may be None), or None if the
+    latitude/longitude are missing or not numbers, or the device timestamp
+    cannot be a real clock reading.
+    """
+    from tracking.validation import plausible_device_time
+
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return None
+    else:
+        data = request.POST
+
+    fix = {}
+    for field in ("latitude", "longitude", "accuracy", "speed", "heading", "timestamp"):
+        value = data.get(field)
+        if value in (None, ""):
+            fix[field] = None
+            continue
+        try:
+            fix[field] = float(value)
+        except (TypeError, ValueError):
+            return None
+
+    if fix["latitude"] is None or fix["longitude"] is None:
+        return None
+    if fix["timestamp"] and not plausible_device_time(fix["timestamp"]):
+        return None
+    return fix
+
+
+def _read_fixes(request):
+    """Fixes in a driver POST, oldest first, or None if the body is invalid."""
+    from tracking.wire import PACKED_CONTENT_TYPE, unpack_fixes
+
+    if request.content_type == PACKED_CONTENT_TYPE:
+        # Packed binary records (tracking.wire), possibly a batch, oldest first
+        return unpack_fixes(request.body)
+    fix = _parse_fix(request)
+    return [fix] if fix is not None else None
+
+
+def _coalesced(wait):
+    return JsonResponse(
+        {"status": "coalesced", "next_report_ms": int(wait * 1000)},
+        status=202
+    )
+
+
+def _shed(driver_id, route_id, fixes):
+    """Ingest queue full: keep the newest fix live, ask the driver to back off."""
+    from tracking.ingest_queue import ingest_queue
+
+    ingest_queue.shed(driver_id, route_id, fixes[-1])
+    retry_after = ingest_queue.retry_after()
+    response = JsonResponse(
+        {"error": "Ingest busy", "next_report_ms": retry_after * 1000},
+        status=429
+    )
+    response["Retry-After"] = str(retry_after)
+    return response
+
+
+def _queued(route_id):
+    """The batch is still waiting for a writer; it will be stored."""
+    from tracking.ingest_queue import ingest_queue
+    from tracking.pacing import expected_interval
+
+    ingest_queue.answered_early()
+    return JsonResponse(
+        {"status": "queued", "next_report_ms": int(expected_interval(route_id) * 1000)},
+        status=202
+    )
+
+
 @require_POST
 def update_bus_location(request):
+    from concurrent.futures import TimeoutError as FutureTimeout
+    from users.models import Driver
+    from tracking.ingest_queue import WAIT_SECONDS, ingest_queue
+    from tracking.ratelimit import ingest_limiter
+
     if not request.user.is_authenticated:
         return JsonResponse({"error": "Unauthorized"}, status=401)
 
-    try:
-        driver = Driver.objects.get(user=request.user)
-    except Driver.DoesNotExist:
+    driver = Driver.objects.filter(user=request.user).values_list("id", "assigned_route_id").first()
+    if driver is None:
         return JsonResponse({"error": "Not a driver"}, status=403)
 
-    lat = request.POST.get("latitude")
-    lon = request.POST.get("longitude")
+    driver_id, route_id = driver
+    if not route_id:
+        return JsonResponse({"error": "No route assigned"}, status=403)
 
-    if not lat or not lon:
+    fixes = _read_fixes(request)
+    if fixes is None:
         return JsonResponse({"error": "Invalid data"}, status=400)
 
-    BusLocation.objects.update_or_create(
-        route=driver.route,
-        defaults={
-            "latitude": lat,
-            "longitude": lon
-        }
-    )
+    # One token per request; a throttled batch is coalesced to its newest fix,
+    # an admitted one stores its older fixes as history only (apply_batch)
+    wait = ingest_limiter.admit(driver_id, route_id, fixes[-1])
+    if wait:
+        return _coalesced(wait)
+
+    # Writes go through the bounded queue (tracking.ingest_queue)
+    future = ingest_queue.submit(driver_id, route_id, fixes)
+    if future is None:
+        return _shed(driver_id, route_id, fixes)
+    try:
+        status, payload = future.result(timeout=WAIT_SECONDS)
+    except FutureTimeout:
+        return _queued(route_id)
+    return JsonResponse(payload, status=status)
 
-    return JsonResponse({"status": "Location updated"})
+
+@role_required('admin')
+def ingest_metrics(request):
+    """Ingest health counters for this worker process."""
+    from tracking.ingest_queue import ingest_queue
+    from tracking.ratelimit import ingest_limiter
+
+    return JsonResponse({
+        "rate_limit": ingest_limiter.metrics(),
+        "queue": ingest_queue.metrics(),
+    })
 
 
 # ==========================================================
 # 🟢 LIVE TRACKING API — STUDENT GETS LOCATION BY ROUTE
 # ==========================================================
+def _client_key(request):
+    """Identify a polling client: the user if logged in, else the remote address."""
+    if request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    return f"addr:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def _poll_throttled(backoff):
+    response = JsonResponse(
+        {"error": "Polling too fast", "retry_after_ms": int(backoff * 1000)},
+        status=429
+    )
+    response["Retry-After"] = str(math.ceil(backoff))
+    return response
+
+
+def _location_response(route_id, bus):
+    """Location payload for a route; ``bus`` is None if it is not running."""
+    from django.utils import timezone
+    from tracking.polling import retry_after_seconds
+
+    retry_after = retry_after_seconds(route_id, bus, timezone.now())
+
+    if bus is None:
+        from transport.timetable import get_timetable
+
+        # No live position: fall back to the timetable
+        next_departure = get_timetable().next_departure(route_id)
+        response = JsonResponse({
+            "error": "Bus not started yet",
+            "next_departure": next_departure.isoformat() if next_departure else None,
+            "retry_after_ms": int(retry_after * 1000)
+        })
+    else:
+        response = JsonResponse({
+            "latitude": bus["latitude"],
+            "longitude": bus["longitude"],
+            "speed": bus["speed"],
+            "heading": bus["heading"],
+            "updated_at": bus["last_updated"],
+            "retry_after_ms": int(retry_after * 1000)
+        })
+
+    patch_cache_control(response, max_age=int(retry_after))
+    return response
+
+
+def _live_bus(route_id):
+    """A route's bus from the in-memory fleet index, shaped like the BusTracker values."""
+    from datetime import datetime, timezone as dt_timezone
+    from tracking.fleet import fleet_index
+
+    entry = fleet_index.latest(route_id)
+    if entry is None:
+        return None
+    _, lat, lon, heading, speed, updated = entry
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "speed": speed,
+        "heading": heading,
+        "last_updated": datetime.fromtimestamp(updated, tz=dt_timezone.utc),
+    }
+
+
 def get_bus_location(request, route_id):
+    from tracking.models import BusTracker
+    from tracking.sweeper import maybe_sweep
+    from tracking.polling import poll_governor
+
+    admitted, backoff = poll_governor.admit(route_id, _client_key(request))
+    if not admitted:
+        return _poll_throttled(backoff)
+
     try:
-        bus = BusLocation.objects.get(route_id=route_id)
-        return JsonResponse({
-            "latitude": bus.latitude,
-            "longitude": bus.longitude,
-            "updated_at": bus.updated_at
-        })
-    except BusLocation.DoesNotExist:
-        return JsonResponse({"error": "Bus not started yet"})
-    
+        maybe_sweep()
+        bus = BusTracker.objects.filter(route_id=route_id, is_active=True).values(
+            "latitude", "longitude", "speed", "heading", "last_updated"
+        ).first()
+    except DatabaseError:
+        # Database busy or locked: answer from this process's live positions
+        bus = _live_bus(route_id)
+    return _location_response(route_id, bus)
+
+
+# ==========================================================
+# 🟢 STUDENT HOME — EVERYTHING IN ONE ROUND TRIP
+# ==========================================================
+def api_my_bus(request):
+    """
+    The student's route, stops, live bus, ETA to their boarding stop and
+    fee status in one response.
+
+    Budget: two queries (student with fee totals, live tracker). Route and
+    stops come from the cached topology, the ETA from tracking.eta. No
+    role_required: the Student row itself is the role check.
+    """
+    from datetime import date
+    from django.db.models import Count, Min, Q, Sum
+    from django.utils import timezone
+    from tracking.eta import estimate_eta
+    from tracking.models import BusTracker
+    from tracking.polling import retry_after_seconds
+    from transport.timetable import get_timetable
+    from transport.topology import get_topology
+    from users.models import Student
+
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Login required"}, status=401)
+
+    unpaid = Q(fee_records__status__in=["pending", "overdue"])
+    student = Student.objects.filter(user=request.user).annotate(
+        fees_due=Sum("fee_records__amount", filter=unpaid),
+        fees_pending=Count("fee_records", filter=unpaid),
+        fees_overdue=Count("fee_records", filter=unpaid & (
+            Q(fee_records__status="overdue") | Q(fee_records__due_date__lt=date.today())
+        )),
+        fees_next_due=Min("fee_records__due_date", filter=unpaid),
+    ).values(
+        "hall_ticket", "active_route_id", "boarding_stop_id",
+        "fees_due", "fees_pending", "fees_overdue", "fees_next_due",
+    ).first()
+    if student is None:
+        return JsonResponse({"error": "Not a student"}, status=403)
+
+    data = {
+        "hall_ticket": student["hall_ticket"],
+        "fees": {
+            "outstanding": "%.2f" % (student["fees_due"] or 0),
+            "pending": student["fees_pending"],
+            "overdue": student["fees_overdue"],
+            "next_due": student["fees_next_due"],
+        },
+        "route": None,
+        "boarding_stop": None,
+        "bus": None,
+        "eta": None,
+    }
+
+    topology = get_topology()
+    route = topology.routes.get(student["active_route_id"])
+    if route is None:
+        return JsonResponse(data)
+    data["route"] = route.as_dict()
+
+    stop_index = None
+    located = topology.stop_index.get(student["boarding_stop_id"])
+    if located is not None and located[0] == route.id:
+        stop_index = located[1]
+        data["boarding_stop"] = data["route"]["stops"][stop_index]
+
+    now = timezone.now()
+    bus = BusTracker.objects.filter(route_id=route.id, is_active=True).values(
+        "latitude", "longitude", "speed", "heading", "last_updated"
+    ).first()
+    retry_after = retry_after_seconds(route.id, bus, now)
+
+    if bus is None:
+        next_departure = get_timetable().next_departure(route.id)
+        data["next_departure"] = next_departure.isoformat() if next_departure else None
+    else:
+        data["bus"] = {
+            "latitude": bus["latitude"],
+            "longitude": bus["longitude"],
+            "speed": bus["speed"],
+            "heading": bus["heading"],
+            "updated_at": bus["last_updated"],
+        }
+        if stop_index is not None:
+            data["eta"] = estimate_eta(
+                route, stop_index, bus["latitude"], bus["longitude"], bus["speed"], now
+            )
+    data["retry_after_ms"] = int(retry_after * 1000)
+
+    response = JsonResponse(data)
+    patch_cache_control(response, private=True, max_age=int(retry_after))
+    return response
+
+
+# ==========================================================
+# 🔔 STUDENT → STOP-APPROACH ALERTS
+# ==========================================================
+def _alert_json(alert):
+    return {
+        "id": alert.id,
+        "stop_id": alert.stop_id,
+        "stop": alert.stop.name,
+        "route_id": alert.route_id,
+        "minutes": alert.threshold_minutes,
+        "meters": alert.threshold_meters,
+        "is_active": alert.is_active,
+    }
+
+
+def api_stop_alerts(request):
+    """
+    GET: the student's stop alerts. POST: create or replace the alert for a
+    stop (stop_id plus minutes and/or meters, form or JSON body).
+    """
+    from transport.models import Stop
+    from tracking.models import StopAlert
+    from users.models import Student
+
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Login required"}, status=401)
+    student_id = Student.objects.filter(user=request.user).values_list("id", flat=True).first()
+    if student_id is None:
+        return JsonResponse({"error": "Not a student"}, status=403)
+
+    if request.method == "POST":
+        if request.content_type == "application/json":
+            try:
+                data = json.loads(request.body or b"{}")
+            except ValueError:
+                return JsonResponse({"error": "Invalid data"}, status=400)
+        else:
+            data = request.POST
+        try:
+            stop_id = int(data.get("stop_id"))
+            minutes = int(data["minutes"]) if data.get("minutes") not in (None, "") else None
+            meters = int(data["meters"]) if data.get("meters") not in (None, "") else None
+        except (TypeError, ValueError):
+            return JsonResponse({"error": "Invalid data"}, status=400)
+        if (minutes is None and meters is None) or (minutes or 0) < 0 or (meters or 0) < 0:
+            return JsonResponse({"error": "Give minutes and/or meters"}, status=400)
+        stop = Stop.objects.filter(pk=stop_id).first()
+        if stop is None:
+            return JsonResponse({"error": "Unknown stop"}, status=404)
+
+        alert, created = StopAlert.objects.update_or_create(
+            student_id=student_id,
+            stop=stop,
+            defaults={"threshold_minutes": minutes, "threshold_meters": meters, "is_active": True},
+        )
+        return JsonResponse(_alert_json(alert), status=201 if created else 200)
+
+    alerts = StopAlert.objects.filter(student_id=student_id).select_related("stop").order_by("id")
+    return JsonResponse({"alerts": [_alert_json(alert) for alert in alerts]})
+
+
+@require_POST
+def api_stop_alert_delete(request, alert_id):
+    from tracking.models import StopAlert
+
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Login required"}, status=401)
+    alert = StopAlert.objects.filter(pk=alert_id, student__user=request.user).first()
+    if alert is None:
+        return JsonResponse({"error": "Not found"}, status=404)
+    alert.delete()
+    return JsonResponse({"status": "deleted"})
+
+
+# ==========================================================
+# 🟢 LIVE TRACKING API — ALL BUSES IN A MAP VIEWPORT
+# ==========================================================
+FLEET_FIELDS = ["route_id", "lat", "lon", "heading", "speed", "age"]
+
+
+def _fleet_filters(request):
+    """(bbox, route_ids) from the query string; raises ValueError if malformed."""
+    bbox = None
+    if request.GET.get("bbox"):
+        bbox = [float(v) for v in request.GET["bbox"].split(",")]
+        if len(bbox) != 4 or not all(math.isfinite(v) for v in bbox):
+            raise ValueError
+        min_lat, min_lon, max_lat, max_lon = bbox
+        if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lon <= max_lon <= 180):
+            raise ValueError
+    route_ids = None
+    if request.GET.get("routes"):
+        route_ids = {int(v) for v in request.GET["routes"].split(",")}
+    return bbox, route_ids
+
+
+def _fleet_response(entries):
+    import time
+
+    now = time.time()
+    buses = [
+        [route_id, round(lat, 6), round(lon, 6), heading, speed, max(0, round(now - updated))]
+        for route_id, lat, lon, heading, speed, updated in entries
+    ]
+    response = JsonResponse({"fields": FLEET_FIELDS, "buses": buses})
+    patch_cache_control(response, max_age=2)
+    return response
+
+
+def api_fleet(request):
+    """
+    Active buses inside a viewport, from the in-memory fleet index.
+
+    Query params: bbox=min_lat,min_lon,max_lat,max_lon (optional) and
+    routes=1,2,3 (optional). Each bus is one array in FLEET_FIELDS order;
+    age is seconds since its last fix.
+    """
+    from tracking.fleet import fleet_index
+
+    try:
+        bbox, route_ids = _fleet_filters(request)
+    except ValueError:
+        return JsonResponse({"error": "Invalid bbox or routes"}, status=400)
+
+    return _fleet_response(fleet_index.query(bbox, route_ids))
+
+
+def gtfs_rt_vehicle_positions(request):
+    """GTFS-Realtime VehiclePositions (protobuf), shared per update tick."""
+    from django.http import HttpResponse
+    from django.utils.cache import get_conditional_response
+    from tracking.gtfs_rt import TICK_SECONDS, vehicle_positions_feed
+
+    payload, etag = vehicle_positions_feed()
+    # 304 when If-None-Match already names this tick's buffer
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(payload, content_type="application/x-protobuf")
+    response["ETag"] = etag
+    patch_cache_control(response, max_age=int(TICK_SECONDS))
+    return response
+
+
+@role_required('admin')
+def fleet_overview(request):
+    return render(request, "admin/fleet.html")
+
 
 # -------------------------
 # LOGOUT
@@ -109,3 +109,7 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+
+# Content-hashed names (e.g. bundles/routes.<md5[:12]>.json) never change,
+# so WhiteNoise may serve them with far-future immutable headers
+WHITENOISE_IMMUTABLE_FILE_TEST = r'^.+\.[0-9a-f]{12}\.\w+$'
@@ -1,7 +1,14 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+
+from transport.views import route_bundle_file
 
 urlpatterns = [
     path('admin/', admin.site.urls),    # Django admin
+    re_path(                            # Route bundles built since startup
+        r'^static/bundles/(?P<name>routes\.[0-9a-f]{12}\.json)$',
+        route_bundle_file,
+        name='route_bundle_file',
+    ),
     path('', include('busapp.urls')),   # Your main app
 ]
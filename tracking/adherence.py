@@ -0,0 +1,224 @@
+"""
+SCHEDULE ADHERENCE: planned Stop.arrival_time versus GPSLog trajectories.
+
+    compute_adherence(date(2026, 9, 1), date(2026, 9, 30))
+    on_time_performance(start, end, by='route')   # or by='driver'
+
+Design:
+- One query per route for the whole date range (values_list, ordered by
+  the (route, timestamp) index), turned straight into numpy arrays; no
+  model instances are created.
+- The range is cut into local service days with searchsorted on the
+  midnight timestamps.
+- Per route-day, a (fixes x stops) haversine matrix marks fixes within
+  ARRIVAL_RADIUS_M of each stop. Stops are matched in order, each one at
+  its first hit after the previous stop's, so a return leg past the same
+  stop does not count.
+- A route has one planned trip per day (Stop.arrival_time), so a stop
+  gets at most one StopArrival per day: the first pass in stop order. A
+  loop back to its starting point is a separate Stop and is matched
+  after the rest of the trip; later trips that day are not scored.
+- Results replace any earlier rows for the same routes and days in one
+  transaction (StopArrival), so reruns are idempotent.
+- Only route-days with at least one fix are scored; days the bus never
+  reported at all are not guessed at.
+"""
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Avg, Count, Q
+from django.utils import timezone
+
+
+EARTH_RADIUS_M = 6371000
+ARRIVAL_RADIUS_M = 100
+ON_TIME_EARLY_SECONDS = 60     # up to a minute early counts as on time
+ON_TIME_LATE_SECONDS = 300     # up to five minutes late counts as on time
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters; accepts broadcastable numpy arrays."""
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2 +
+        np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return EARTH_RADIUS_M * 2 * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def day_boundaries(start_date, end_date):
+    """Dates in [start_date, end_date] and the epoch seconds of each local midnight (+1 day)."""
+    days = (end_date - start_date).days + 1
+    dates = [start_date + timedelta(days=i) for i in range(days)]
+    edges = np.array([
+        timezone.make_aware(datetime.combine(start_date + timedelta(days=i), time.min)).timestamp()
+        for i in range(days + 1)
+    ])
+    return dates, edges
+
+
+def load_fixes(since, until, fields=('latitude', 'longitude', 'driver_id'), **filters):
+    """
+    GPSLog fixes in [since, until) matching ``filters`` as arrays, oldest first.
+
+    Returns:
+        (epoch seconds, {field: array}) - field arrays hold NaN / -1 for NULLs
+    """
+    from .models import GPSLog
+
+    rows = list(
+        GPSLog.objects.filter(timestamp__gte=since, timestamp__lt=until, **filters)
+        .order_by('timestamp')
+        .values_list('timestamp', *fields)
+    )
+    ts = np.array([row[0].timestamp() for row in rows], dtype=np.float64)
+    columns = {}
+    for i, field in enumerate(fields, start=1):
+        if field.endswith('_id'):
+            columns[field] = np.array([-1 if row[i] is None else row[i] for row in rows], dtype=np.int64)
+        else:
+            columns[field] = np.array([row[i] for row in rows], dtype=np.float64)
+    return ts, columns
+
+
+def detect_arrivals(lats, lons, stop_lats, stop_lons, radius=ARRIVAL_RADIUS_M):
+    """
+    Index of the fix at which each stop was reached, in stop order.
+
+    Returns:
+        int array, one entry per stop, -1 where the stop was not reached
+    """
+    within = haversine_m(
+        lats[:, None], lons[:, None],
+        np.asarray(stop_lats)[None, :], np.asarray(stop_lons)[None, :],
+    ) <= radius
+
+    arrivals = np.full(within.shape[1], -1, dtype=np.int64)
+    start = 0
+    for j in range(within.shape[1]):
+        hits = np.flatnonzero(within[start:, j])
+        if hits.size:
+            start += hits[0]
+            arrivals[j] = start
+    return arrivals
+
+
+def _main_driver(driver_ids):
+    known = driver_ids[driver_ids >= 0]
+    if not known.size:
+        return None
+    values, counts = np.unique(known, return_counts=True)
+    return int(values[counts.argmax()])
+
+
+def compute_adherence(start_date, end_date, route_ids=None):
+    """
+    Score every route-day in [start_date, end_date] and store StopArrival rows.
+
+    Returns:
+        Number of StopArrival rows written
+    """
+    from transport.topology import get_topology
+    from .models import StopArrival
+
+    dates, edges = day_boundaries(start_date, end_date)
+    since = datetime.fromtimestamp(edges[0], tz=timezone.get_current_timezone())
+    until = datetime.fromtimestamp(edges[-1], tz=timezone.get_current_timezone())
+
+    routes = [
+        route for route in get_topology().routes.values()
+        if route.stop_count and (route_ids is None or route.id in route_ids)
+    ]
+
+    results = []
+    for route in routes:
+        planned = [i for i, arrival in enumerate(route.stop_arrivals) if arrival is not None]
+        if not planned:
+            continue
+        ts, columns = load_fixes(since, until, route_id=route.id)
+        if not ts.size:
+            continue
+
+        stop_lats = np.array(route.stop_lats)
+        stop_lons = np.array(route.stop_lons)
+        day_index = np.searchsorted(ts, edges)
+
+        for day, service_date in enumerate(dates):
+            lo, hi = day_index[day], day_index[day + 1]
+            if lo == hi:
+                continue
+            arrivals = detect_arrivals(
+                columns['latitude'][lo:hi], columns['longitude'][lo:hi], stop_lats, stop_lons,
+            )
+            driver_id = _main_driver(columns['driver_id'][lo:hi])
+
+            for i in planned:
+                arrived_at = lateness = None
+                if arrivals[i] >= 0:
+                    actual = ts[lo + arrivals[i]]
+                    scheduled = timezone.make_aware(
+                        datetime.combine(service_date, route.stop_arrivals[i])
+                    ).timestamp()
+                    arrived_at = datetime.fromtimestamp(actual, tz=timezone.get_current_timezone())
+                    lateness = int(round(actual - scheduled))
+                results.append(StopArrival(
+                    service_date=service_date,
+                    route_id=route.id,
+                    stop_id=route.stop_ids[i],
+                    driver_id=driver_id,
+                    arrived_at=arrived_at,
+                    lateness_seconds=lateness,
+                ))
+
+    with transaction.atomic():
+        StopArrival.objects.filter(
+            service_date__range=(start_date, end_date),
+            route_id__in=[route.id for route in routes],
+        ).delete()
+        StopArrival.objects.bulk_create(results, batch_size=1000)
+    return len(results)
+
+
+def on_time_performance(start_date, end_date, by='route'):
+    """
+    On-time performance per route or per driver over a date range.
+
+    Returns:
+        list of dicts: id, name, stops, served, on_time, on_time_pct,
+        avg_lateness_seconds
+    """
+    from .models import StopArrival
+
+    group, name = {
+        'route': ('route_id', 'route__name'),
+        'driver': ('driver_id', 'driver__user__username'),
+    }[by]
+
+    rows = (
+        StopArrival.objects
+        .filter(service_date__range=(start_date, end_date))
+        .values(group, name)
+        .annotate(
+            stops=Count('id'),
+            served=Count('arrived_at'),
+            on_time=Count('id', filter=Q(
+                lateness_seconds__gte=-ON_TIME_EARLY_SECONDS,
+                lateness_seconds__lte=ON_TIME_LATE_SECONDS,
+            )),
+            avg_lateness=Avg('lateness_seconds'),
+        )
+        .order_by(name)
+    )
+    return [
+        {
+            'id': row[group],
+            'name': row[name],
+            'stops': row['stops'],
+            'served': row['served'],
+            'on_time': row['on_time'],
+            'on_time_pct': round(100 * row['on_time'] / row['stops'], 1) if row['stops'] else None,
+            'avg_lateness_seconds': round(row['avg_lateness']) if row['avg_lateness'] is not None else None,
+        }
+        for row in rows
+    ]
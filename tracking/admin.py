@@ -1,15 +1,26 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import GPSLog, BusTracker, LocationError
+from .admin_tools import (
+    AutocompleteFilter,
+    AutocompleteFilterMedia,
+    EstimatedCountPaginator,
+    KeysetPaginationMixin,
+)
+from .models import (
+    GPSLog, BusTracker, LocationError, StopArrival, DriverScorecard, SegmentStat,
+    StopAlert, AlertOutbox, LocationEvent, EventCursor,
+)
 
 
 @admin.register(GPSLog)
-class GPSLogAdmin(admin.ModelAdmin):
+class GPSLogAdmin(KeysetPaginationMixin, AutocompleteFilterMedia, admin.ModelAdmin):
     list_display = ['route', 'driver', 'get_coordinates', 'speed', 'accuracy', 'timestamp', 'created_at']
-    list_filter = ['route', 'driver', 'timestamp', 'created_at']
+    list_filter = [('route', AutocompleteFilter), ('driver', AutocompleteFilter), 'timestamp', 'created_at']
+    list_select_related = ['route', 'driver__user']
     search_fields = ['route__name', 'driver__user__username']
     readonly_fields = ['created_at', 'get_map_link']
-    date_hierarchy = 'timestamp'
+    autocomplete_fields = ['route', 'driver']
+    paginator = EstimatedCountPaginator
     
     fieldsets = (
         ('Route & Driver', {
@@ -42,11 +53,13 @@ class GPSLogAdmin(admin.ModelAdmin):
 
 
 @admin.register(BusTracker)
-class BusTrackerAdmin(admin.ModelAdmin):
+class BusTrackerAdmin(AutocompleteFilterMedia, admin.ModelAdmin):
     list_display = ['route', 'driver', 'current_stop', 'is_active', 'speed', 'last_updated', 'get_map_link']
-    list_filter = ['is_active', 'route', 'last_updated']
+    list_filter = ['is_active', ('route', AutocompleteFilter), 'last_updated']
+    list_select_related = ['route', 'driver__user', 'current_stop__route']
     search_fields = ['route__name', 'driver__user__username']
     readonly_fields = ['last_updated', 'get_map_link']
+    autocomplete_fields = ['route', 'driver', 'current_stop']
     actions = ['activate_trackers', 'deactivate_trackers']
     
     fieldsets = (
@@ -94,22 +107,28 @@ class BusTrackerAdmin(admin.ModelAdmin):
 
 
 @admin.register(LocationError)
-class LocationErrorAdmin(admin.ModelAdmin):
-    list_display = ['tracker', 'error_type', 'is_critical', 'timestamp', 'resolved_at']
-    list_filter = ['error_type', 'is_critical', 'timestamp', ('resolved_at', admin.RelatedOnlyFieldListFilter)]
-    search_fields = ['tracker__route__name', 'error_message']
-    readonly_fields = ['timestamp']
-    date_hierarchy = 'timestamp'
+class LocationErrorAdmin(KeysetPaginationMixin, AutocompleteFilterMedia, admin.ModelAdmin):
+    list_display = ['route', 'tracker', 'error_type', 'occurrence_count', 'is_critical', 'timestamp', 'last_seen', 'resolved_at']
+    list_filter = [
+        'error_type', 'is_critical', 'timestamp',
+        ('resolved_at', admin.EmptyFieldListFilter),
+        ('route', AutocompleteFilter),
+    ]
+    list_select_related = ['route', 'tracker__route']
+    search_fields = ['route__name', 'error_message']
+    readonly_fields = ['timestamp', 'last_seen', 'occurrence_count']
+    autocomplete_fields = ['route', 'tracker']
+    paginator = EstimatedCountPaginator
     
     fieldsets = (
         ('Bus Tracker', {
-            'fields': ('tracker',),
+            'fields': ('route', 'tracker'),
         }),
         ('Error Info', {
-            'fields': ('error_type', 'error_message', 'is_critical'),
+            'fields': ('error_type', 'error_message', 'is_critical', 'occurrence_count'),
         }),
         ('Status', {
-            'fields': ('timestamp', 'resolved_at'),
+            'fields': ('timestamp', 'last_seen', 'resolved_at'),
         }),
     )
     
@@ -134,3 +153,114 @@ class LocationErrorAdmin(admin.ModelAdmin):
         self.message_user(request, f'{updated} error(s) marked as not critical.')
     mark_as_not_critical.short_description = 'Mark as not critical'
 
+
+
+@admin.register(StopArrival)
+class StopArrivalAdmin(AutocompleteFilterMedia, admin.ModelAdmin):
+    """Read-only view of adherence results (written by tracking.adherence)."""
+    list_display = ['service_date', 'route', 'stop', 'driver', 'arrived_at', 'lateness_seconds']
+    list_filter = [('route', AutocompleteFilter), ('driver', AutocompleteFilter), 'service_date']
+    list_select_related = ['route', 'stop', 'driver__user']
+    search_fields = ['route__name', 'stop__name']
+    paginator = EstimatedCountPaginator
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DriverScorecard)
+class DriverScorecardAdmin(AutocompleteFilterMedia, admin.ModelAdmin):
+    """Read-only daily scorecards (written by tracking.scorecards)."""
+    list_display = [
+        'service_date', 'driver', 'score', 'distance_km', 'speeding_episodes',
+        'harsh_accelerations', 'harsh_brakings', 'idle_seconds', 'max_speed',
+    ]
+    list_filter = [('driver', AutocompleteFilter), 'service_date']
+    list_select_related = ['driver__user']
+    search_fields = ['driver__user__username', 'driver__license_number']
+    paginator = EstimatedCountPaginator
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(SegmentStat)
+class SegmentStatAdmin(AutocompleteFilterMedia, admin.ModelAdmin):
+    """Read-only running segment statistics (merged by tracking.segments)."""
+    list_display = ['route', 'stop', 'kind', 'bucket', 'count', 'mean', 'get_p50', 'get_p90', 'updated_at']
+    list_filter = ['kind', ('route', AutocompleteFilter)]
+    list_select_related = ['route', 'stop']
+    search_fields = ['route__name', 'stop__name']
+
+    def get_p50(self, obj):
+        from .segments import sketch_quantile
+        value = sketch_quantile(obj.sketch, 0.5)
+        return round(value) if value is not None else '-'
+    get_p50.short_description = 'p50 (s)'
+
+    def get_p90(self, obj):
+        from .segments import sketch_quantile
+        value = sketch_quantile(obj.sketch, 0.9)
+        return round(value) if value is not None else '-'
+    get_p90.short_description = 'p90 (s)'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StopAlert)
+class StopAlertAdmin(AutocompleteFilterMedia, admin.ModelAdmin):
+    list_display = ['student', 'stop', 'route', 'threshold_minutes', 'threshold_meters', 'is_active']
+    list_filter = ['is_active', ('route', AutocompleteFilter)]
+    list_select_related = ['student__user', 'stop', 'route']
+    search_fields = ['student__hall_ticket', 'stop__name', 'route__name']
+    autocomplete_fields = ['student', 'stop']
+    exclude = ['route']   # copied from the stop on save
+
+
+@admin.register(AlertOutbox)
+class AlertOutboxAdmin(AutocompleteFilterMedia, admin.ModelAdmin):
+    """Read-only delivery log (written by tracking.alerts)."""
+    list_display = ['created_at', 'alert', 'service_date', 'status', 'attempts', 'claimed_at', 'sent_at', 'last_error']
+    list_filter = ['status', 'service_date']
+    list_select_related = ['alert__student__user', 'alert__stop']
+    search_fields = ['alert__student__hall_ticket', 'alert__stop__name']
+    paginator = EstimatedCountPaginator
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(LocationEvent)
+class LocationEventAdmin(AutocompleteFilterMedia, admin.ModelAdmin):
+    """Read-only view of the append-only event log (tracking.events)."""
+    list_display = ['id', 'kind', 'route', 'stop', 'occurred_at', 'latitude', 'longitude', 'speed']
+    list_filter = ['kind', ('route', AutocompleteFilter)]
+    list_select_related = ['route', 'stop']
+    ordering = ['-id']
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(EventCursor)
+class EventCursorAdmin(admin.ModelAdmin):
+    list_display = ['consumer', 'position', 'updated_at']
+    search_fields = ['consumer']
@@ -0,0 +1,232 @@
+"""
+STOP-APPROACH ALERTS.
+
+    alert_index.evaluate(route_id, lat, lon, speed, at)   # ingest, per accepted fix
+    deliver_pending()                                     # deliver_alerts worker
+
+Design:
+- alert_index keeps the active StopAlerts in memory, keyed by (route id,
+  stop position), plus each route's largest minute and meter threshold.
+  It is rebuilt in one query when a StopAlert changes (tracking.signals
+  bumps a shared version, as transport.signals does for the topology) or
+  the topology changes.
+- Per fix the bus is located once. The stops ahead are walked in order and
+  only while they are within the route's largest threshold, and only the
+  alerts on those stops are checked. The cost follows the alerts in reach,
+  not the number of subscriptions, and a route nobody subscribed to costs
+  one dict lookup.
+- An alert fires at most once per service day. Fired ids are remembered in
+  process; the AlertOutbox unique constraint (bulk_create with
+  ignore_conflicts) stops repeats from other workers.
+- Ingest only writes outbox rows. deliver_pending() claims pending rows in
+  id order (SKIP LOCKED where supported, so workers can run in parallel)
+  by marking them 'sending' in a short transaction, then hands each to the
+  TRACKING_ALERT_SENDER callable outside it and records the outcome. A
+  slow mail server therefore holds no row locks or connection-level
+  transaction. Rows of a worker that died mid-batch are claimed again
+  once CLAIM_TIMEOUT has passed; the claim counts as an attempt, so a
+  row that keeps killing its worker still ends 'failed'.
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .eta import eta_ahead, locate_bus
+
+
+VERSION_CACHE_KEY = 'tracking:alert_index_version'
+CHECK_INTERVAL = 2.0         # seconds between shared-version checks
+REACH_SPEED_KMH = 60         # stops further than max minutes at this speed are out of reach
+
+SENDER = getattr(settings, 'TRACKING_ALERT_SENDER', 'tracking.alerts.send_email')
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 5
+CLAIM_TIMEOUT = timedelta(minutes=10)   # a 'sending' row older than this was abandoned
+
+
+class AlertIndex:
+    """Active stop alerts grouped by the stop they watch."""
+
+    def __init__(self):
+        self._by_stop = {}   # (route_id, position) -> [(alert_id, minutes, meters)]
+        self._reach = {}     # route_id -> (max seconds, max meters)
+        self._version = None
+        self._shared = None
+        self._last_check = 0.0
+        self._fired = set()
+        self._fired_day = None
+        self._lock = threading.Lock()
+
+    def refresh(self, topology):
+        """Rebuild from the active StopAlerts (one query)."""
+        from .models import StopAlert
+
+        by_stop, reach = {}, {}
+        rows = StopAlert.objects.filter(is_active=True).values_list(
+            'id', 'stop_id', 'threshold_minutes', 'threshold_meters'
+        )
+        for alert_id, stop_id, minutes, meters in rows:
+            located = topology.stop_index.get(stop_id)
+            if located is None:
+                continue
+            by_stop.setdefault(located, []).append((alert_id, minutes, meters))
+            max_seconds, max_meters = reach.get(located[0], (0, 0))
+            reach[located[0]] = (max(max_seconds, (minutes or 0) * 60), max(max_meters, meters or 0))
+        with self._lock:
+            self._by_stop, self._reach = by_stop, reach
+
+    def _ensure_fresh(self, topology):
+        now = time.monotonic()
+        if now - self._last_check >= CHECK_INTERVAL:
+            self._last_check = now
+            self._shared = cache.get(VERSION_CACHE_KEY)
+        version = (topology.version, self._shared)
+        if version != self._version:
+            self.refresh(topology)
+            self._version = version
+
+    def invalidate(self):
+        self._version = None
+
+    def due(self, route, lat, lon, speed=None, at=None):
+        """
+        Alerts on ``route`` that the bus at (lat, lon) has come within reach of.
+
+        Returns:
+            list of (alert_id, stop position, eta dict)
+        """
+        reach = self._reach.get(route.id)
+        if reach is None:
+            return []
+        max_seconds, max_meters = reach
+        horizon_m = max(max_meters, max_seconds * REACH_SPEED_KMH / 3.6)
+
+        from_index, covered = locate_bus(route, lat, lon)
+        if from_index is None:
+            return []
+
+        due = []
+        for position in range(from_index + 1, route.stop_count):
+            if route.cumulative_m[position] - route.cumulative_m[from_index] - covered > horizon_m:
+                break
+            alerts = self._by_stop.get((route.id, position))
+            if not alerts:
+                continue
+            eta = eta_ahead(route, from_index, covered, position, speed, at)
+            for alert_id, minutes, meters in alerts:
+                if (
+                    (minutes is not None and eta['seconds'] <= minutes * 60) or
+                    (meters is not None and eta['meters'] <= meters)
+                ):
+                    due.append((alert_id, position, eta))
+        return due
+
+    def evaluate(self, route_id, lat, lon, speed=None, at=None):
+        """
+        Queue outbox rows for alerts the fix brings into reach.
+
+        Returns:
+            Number of alerts fired
+        """
+        from transport.topology import get_topology
+        from .models import AlertOutbox
+
+        topology = get_topology()
+        self._ensure_fresh(topology)
+        route = topology.routes.get(route_id)
+        if route is None or route_id not in self._reach:
+            return 0
+
+        at = at or timezone.now()
+        service_date = timezone.localdate(at)
+        with self._lock:
+            if service_date != self._fired_day:
+                self._fired, self._fired_day = set(), service_date
+            due = [entry for entry in self.due(route, lat, lon, speed, at) if entry[0] not in self._fired]
+            self._fired.update(alert_id for alert_id, _, _ in due)
+        if not due:
+            return 0
+
+        AlertOutbox.objects.bulk_create(
+            [
+                AlertOutbox(
+                    alert_id=alert_id,
+                    service_date=service_date,
+                    message=(
+                        f"Bus {route.bus_number or route.name} is about {max(1, round(eta['seconds'] / 60))} min "
+                        f"({eta['meters']} m) from {route.stop_names[position]}."
+                    ),
+                )
+                for alert_id, position, eta in due
+            ],
+            ignore_conflicts=True,
+        )
+        return len(due)
+
+
+def invalidate_alert_index():
+    """Mark the index stale here and, via the cache, in other processes."""
+    alert_index.invalidate()
+    cache.set(VERSION_CACHE_KEY, time.time_ns(), None)
+
+
+def send_email(entry):
+    """Default sender: e-mail the student. Raising marks the attempt failed."""
+    from django.core.mail import send_mail
+
+    user = entry.alert.student.user
+    if not user.email:
+        raise ValueError("Student has no e-mail address")
+    send_mail("Your bus is approaching", entry.message, None, [user.email])
+
+
+def deliver_pending(batch_size=BATCH_SIZE, sender=None):
+    """
+    Send one batch of pending outbox rows.
+
+    Returns:
+        (sent, failed) counts; failed rows go back to pending until MAX_ATTEMPTS
+    """
+    from .models import AlertOutbox
+
+    sender = sender or import_string(SENDER)
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            AlertOutbox.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='pending') | Q(status='sending', claimed_at__lt=now - CLAIM_TIMEOUT))
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        AlertOutbox.objects.filter(id__in=ids).update(
+            status='sending', claimed_at=now, attempts=F('attempts') + 1
+        )
+    if not ids:
+        return 0, 0
+
+    entries = list(AlertOutbox.objects.filter(id__in=ids).select_related('alert__student__user').order_by('id'))
+    sent = failed = 0
+    for entry in entries:
+        try:
+            sender(entry)
+        except Exception as exc:
+            failed += 1
+            entry.last_error = str(exc)[:255]
+            entry.status = 'failed' if entry.attempts >= MAX_ATTEMPTS else 'pending'
+        else:
+            sent += 1
+            entry.status = 'sent'
+            entry.sent_at = timezone.now()
+    AlertOutbox.objects.bulk_update(entries, ['status', 'last_error', 'sent_at'])
+    return sent, failed
+
+
+# Process-wide index used by the ingest path
+alert_index = AlertIndex()
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class TrackingConfig(AppConfig):
     name = 'tracking'
+
+    def ready(self):
+        """Initialize signals when app is ready."""
+        import tracking.signals  # Import to register signals
@@ -0,0 +1,83 @@
+"""
+ARRIVAL ESTIMATE for a bus reaching a stop, without queries.
+
+Sources, first that can answer wins:
+    'segments'  - typical travel and dwell times (tracking.segments), only
+                  if that route's profile is already cached
+    'timetable' - planned difference between the stops' arrival_time
+    'distance'  - remaining distance along the route at the bus's speed
+                  (at least MIN_SPEED_KMH, so a bus at a light is not "never")
+
+The first two cover whole stop-to-stop spans, so they are scaled by the
+share of that span's distance still ahead of the bus.
+"""
+from transport.topology import _haversine_m
+
+from .segments import eta_seconds
+
+
+AT_STOP_RADIUS_M = 75
+MIN_SPEED_KMH = 15
+
+
+def locate_bus(route, lat, lon):
+    """(index of the last stop passed, meters beyond it) for a bus position."""
+    index, meters = route.nearest_stop(lat, lon)
+    if index is None:
+        return None, 0.0
+    if index + 1 < route.stop_count:
+        to_next = _haversine_m(lat, lon, route.stop_lats[index + 1], route.stop_lons[index + 1])
+        if to_next < route.segment_m[index]:
+            return index, meters        # already heading for the next stop
+    if index == 0:
+        return 0, 0.0
+    return index - 1, max(0.0, route.segment_m[index - 1] - meters)
+
+
+def estimate_eta(route, stop_index, lat, lon, speed=None, at=None):
+    """
+    Seconds until the bus at (lat, lon) reaches ``route``'s stop ``stop_index``.
+
+    Returns:
+        {'seconds': int, 'meters': int, 'source': str} ('meters' is absent
+        at the stop), {'seconds': None, 'passed': True} once the bus is
+        beyond the stop, or None without stops
+    """
+    if not 0 <= stop_index < route.stop_count:
+        return None
+    if _haversine_m(lat, lon, route.stop_lats[stop_index], route.stop_lons[stop_index]) <= AT_STOP_RADIUS_M:
+        return {'seconds': 0, 'source': 'position'}
+
+    from_index, covered = locate_bus(route, lat, lon)
+    if from_index is None:
+        return None
+    if from_index >= stop_index:
+        return {'seconds': None, 'passed': True}
+    return eta_ahead(route, from_index, covered, stop_index, speed, at)
+
+
+def eta_ahead(route, from_index, covered, stop_index, speed=None, at=None):
+    """
+    Estimate for a stop ahead of the bus, given its position as returned by
+    locate_bus(). Also reports the remaining distance in 'meters'.
+    """
+    span = route.cumulative_m[stop_index] - route.cumulative_m[from_index]
+    remaining = max(0.0, span - covered)
+    share = remaining / span if span else 1.0
+
+    typical = eta_seconds(route.id, from_index, stop_index, at, cached_only=True)
+    if typical is not None:
+        return {'seconds': round(typical * share), 'meters': round(remaining), 'source': 'segments'}
+
+    planned_from = route.stop_arrivals[from_index]
+    planned_to = route.stop_arrivals[stop_index]
+    if planned_from is not None and planned_to is not None:
+        planned = (
+            (planned_to.hour * 3600 + planned_to.minute * 60) -
+            (planned_from.hour * 3600 + planned_from.minute * 60)
+        ) % (24 * 3600)
+        if planned:
+            return {'seconds': round(planned * share), 'meters': round(remaining), 'source': 'timetable'}
+
+    kmh = max(speed or 0, MIN_SPEED_KMH)
+    return {'seconds': round(remaining / (kmh / 3.6)), 'meters': round(remaining), 'source': 'distance'}
@@ -0,0 +1,147 @@
+"""
+LOCATION EVENT LOG: append-only, read by cursor.
+
+    append([event('location', route_id, lat=..., lon=...), ...])   # producers
+    EventConsumer('exports').process(handler)                      # consumers
+
+Design:
+- One LocationEvent row per accepted fix ('location') and per state change
+  ('trip_start', 'trip_end', 'stop_arrival' from tracking.ingest,
+  'bus_stale' from tracking.sweeper). The auto-increment id is the
+  sequence number. Rows are never updated.
+- A consumer keeps its position (last id processed) in an EventCursor and
+  reads forward in id order, BATCH_SIZE rows per query, on the primary key
+  index. It never rescans history.
+- Exactly once: process() runs the handler and moves the cursor in one
+  transaction, holding a lock on the cursor row. A failed batch rolls back
+  and is read again; database writes done by the handler commit together
+  with the cursor. Side effects outside the database (e-mail, HTTP) are
+  at-least-once and need idempotent handlers.
+- Ids are allocated at insert but become visible at commit, so a slow
+  transaction could publish a lower id after a reader moved past it.
+  Readers skip events younger than SETTLE_SECONDS to leave room for that.
+- prune_events() deletes events older than RETENTION_DAYS that every
+  consumer has already read.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+
+ENABLED = getattr(settings, 'TRACKING_EVENT_LOG', True)
+BATCH_SIZE = 1000
+SETTLE_SECONDS = 2
+RETENTION_DAYS = getattr(settings, 'TRACKING_EVENT_RETENTION_DAYS', 30)
+
+
+def event(kind, route_id, driver_id=None, stop_id=None, lat=None, lon=None,
+          speed=None, heading=None, at=None):
+    """Unsaved LocationEvent; hand it to append()."""
+    from .models import LocationEvent
+
+    return LocationEvent(
+        kind=kind,
+        route_id=route_id,
+        driver_id=driver_id,
+        stop_id=stop_id,
+        latitude=lat,
+        longitude=lon,
+        speed=speed,
+        heading=heading,
+        occurred_at=at or timezone.now(),
+    )
+
+
+def append(events):
+    """Append events in one INSERT (no-op when TRACKING_EVENT_LOG is off)."""
+    from .models import LocationEvent
+
+    if ENABLED and events:
+        LocationEvent.objects.bulk_create(events)
+
+
+class EventConsumer:
+    """Named reader of the event log; its position survives restarts."""
+
+    def __init__(self, name, kinds=None, batch_size=BATCH_SIZE):
+        self.name = name
+        self.kinds = kinds
+        self.batch_size = batch_size
+
+    def _cursor(self, lock=False):
+        from .models import EventCursor
+
+        cursor, _ = EventCursor.objects.get_or_create(consumer=self.name)
+        if lock:
+            cursor = EventCursor.objects.select_for_update().get(pk=cursor.pk)
+        return cursor
+
+    @property
+    def position(self):
+        return self._cursor().position
+
+    def read(self, after=None, limit=None):
+        """Next events after ``after`` (default: the stored position), oldest first."""
+        from .models import LocationEvent
+
+        if after is None:
+            after = self.position
+        events = LocationEvent.objects.filter(
+            id__gt=after,
+            created_at__lte=timezone.now() - timedelta(seconds=SETTLE_SECONDS),
+        )
+        if self.kinds is not None:
+            events = events.filter(kind__in=self.kinds)
+        return list(events.order_by('id')[:limit or self.batch_size])
+
+    def commit(self, position):
+        from .models import EventCursor
+
+        EventCursor.objects.update_or_create(consumer=self.name, defaults={'position': position})
+
+    def process(self, handler, max_batches=None):
+        """
+        Feed batches to ``handler(events)`` until the log is drained (or
+        ``max_batches``), moving the cursor after each batch in the same
+        transaction.
+
+        Returns:
+            Number of events processed
+        """
+        processed = batches = 0
+        while max_batches is None or batches < max_batches:
+            with transaction.atomic():
+                cursor = self._cursor(lock=True)
+                events = self.read(after=cursor.position)
+                if not events:
+                    break
+                handler(events)
+                cursor.position = events[-1].id
+                cursor.save(update_fields=['position', 'updated_at'])
+            processed += len(events)
+            batches += 1
+            if len(events) < self.batch_size:
+                break
+        return processed
+
+
+def prune_events(retention_days=RETENTION_DAYS):
+    """
+    Delete events older than ``retention_days`` that every consumer has read.
+
+    Returns:
+        Number of events deleted
+    """
+    from .models import EventCursor, LocationEvent
+
+    events = LocationEvent.objects.filter(
+        created_at__lt=timezone.now() - timedelta(days=retention_days)
+    )
+    slowest = EventCursor.objects.aggregate(slowest=Min('position'))['slowest']
+    if slowest is not None:
+        events = events.filter(id__lte=slowest)
+    deleted, _ = events.delete()
+    return deleted
@@ -0,0 +1,158 @@
+"""
+LIVE FLEET SPATIAL INDEX for viewport queries.
+
+    fleet_index.query((min_lat, min_lon, max_lat, max_lon), route_ids=None)
+
+Design:
+- Active bus positions live in a uniform grid (CELL_DEG squares -> route
+  ids), so a viewport query visits only the cells it overlaps. When the
+  viewport spans more cells than there are buses, the buses are scanned
+  directly instead.
+- Accepted fixes update this process's index immediately (ingest). Every
+  REFRESH_SECONDS the index is rebuilt from the active BusTrackers in one
+  query, which also picks up fixes handled by other workers and
+  deactivations by the sweeper. That one query is shared by every viewer
+  of this process, not run per request.
+- Entries are (route_id, lat, lon, heading, speed, updated epoch); the
+  rebuild swaps in a new grid with one reference assignment.
+- A rebuild keeps an entry that is newer than its BusTracker row: a fix
+  the ingest queue shed (tracking.ingest_queue) is live before it is
+  written.
+- aquery() serves async views: lookups run on the event loop and the
+  rebuild query in a worker thread, one at a time; meanwhile the others
+  read the previous grid.
+"""
+import math
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+
+
+CELL_DEG = 0.05        # ~5.5 km
+REFRESH_SECONDS = 2.0
+
+
+def _cell(lat, lon):
+    return math.floor(lat / CELL_DEG), math.floor(lon / CELL_DEG)
+
+
+class FleetIndex:
+    """Grid index of live bus positions keyed by route id."""
+
+    def __init__(self, refresh_seconds=REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._buses = {}    # route_id -> entry tuple
+        self._grid = {}     # (cell_y, cell_x) -> set of route_ids
+        self._loaded_at = None
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+
+    def _place(self, grid, buses, entry):
+        route_id = entry[0]
+        old = buses.get(route_id)
+        if old is not None:
+            cell = grid.get(_cell(old[1], old[2]))
+            if cell is not None:
+                cell.discard(route_id)
+        buses[route_id] = entry
+        grid.setdefault(_cell(entry[1], entry[2]), set()).add(route_id)
+
+    def update(self, route_id, lat, lon, heading=None, speed=None, updated=None):
+        """Record a fresh position for a route's bus."""
+        with self._lock:
+            self._place(self._grid, self._buses, (
+                route_id, lat, lon, heading, speed, updated or time.time(),
+            ))
+
+    def remove(self, route_id):
+        with self._lock:
+            old = self._buses.pop(route_id, None)
+            if old is not None:
+                self._grid.get(_cell(old[1], old[2]), set()).discard(route_id)
+
+    def refresh(self):
+        """Rebuild from the active BusTrackers (one query)."""
+        from .models import BusTracker
+
+        buses, grid = {}, {}
+        rows = BusTracker.objects.filter(is_active=True).values_list(
+            'route_id', 'latitude', 'longitude', 'heading', 'speed', 'last_updated'
+        )
+        current = self._buses
+        for route_id, lat, lon, heading, speed, updated in rows:
+            entry = (route_id, lat, lon, heading, speed, updated.timestamp())
+            live = current.get(route_id)
+            # A fix shed by the ingest queue is newer than its row until written
+            self._place(grid, buses, live if live is not None and live[5] > entry[5] else entry)
+        with self._lock:
+            self._buses, self._grid = buses, grid
+            self._loaded_at = time.monotonic()
+
+    def latest(self, route_id):
+        """The route's entry as last seen, without a refresh (None if unknown)."""
+        return self._buses.get(route_id)
+
+    def _ensure_fresh(self):
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at >= self.refresh_seconds:
+            self.refresh()
+
+    def query(self, bbox=None, route_ids=None):
+        """
+        Buses inside ``bbox`` (min_lat, min_lon, max_lat, max_lon), all if None.
+
+        Returns:
+            list of (route_id, lat, lon, heading, speed, updated epoch)
+        """
+        self._ensure_fresh()
+        return self._lookup(bbox, route_ids)
+
+    async def aquery(self, bbox=None, route_ids=None):
+        """query() for async views; the rebuild query runs in a worker thread."""
+        loaded_at = self._loaded_at
+        if loaded_at is None:
+            await sync_to_async(self.refresh, thread_sensitive=False)()
+        elif (
+            time.monotonic() - loaded_at >= self.refresh_seconds
+            and self._refreshing.acquire(blocking=False)
+        ):
+            try:
+                await sync_to_async(self.refresh, thread_sensitive=False)()
+            finally:
+                self._refreshing.release()
+        return self._lookup(bbox, route_ids)
+
+    def _lookup(self, bbox, route_ids):
+        with self._lock:
+            buses, grid = self._buses, self._grid
+            if bbox is None:
+                candidates = list(buses.values())
+            else:
+                min_lat, min_lon, max_lat, max_lon = bbox
+                (y0, x0), (y1, x1) = _cell(min_lat, min_lon), _cell(max_lat, max_lon)
+                if (y1 - y0 + 1) * (x1 - x0 + 1) > len(buses):
+                    candidates = list(buses.values())
+                else:
+                    candidates = [
+                        buses[route_id]
+                        for y in range(y0, y1 + 1)
+                        for x in range(x0, x1 + 1)
+                        for route_id in grid.get((y, x), ())
+                    ]
+
+        found = []
+        for entry in candidates:
+            if route_ids is not None and entry[0] not in route_ids:
+                continue
+            if bbox is not None and not (
+                bbox[0] <= entry[1] <= bbox[2] and bbox[1] <= entry[2] <= bbox[3]
+            ):
+                continue
+            found.append(entry)
+        found.sort()
+        return found
+
+
+# Process-wide index used by the ingest path and the fleet endpoint
+fleet_index = FleetIndex()
@@ -0,0 +1,163 @@
+"""
+GTFS-REALTIME VehiclePositions feed from the live fleet.
+
+    vehicle_positions_feed()   # -> (protobuf bytes, etag)
+
+Design:
+- Source is tracking.fleet.fleet_index (no queries of its own) and the
+  cached topology for route/stop ids, which match the static feed
+  exported by transport.gtfs.
+- The encoded feed is kept as one bytes object per process and rebuilt at
+  most once per TICK_SECONDS, the fleet index refresh interval. All
+  requests inside a tick share it; only one thread encodes, the others
+  keep serving the previous buffer meanwhile. If the vehicles did not
+  change (nor the topology) the old buffer and its ETag are kept.
+- Protobuf is encoded by hand for the handful of fields we fill, so the
+  gtfs-realtime-bindings/protobuf packages are not needed. Field numbers
+  follow gtfs-realtime.proto (FeedMessage, FeedHeader, FeedEntity,
+  VehiclePosition, TripDescriptor, VehicleDescriptor, Position).
+"""
+import hashlib
+import struct
+import threading
+import time
+
+from .eta import AT_STOP_RADIUS_M, locate_bus
+from .fleet import REFRESH_SECONDS, fleet_index
+
+
+TICK_SECONDS = REFRESH_SECONDS
+GTFS_RT_VERSION = '2.0'
+
+# VehiclePosition.VehicleStopStatus
+INCOMING_AT, STOPPED_AT, IN_TRANSIT_TO = 0, 1, 2
+
+
+# ---------------------------------------------------------------------------
+# Protobuf wire format
+# ---------------------------------------------------------------------------
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _uint(field, value):
+    return _varint(field << 3) + _varint(value)
+
+
+def _float(field, value):
+    return _varint(field << 3 | 5) + struct.pack('<f', value)
+
+
+def _bytes(field, value):
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    return _varint(field << 3 | 2) + _varint(len(value)) + value
+
+
+def _vehicle_entity(route, lat, lon, heading, speed, updated):
+    """FeedEntity bytes for one bus."""
+    position = _float(1, lat) + _float(2, lon)
+    if heading is not None:
+        position += _float(3, heading)
+    if speed is not None:
+        position += _float(5, speed / 3.6)    # m/s in GTFS-RT
+
+    vehicle = (
+        _bytes(1, _bytes(5, route.gtfs_id)) +                        # trip: route_id
+        _bytes(2, position)
+    )
+    from_index, covered = locate_bus(route, lat, lon)
+    if from_index is not None:
+        # locate_bus measures from the last stop passed, which may be the
+        # one the bus is sitting at or the one just behind it
+        has_next = from_index + 1 < route.stop_count
+        if has_next and route.segment_m[from_index] - covered <= AT_STOP_RADIUS_M:
+            stop_index, at_stop = from_index + 1, True
+        else:
+            at_stop = covered <= AT_STOP_RADIUS_M
+            stop_index = from_index if at_stop or not has_next else from_index + 1
+        vehicle += (
+            _uint(3, stop_index + 1) +                              # current_stop_sequence
+            _uint(4, STOPPED_AT if at_stop else IN_TRANSIT_TO) +    # current_status
+            _bytes(7, route.stop_gtfs_ids[stop_index])              # stop_id
+        )
+    vehicle += _uint(5, int(updated))                               # timestamp
+    label = route.bus_number or route.name
+    vehicle += _bytes(8, _bytes(1, route.gtfs_id) + _bytes(2, label))   # vehicle descriptor
+
+    return _bytes(1, f'bus-{route.gtfs_id}') + _bytes(4, vehicle)
+
+
+def encode_vehicle_positions(buses, routes, timestamp):
+    """
+    FeedMessage bytes for ``buses`` (fleet index entries).
+
+    Args:
+        buses: iterable of (route_id, lat, lon, heading, speed, updated epoch)
+        routes: route id -> RouteTopology
+        timestamp: header timestamp (epoch seconds)
+    """
+    header = _bytes(1, GTFS_RT_VERSION) + _uint(2, 0) + _uint(3, int(timestamp))
+    parts = [_bytes(1, header)]
+    for route_id, lat, lon, heading, speed, updated in buses:
+        route = routes.get(route_id)
+        if route is not None:
+            parts.append(_bytes(2, _vehicle_entity(route, lat, lon, heading, speed, updated)))
+    return b''.join(parts)
+
+
+# ---------------------------------------------------------------------------
+# Shared buffer
+# ---------------------------------------------------------------------------
+
+class FeedBuffer:
+    """The latest encoded feed, rebuilt at most once per tick."""
+
+    def __init__(self, tick=TICK_SECONDS):
+        self.tick = tick
+        self._state = None        # (built monotonic, inputs, payload, etag)
+        self._lock = threading.Lock()
+
+    def _build(self, previous):
+        from transport.topology import get_topology
+
+        topology = get_topology()
+        buses = tuple(fleet_index.query())
+        inputs = (topology.version, buses)
+        if previous is not None and previous[1] == inputs:
+            return (time.monotonic(),) + previous[1:]
+        timestamp = max((bus[5] for bus in buses), default=time.time())
+        payload = encode_vehicle_positions(buses, topology.routes, timestamp)
+        etag = '"%s"' % hashlib.md5(payload).hexdigest()
+        return time.monotonic(), inputs, payload, etag
+
+    def get(self):
+        """(payload bytes, etag) for the current tick."""
+        state = self._state
+        if state is not None and time.monotonic() - state[0] < self.tick:
+            return state[2], state[3]
+        if not self._lock.acquire(blocking=state is None):
+            return state[2], state[3]   # another thread is encoding
+        try:
+            state = self._state
+            if state is None or time.monotonic() - state[0] >= self.tick:
+                state = self._state = self._build(state)
+        finally:
+            self._lock.release()
+        return state[2], state[3]
+
+
+vehicle_positions = FeedBuffer()
+
+
+def vehicle_positions_feed():
+    return vehicle_positions.get()
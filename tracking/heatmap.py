@@ -0,0 +1,235 @@
+"""
+SPEED AND COVERAGE HEATMAP over GPSLog.
+
+    build_new_days()                       # nightly, resumes at a watermark
+    heatmap_cells(bbox, start, end)        # read side for the map
+
+Design:
+- Fixed lat/lon grid. Level 0 cells are BASE_CELL_DEG square (~220 m
+  here); level k cells are 2^k times larger. Every level is computed from
+  the raw points, so coarse levels are exact, not averages of averages.
+- A cell id is cell_y * columns + cell_x. np.unique(return_inverse)
+  compacts the ids present, and np.bincount then gives point counts and
+  speed sums per cell in one pass each.
+- Dwell: consecutive fixes of one route in the same cell form a pass.
+  A pass lasts from its first fix to the route's next fix. Per-cell p90 is
+  taken after one lexsort by (cell, seconds).
+- Stored per day and level in HeatmapCell. Reads only touch those rows,
+  never GPSLog.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import F, Max, Min, Sum
+from django.utils import timezone
+
+from .adherence import day_boundaries, load_fixes
+
+
+BASE_CELL_DEG = 0.002
+LEVELS = 6                  # up to 0.064 degrees (~7 km) cells
+MAX_CELLS_PER_VIEW = 4096   # the reader picks the finest level under this
+MAX_PASS_SECONDS = 1800     # longer stays (parked overnight) do not count as dwell
+WATERMARK_NAME = 'heatmap'
+
+
+def cell_size(level):
+    return BASE_CELL_DEG * (2 ** level)
+
+
+def cell_coords(lats, lons, level):
+    size = cell_size(level)
+    return (
+        np.floor((lons + 180) / size).astype(np.int64),
+        np.floor((lats + 90) / size).astype(np.int64),
+    )
+
+
+def _group_quantile(groups, values, q):
+    """Nearest-rank q-quantile of ``values`` per group id 0..n-1 (all present)."""
+    order = np.lexsort((values, groups))
+    groups, values = groups[order], values[order]
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    sizes = np.diff(np.r_[starts, groups.size])
+    return values[starts + np.ceil(q * sizes).astype(np.int64) - 1]
+
+
+def aggregate_points(ts, lats, lons, speeds, route_ids, level):
+    """
+    Aggregate one day of points (sorted by route, then time) at ``level``.
+
+    Returns:
+        dict of equal-length arrays: cell_x, cell_y, count, speed_samples,
+        mean_speed (NaN if none), dwell_p90 (NaN if no pass)
+    """
+    cell_x, cell_y = cell_coords(lats, lons, level)
+    columns = int(round(360 / cell_size(level))) + 1
+    ids = cell_y * columns + cell_x
+    cells, inverse = np.unique(ids, return_inverse=True)
+
+    count = np.bincount(inverse, minlength=cells.size)
+    known = ~np.isnan(speeds)
+    speed_samples = np.bincount(inverse[known], minlength=cells.size)
+    speed_sum = np.bincount(inverse[known], weights=speeds[known], minlength=cells.size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_speed = np.where(speed_samples > 0, speed_sum / speed_samples, np.nan)
+
+    # Passes: runs of the same (route, cell); each lasts until the route's next fix
+    same_route = route_ids[1:] == route_ids[:-1]
+    boundary = np.r_[True, (inverse[1:] != inverse[:-1]) | ~same_route]
+    starts = np.flatnonzero(boundary)
+    ends = np.r_[starts[1:], ts.size]            # first fix after the pass
+    last_of_route = np.r_[~same_route, True]     # pass ends the route's day
+    closes = ends < ts.size
+    closes[closes] = ~last_of_route[ends[closes] - 1]
+    seconds = ts[np.minimum(ends, ts.size - 1)] - ts[starts]
+    valid = closes & (seconds <= MAX_PASS_SECONDS)
+
+    dwell_p90 = np.full(cells.size, np.nan)
+    pass_cells = inverse[starts[valid]]
+    if pass_cells.size:
+        present = np.unique(pass_cells)
+        dwell_p90[present] = _group_quantile(
+            np.searchsorted(present, pass_cells), seconds[valid], 0.9
+        )
+
+    return {
+        'cell_x': cells % columns,
+        'cell_y': cells // columns,
+        'count': count,
+        'speed_samples': speed_samples,
+        'mean_speed': mean_speed,
+        'dwell_p90': dwell_p90,
+    }
+
+
+def build_days(start_date, end_date):
+    """
+    (Re)build every level for each day in [start_date, end_date].
+
+    Returns:
+        Number of HeatmapCell rows written
+    """
+    from .models import HeatmapCell
+
+    tz = timezone.get_current_timezone()
+    dates, edges = day_boundaries(start_date, end_date)
+    written = 0
+    for day, service_date in enumerate(dates):
+        ts, columns = load_fixes(
+            datetime.fromtimestamp(edges[day], tz=tz),
+            datetime.fromtimestamp(edges[day + 1], tz=tz),
+            fields=('latitude', 'longitude', 'speed', 'route_id'),
+        )
+        order = np.lexsort((ts, columns['route_id']))
+        ts = ts[order]
+        lats, lons = columns['latitude'][order], columns['longitude'][order]
+        speeds, route_ids = columns['speed'][order], columns['route_id'][order]
+
+        rows = []
+        if ts.size:
+            for level in range(LEVELS):
+                cells = aggregate_points(ts, lats, lons, speeds, route_ids, level)
+                for i in range(cells['count'].size):
+                    rows.append(HeatmapCell(
+                        service_date=service_date,
+                        level=level,
+                        cell_x=int(cells['cell_x'][i]),
+                        cell_y=int(cells['cell_y'][i]),
+                        point_count=int(cells['count'][i]),
+                        speed_samples=int(cells['speed_samples'][i]),
+                        mean_speed=None if np.isnan(cells['mean_speed'][i]) else float(cells['mean_speed'][i]),
+                        dwell_p90=None if np.isnan(cells['dwell_p90'][i]) else float(cells['dwell_p90'][i]),
+                    ))
+
+        with transaction.atomic():
+            HeatmapCell.objects.filter(service_date=service_date).delete()
+            HeatmapCell.objects.bulk_create(rows, batch_size=1000)
+        written += len(rows)
+    return written
+
+
+def build_new_days(until=None):
+    """
+    Build each day after the 'heatmap' watermark up to ``until`` (default
+    yesterday) and move the watermark.
+
+    Returns:
+        (first date, last date, rows) or None if nothing was due
+    """
+    from .models import AggregationWatermark, GPSLog
+
+    until = until or timezone.localdate() - timedelta(days=1)
+    watermark = AggregationWatermark.objects.filter(name=WATERMARK_NAME).first()
+    if watermark is not None:
+        start = watermark.last_date + timedelta(days=1)
+    else:
+        first = GPSLog.objects.aggregate(first=Min('timestamp'))['first']
+        if first is None:
+            return None
+        start = timezone.localdate(first)
+    if start > until:
+        return None
+
+    written = build_days(start, until)
+    AggregationWatermark.objects.update_or_create(name=WATERMARK_NAME, defaults={'last_date': until})
+    return start, until, written
+
+
+def level_for_view(min_lat, min_lon, max_lat, max_lon):
+    """Finest level at which the bounding box spans at most MAX_CELLS_PER_VIEW cells."""
+    for level in range(LEVELS):
+        size = cell_size(level)
+        if ((max_lat - min_lat) / size + 1) * ((max_lon - min_lon) / size + 1) <= MAX_CELLS_PER_VIEW:
+            return level
+    return LEVELS - 1
+
+
+def heatmap_cells(bbox, start_date, end_date, level=None):
+    """
+    Cells inside ``bbox`` (min_lat, min_lon, max_lat, max_lon) merged over
+    the date range: points summed, speed weighted by samples, dwell the
+    worst daily p90.
+
+    Returns:
+        (level, [[south lat, west lon, points, mean speed, dwell p90], ...])
+    """
+    from .models import HeatmapCell
+
+    min_lat, min_lon, max_lat, max_lon = bbox
+    if level is None:
+        level = level_for_view(*bbox)
+    size = cell_size(level)
+    (x_lo, x_hi), (y_lo, y_hi) = (
+        cell_coords(np.array([min_lat, max_lat]), np.array([min_lon, max_lon]), level)
+    )
+
+    rows = (
+        HeatmapCell.objects
+        .filter(
+            level=level,
+            service_date__range=(start_date, end_date),
+            cell_x__range=(int(x_lo), int(x_hi)),
+            cell_y__range=(int(y_lo), int(y_hi)),
+        )
+        .values('cell_x', 'cell_y')
+        .annotate(
+            points=Sum('point_count'),
+            samples=Sum('speed_samples'),
+            speed_total=Sum(F('mean_speed') * F('speed_samples')),
+            dwell=Max('dwell_p90'),
+        )
+        .order_by()
+    )
+    cells = [
+        [
+            round(row['cell_y'] * size - 90, 6),
+            round(row['cell_x'] * size - 180, 6),
+            row['points'],
+            round(row['speed_total'] / row['samples'], 1) if row['samples'] else None,
+            round(row['dwell']) if row['dwell'] is not None else None,
+        ]
+        for row in rows
+    ]
+    return level, cells
@@ -0,0 +1,191 @@
+"""
+LOCATION INGEST PIPELINE.
+
+One accepted driver fix flows through:
+    validation -> BusTracker + GPSLog -> event log, fleet index, segment stats,
+        stop alerts -> pacing hint
+
+Views (form/JSON today, other transports later) parse the request into a
+fix dict and hand it to apply_fix(); everything after parsing lives here so
+every entry point behaves the same. Request handlers do not call it
+directly: batches go through tracking.ingest_queue, whose writer threads
+run apply_batch(), and housekeeping() whenever the queue sits empty.
+
+A fix dict has float-or-None values for: latitude, longitude, accuracy,
+speed, heading and timestamp (device time in epoch milliseconds).
+
+A batch (offline fixes sent together, see tracking.wire) costs the driver
+one rate-limit token, so only its newest fix gets the live side effects.
+The older ones are validated in order and stored as GPSLog history in one
+bulk insert: they are already stale for the map, alerts and events.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from . import segments
+from .alerts import alert_index
+from .events import append, event
+from .fleet import fleet_index
+from .pacing import next_report_interval
+from .validation import error_recorder, fix_validator
+
+
+def _log_events(driver_id, route_id, fix, speed, recorded_at, starting, arrived):
+    """Append this fix and the state changes it caused to the event log."""
+    from transport.topology import get_topology
+
+    position = dict(
+        driver_id=driver_id, lat=fix["latitude"], lon=fix["longitude"],
+        speed=speed, heading=fix.get("heading"), at=recorded_at,
+    )
+    events = []
+    if starting:
+        events.append(event('trip_start', route_id, **position))
+    events.append(event('location', route_id, **position))
+    if arrived is not None:
+        route = get_topology().routes[route_id]
+        stop_id = route.stop_ids[arrived]
+        events.append(event('stop_arrival', route_id, stop_id=stop_id, **position))
+        if arrived == route.stop_count - 1:
+            events.append(event('trip_end', route_id, stop_id=stop_id, **position))
+    append(events)
+
+
+def _recorded_at(fix):
+    """Device time of a fix as (epoch seconds, aware datetime), both None if unknown."""
+    # Device time arrives as epoch milliseconds (position.timestamp in JS)
+    device_ts = fix["timestamp"] / 1000 if fix.get("timestamp") else None
+    recorded_at = (
+        datetime.fromtimestamp(device_ts, tz=dt_timezone.utc) if device_ts else None
+    )
+    return device_ts, recorded_at
+
+
+def _check(route_id, fix, device_ts):
+    result = fix_validator.check(
+        route_id,
+        fix["latitude"],
+        fix["longitude"],
+        accuracy=fix.get("accuracy"),
+        speed=fix.get("speed"),
+        timestamp=device_ts,
+    )
+    if result.error_type:
+        error_recorder.record(route_id, result.error_type, result.message)
+    return result
+
+
+def record_history(driver_id, route_id, fixes):
+    """
+    Validate older fixes of a batch (oldest first) and store the accepted
+    ones as GPSLog rows only.
+
+    Returns:
+        Number of rows written
+    """
+    from django.utils import timezone
+    from .models import GPSLog
+
+    logs = []
+    for fix in fixes:
+        device_ts, recorded_at = _recorded_at(fix)
+        result = _check(route_id, fix, device_ts)
+        if result.accepted:
+            logs.append(GPSLog(
+                route_id=route_id,
+                driver_id=driver_id,
+                latitude=fix["latitude"],
+                longitude=fix["longitude"],
+                accuracy=fix.get("accuracy"),
+                speed=result.speed,
+                heading=fix.get("heading"),
+                timestamp=recorded_at or timezone.now(),
+            ))
+    GPSLog.objects.bulk_create(logs)
+    return len(logs)
+
+
+def apply_fix(driver_id, route_id, fix):
+    """
+    Validate and store one fix for a driver's route.
+
+    Returns:
+        (http_status, payload) ready for a JsonResponse
+    """
+    from .models import BusTracker
+
+    device_ts, recorded_at = _recorded_at(fix)
+    result = _check(route_id, fix, device_ts)
+    if not result.accepted:
+        return 422, {"status": "rejected", "reason": result.error_type, "detail": result.message}
+
+    tracker, created = BusTracker.objects.get_or_create(
+        route_id=route_id,
+        defaults={
+            "driver_id": driver_id,
+            "latitude": fix["latitude"],
+            "longitude": fix["longitude"],
+        }
+    )
+    starting = created or not tracker.is_active
+    tracker.driver_id = driver_id
+    tracker.update_location(
+        fix["latitude"],
+        fix["longitude"],
+        speed=result.speed,
+        heading=fix.get("heading"),
+        accuracy=fix.get("accuracy"),
+        timestamp=recorded_at,
+    )
+
+    fleet_index.update(route_id, fix["latitude"], fix["longitude"], fix.get("heading"), result.speed)
+    arrived = segments.stop_visits.feed(route_id, fix["latitude"], fix["longitude"], recorded_at)
+    _log_events(driver_id, route_id, fix, result.speed, recorded_at, starting, arrived)
+    alert_index.evaluate(route_id, fix["latitude"], fix["longitude"], result.speed, recorded_at)
+
+    interval = next_report_interval(route_id, fix["latitude"], fix["longitude"], result.speed)
+    payload = {
+        "status": "Location updated",
+        "next_report_ms": int(interval * 1000),
+    }
+    if result.error_type:
+        payload["flagged"] = result.error_type
+    return 200, payload
+
+
+def apply_batch(driver_id, route_id, fixes):
+    """
+    Apply an admitted batch (oldest first): history for the older fixes,
+    the full apply_fix() for the newest. Then parked fixes that are now due.
+
+    Returns:
+        (http_status, payload) for the newest fix
+    """
+    from .ratelimit import ingest_limiter
+
+    if len(fixes) > 1:
+        record_history(driver_id, route_id, fixes[:-1])
+    status, payload = apply_fix(driver_id, route_id, fixes[-1])
+    if len(fixes) > 1:
+        payload["batch"] = len(fixes)
+
+    # Fixes parked by other throttled drivers whose buckets have refilled
+    for parked_driver_id, parked_route_id, parked_fix in ingest_limiter.release_due():
+        apply_fix(parked_driver_id, parked_route_id, parked_fix)
+
+    return status, payload
+
+
+def housekeeping():
+    """
+    Work that must not wait for the next fix to arrive; run by idle writers.
+
+    Applies fixes parked by the rate limiter whose bucket has refilled (a
+    trip's last ping is often one of them) and flushes buffered validation
+    errors and segment statistics once they are due.
+    """
+    from .ratelimit import ingest_limiter
+
+    for parked_driver_id, parked_route_id, parked_fix in ingest_limiter.release_due():
+        apply_fix(parked_driver_id, parked_route_id, parked_fix)
+    error_recorder.flush_due()
+    segments.segment_aggregator.flush_due()
@@ -0,0 +1,267 @@
+"""
+BOUNDED INGEST QUEUE with dedicated writer threads.
+
+    future = ingest_queue.submit(driver_id, route_id, fixes)
+    if future is None:                      # queue full: shed
+        ingest_queue.shed(driver_id, route_id, fixes[-1])
+        ...429, Retry-After: ingest_queue.retry_after()
+    else:
+        status, payload = future.result(timeout=WAIT_SECONDS)
+
+Design:
+- Admitted fixes are written by WRITERS threads draining a queue of at
+  most QUEUE_SIZE batches, so when SQLite is busy (a migration, a big
+  export) only the writers wait on it. Request workers wait at most
+  WAIT_SECONDS for their batch and are refused at once when the queue is
+  full, so polls keep their threads and reads degrade separately.
+- A shed fix still moves the bus on the map: it is validated like any
+  other fix (a rejected one is recorded and dropped), goes straight into
+  tracking.fleet.fleet_index and is kept as the route's backlog fix
+  (newest wins). Writers persist backlog fixes whenever the queue runs
+  empty, unless a newer fix for the route was queued meanwhile.
+- Writers that find the queue empty for IDLE_POLL_SECONDS also run
+  tracking.ingest.housekeeping() (one writer at a time), so buffered
+  work is not left waiting for the next fix.
+- Retry-After is the time the current depth takes to drain at the
+  recent per-batch write time, within [1, MAX_RETRY_SECONDS].
+- metrics() reports depth, wait time (enqueue to write start) over the
+  last WAIT_SAMPLES batches and shed/applied counters; see ingest_metrics.
+"""
+import math
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .fleet import fleet_index
+from .validation import error_recorder, fix_validator
+
+
+QUEUE_SIZE = getattr(settings, 'TRACKING_INGEST_QUEUE_SIZE', 200)
+WRITERS = getattr(settings, 'TRACKING_INGEST_WRITERS', 2)
+WAIT_SECONDS = getattr(settings, 'TRACKING_INGEST_WAIT_SECONDS', 2.0)
+MAX_RETRY_SECONDS = 30
+WAIT_SAMPLES = 500
+IDLE_POLL_SECONDS = 0.5   # how often idle writers look at the backlog and housekeeping
+
+
+class IngestQueue:
+    """Bounded queue of fix batches drained by writer threads."""
+
+    def __init__(self, size=QUEUE_SIZE, writers=WRITERS, handler=None, housekeeping=None):
+        self.size = size
+        self.writers = writers
+        self._handler = handler
+        self._housekeeping = housekeeping
+        self._housekeeping_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=size)
+        self._backlog = {}      # route_id -> (driver_id, fix) shed while full
+        self._queued = {}       # route_id -> batches waiting in the queue
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self._service = 0.0     # moving average seconds per batch
+        self._lock = threading.Lock()
+        self._threads = []
+        self._counters = {
+            'enqueued': 0,
+            'applied': 0,
+            'failed': 0,
+            'shed': 0,
+            'shed_rejected': 0,
+            'backlog_applied': 0,
+            'backlog_superseded': 0,
+            'answered_early': 0,
+        }
+
+    # -- request side -------------------------------------------------------
+
+    def submit(self, driver_id, route_id, fixes):
+        """
+        Queue a batch for the writers.
+
+        Returns:
+            Future of (http_status, payload), or None if the queue is full
+        """
+        self._start()
+        future = Future()
+        try:
+            self._queue.put_nowait((time.monotonic(), driver_id, route_id, fixes, future))
+        except queue.Full:
+            return None
+        with self._lock:
+            self._counters['enqueued'] += 1
+            self._queued[route_id] = self._queued.get(route_id, 0) + 1
+            if self._backlog.pop(route_id, None) is not None:
+                self._counters['backlog_superseded'] += 1
+        return future
+
+    def shed(self, driver_id, route_id, fix):
+        """
+        Refused batch: show its newest fix live and keep it for a later write.
+
+        Returns:
+            False if the validator rejected the fix, which is then dropped
+        """
+        device_ts = fix["timestamp"] / 1000 if fix.get("timestamp") else None
+        result = fix_validator.check(
+            route_id,
+            fix["latitude"],
+            fix["longitude"],
+            accuracy=fix.get("accuracy"),
+            speed=fix.get("speed"),
+            timestamp=device_ts,
+        )
+        if not result.accepted:
+            error_recorder.record(route_id, result.error_type, result.message)
+            with self._lock:
+                self._counters['shed_rejected'] += 1
+            return False
+        # A flagged fix is recorded when the backlog write validates it again
+        fleet_index.update(route_id, fix["latitude"], fix["longitude"], fix.get("heading"), result.speed)
+        with self._lock:
+            self._counters['shed'] += 1
+            if self._backlog.pop(route_id, None) is not None:
+                self._counters['backlog_superseded'] += 1
+            self._backlog[route_id] = (driver_id, fix)
+        return True
+
+    def answered_early(self):
+        """Count a request that stopped waiting before its batch was written."""
+        with self._lock:
+            self._counters['answered_early'] += 1
+
+    def retry_after(self):
+        """Seconds a refused driver should wait before sending again."""
+        seconds = self._queue.qsize() * self._service / max(1, self.writers)
+        return max(1, min(MAX_RETRY_SECONDS, math.ceil(seconds)))
+
+    def metrics(self):
+        with self._lock:
+            waits = sorted(self._waits)
+            counters = dict(self._counters)
+            backlog = len(self._backlog)
+        ms = lambda seconds: round(seconds * 1000, 1)
+        return dict(
+            counters,
+            depth=self._queue.qsize(),
+            capacity=self.size,
+            writers=self.writers,
+            backlog=backlog,
+            wait_ms={
+                'avg': ms(sum(waits) / len(waits)) if waits else None,
+                'p95': ms(waits[min(len(waits) - 1, int(len(waits) * 0.95))]) if waits else None,
+                'max': ms(waits[-1]) if waits else None,
+            },
+            write_ms=ms(self._service),
+        )
+
+    # -- writer side --------------------------------------------------------
+
+    def _start(self):
+        if len(self._threads) >= self.writers:
+            return
+        with self._lock:
+            while len(self._threads) < self.writers:
+                thread = threading.Thread(
+                    target=self._run, name=f'ingest-writer-{len(self._threads)}', daemon=True
+                )
+                self._threads.append(thread)
+                thread.start()
+
+    def _handle(self, driver_id, route_id, fixes):
+        if self._handler is not None:
+            return self._handler(driver_id, route_id, fixes)
+        from .ingest import apply_batch
+        return apply_batch(driver_id, route_id, fixes)
+
+    def _run(self):
+        while True:
+            try:
+                job = self._queue.get(timeout=IDLE_POLL_SECONDS)
+            except queue.Empty:
+                self._write_backlog()
+                self._idle()
+                continue
+            try:
+                self._write(*job)
+            finally:
+                self._queue.task_done()
+            if self._queue.empty():
+                self._write_backlog()
+
+    def _idle(self):
+        if not self._housekeeping_lock.acquire(blocking=False):
+            return
+        close_old_connections()
+        try:
+            if self._housekeeping is not None:
+                self._housekeeping()
+            else:
+                from .ingest import housekeeping
+                housekeeping()
+        except Exception:
+            with self._lock:
+                self._counters['failed'] += 1
+        finally:
+            close_old_connections()
+            self._housekeeping_lock.release()
+
+    def _write(self, queued_at, driver_id, route_id, fixes, future):
+        started = time.monotonic()
+        with self._lock:
+            self._waits.append(started - queued_at)
+
+        # A cancelled future only means nobody waits; the fixes are still stored
+        waited = future.set_running_or_notify_cancel()
+        close_old_connections()
+        try:
+            result = self._handle(driver_id, route_id, fixes)
+        except Exception as exc:
+            with self._lock:
+                self._counters['failed'] += 1
+            if waited:
+                future.set_exception(exc)
+        else:
+            with self._lock:
+                self._counters['applied'] += 1
+            if waited:
+                future.set_result(result)
+        finally:
+            close_old_connections()
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._service = elapsed if not self._service else 0.8 * self._service + 0.2 * elapsed
+                # Until now a backlog fix for the route must not race this batch
+                left = self._queued.get(route_id, 1) - 1
+                if left:
+                    self._queued[route_id] = left
+                else:
+                    self._queued.pop(route_id, None)
+
+    def _write_backlog(self):
+        while self._queue.empty():
+            with self._lock:
+                route_id = next(
+                    (route_id for route_id in self._backlog if route_id not in self._queued), None
+                )
+                if route_id is None:
+                    return
+                driver_id, fix = self._backlog.pop(route_id)
+            close_old_connections()
+            try:
+                self._handle(driver_id, route_id, [fix])
+            except Exception:
+                with self._lock:
+                    self._counters['failed'] += 1
+            else:
+                with self._lock:
+                    self._counters['backlog_applied'] += 1
+            finally:
+                close_old_connections()
+
+
+# Process-wide queue used by the ingest views
+ingest_queue = IngestQueue()
@@ -0,0 +1,194 @@
+"""
+LOAD GENERATOR for the tracking endpoints.
+
+    stats = asyncio.run(poll_clients('http://127.0.0.1:8000', '/api/fleet/',
+                                     clients=1000, duration=30, interval=2))
+    stats.summary()   # connections held, req/s, p50/p95/p99 ms, errors
+
+Design:
+- Each simulated client is one coroutine holding one keep-alive HTTP/1.1
+  connection, like a phone polling the live map. Thousands fit in one
+  process, so the server, not the load generator, is what runs out of
+  connections first.
+- A minimal HTTP/1.1 client on asyncio streams (Content-Length bodies,
+  reconnect after "Connection: close"); no aiohttp/httpx needed.
+- Clients start spread over one interval so the server sees a steady
+  arrival rate rather than a synchronized wave.
+"""
+import asyncio
+import random
+import resource
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an already sorted list (None if empty)."""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+def raise_fd_limit(wanted):
+    """Lift the soft open-files limit towards ``wanted``; returns the new limit."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+    if soft != resource.RLIM_INFINITY and soft < target:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+        soft = target
+    return soft
+
+
+class LoadStats:
+    """Counters and latencies gathered by the simulated clients."""
+
+    def __init__(self):
+        self.clients = 0
+        self.connected = 0      # clients that got a connection at least once
+        self.peak_open = 0
+        self.open = 0
+        self.refused = 0        # connect failed or timed out
+        self.timeouts = 0       # request sent, no answer in time
+        self.errors = 0         # connection dropped mid-request
+        self.statuses = Counter()
+        self.latencies = []
+        self.started = self.finished = None
+
+    def opened(self):
+        self.open += 1
+        self.peak_open = max(self.peak_open, self.open)
+
+    def summary(self):
+        ordered = sorted(self.latencies)
+        elapsed = (self.finished or time.monotonic()) - self.started
+        ms = lambda q: None if not ordered else round(percentile(ordered, q) * 1000, 1)
+        return {
+            'clients': self.clients,
+            'connected': self.connected,
+            'peak_open': self.peak_open,
+            'refused': self.refused,
+            'timeouts': self.timeouts,
+            'errors': self.errors,
+            'requests': len(ordered),
+            'rps': round(len(ordered) / elapsed, 1) if elapsed > 0 else 0.0,
+            'p50_ms': ms(50),
+            'p95_ms': ms(95),
+            'p99_ms': ms(99),
+            'statuses': dict(sorted(self.statuses.items())),
+        }
+
+
+class HttpConnection:
+    """One keep-alive HTTP/1.1 connection, reopened when the server closes it."""
+
+    def __init__(self, base_url, timeout=10.0):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._reader = self._writer = None
+
+    @property
+    def is_open(self):
+        return self._writer is not None
+
+    async def open(self):
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+    async def request(self, method, path, body=b'', headers=None):
+        """
+        Send one request and read the whole response.
+
+        Returns:
+            (status, headers dict with lower-case names, body bytes)
+        """
+        if self._writer is None:
+            await self.open()
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}']
+        for name, value in (headers or {}).items():
+            lines.append(f'{name}: {value}')
+        if body or method == 'POST':
+            lines.append(f'Content-Length: {len(body)}')
+        self._writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        return await asyncio.wait_for(self._read_response(), self.timeout)
+
+    async def _read_response(self):
+        status_line = await self._reader.readline()
+        if not status_line:
+            self.close()
+            raise ConnectionError('connection closed by server')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        body = await self._reader.readexactly(int(headers.get('content-length', 0)))
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, headers, body
+
+
+async def _poller(base_url, path, deadline, interval, timeout, stats):
+    loop = asyncio.get_running_loop()
+    connection = HttpConnection(base_url, timeout)
+    ever_connected = False
+    await asyncio.sleep(random.uniform(0, interval))
+    while loop.time() < deadline:
+        started = loop.time()
+        if not connection.is_open:
+            try:
+                await connection.open()
+            except (OSError, asyncio.TimeoutError):
+                stats.refused += 1
+                await asyncio.sleep(interval)
+                continue
+            stats.opened()
+            if not ever_connected:
+                ever_connected = True
+                stats.connected += 1
+        try:
+            status, _, _ = await connection.request('GET', path)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            connection.close()
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            stats.errors += 1
+            connection.close()
+        else:
+            stats.latencies.append(loop.time() - started)
+            stats.statuses[status] += 1
+        if not connection.is_open:
+            stats.open -= 1
+        await asyncio.sleep(max(0.0, interval - (loop.time() - started)))
+    if connection.is_open:
+        connection.close()
+        stats.open -= 1
+
+
+async def poll_clients(base_url, path, clients, duration, interval=2.0, timeout=10.0):
+    """
+    Run ``clients`` pollers against ``base_url + path`` for ``duration`` seconds.
+
+    Returns:
+        LoadStats
+    """
+    stats = LoadStats()
+    stats.clients = clients
+    stats.started = time.monotonic()
+    deadline = asyncio.get_running_loop().time() + duration
+    await asyncio.gather(*(
+        _poller(base_url, path, deadline, interval, timeout, stats) for _ in range(clients)
+    ))
+    stats.finished = time.monotonic()
+    return stats
@@ -0,0 +1,44 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tracking import segments
+from tracking.segments import aggregate_days, aggregate_new_days
+
+
+class Command(BaseCommand):
+    help = "Merge GPSLog stop visits into per-segment travel/dwell statistics."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--until', type=date.fromisoformat,
+            help='Last service date to aggregate (YYYY-MM-DD), default yesterday'
+        )
+        parser.add_argument(
+            '--backfill-from', type=date.fromisoformat,
+            help='Aggregate from this date regardless of the watermark or '
+                 'TRACKING_SEGMENT_STATS_SOURCE. Only for days the live feeder '
+                 'never saw: days it did see would be counted twice'
+        )
+
+    def handle(self, *args, **options):
+        if options['backfill_from']:
+            from datetime import timedelta
+            from django.utils import timezone
+
+            until = options['until'] or timezone.localdate() - timedelta(days=1)
+            observed = aggregate_days(options['backfill_from'], until)
+            self.stdout.write(f"{observed} observation(s) merged for {options['backfill_from']} to {until}.")
+            return
+
+        if segments.SOURCE != 'batch':
+            raise CommandError(
+                f"TRACKING_SEGMENT_STATS_SOURCE is {segments.SOURCE!r}: ingest already records "
+                "these visits. Use --backfill-from only for days it never saw."
+            )
+        result = aggregate_new_days(until=options['until'])
+        if result is None:
+            self.stdout.write("Nothing to aggregate.")
+        else:
+            start, end, observed = result
+            self.stdout.write(f"{observed} observation(s) merged for {start} to {end}.")
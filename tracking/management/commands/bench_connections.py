@@ -0,0 +1,81 @@
+import asyncio
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tracking.loadgen import poll_clients, raise_fd_limit
+
+
+# endpoint -> (WSGI path, ASGI path); {route} is filled from --route
+ENDPOINTS = {
+    'fleet': ('/api/fleet/', '/api/async/fleet/'),
+    'routes': ('/api/student/routes/', '/api/async/student/routes/'),
+    'location': (
+        '/api/student/bus-location/{route}/', '/api/async/student/bus-location/{route}/'
+    ),
+}
+
+COLUMNS = [
+    'clients', 'connected', 'peak_open', 'refused', 'timeouts', 'errors',
+    'requests', 'rps', 'p50_ms', 'p95_ms', 'p99_ms',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare how many concurrent polling clients the WSGI and ASGI deployments "
+        "sustain. Start the servers first, e.g. "
+        "'gunicorn busproject.wsgi -b 127.0.0.1:8000 --threads 32' and "
+        "'uvicorn busproject.asgi:application --port 8001'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi', help='Base URL of the WSGI server (sync views)')
+        parser.add_argument('--asgi', help='Base URL of the ASGI server (async views)')
+        parser.add_argument(
+            '--clients', type=int, nargs='+', default=[1000, 5000],
+            help='Simulated client counts, one run each'
+        )
+        parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), default='fleet')
+        parser.add_argument(
+            '--route', type=int, default=1,
+            help="Route id polled by the 'location' endpoint"
+        )
+        parser.add_argument('--duration', type=float, default=30.0, help='Seconds per run')
+        parser.add_argument(
+            '--interval', type=float, default=2.0,
+            help='Seconds between polls of one client'
+        )
+        parser.add_argument(
+            '--timeout', type=float, default=10.0,
+            help='Seconds to wait for a connection or a response'
+        )
+
+    def handle(self, *args, **options):
+        targets = [
+            (name, options[name], path.format(route=options['route']))
+            for name, path in zip(('wsgi', 'asgi'), ENDPOINTS[options['endpoint']])
+            if options[name]
+        ]
+        if not targets:
+            raise CommandError("Give --wsgi and/or --asgi base URLs.")
+
+        limit = raise_fd_limit(max(options['clients']) + 256)
+        if limit < max(options['clients']):
+            self.stderr.write(f"Open-files limit is {limit}; larger runs will be refused locally.")
+        if options['endpoint'] == 'location':
+            self.stderr.write(
+                "All clients share one address, so the poll governor answers "
+                "most location polls with 429; those still count as served."
+            )
+
+        self.stdout.write('\t'.join(['server'] + COLUMNS + ['statuses']))
+        for clients in options['clients']:
+            for name, base_url, path in targets:
+                stats = asyncio.run(poll_clients(
+                    base_url, path, clients, options['duration'],
+                    interval=options['interval'], timeout=options['timeout'],
+                ))
+                summary = stats.summary()
+                self.stdout.write('\t'.join(
+                    [name] + [str(summary[column]) for column in COLUMNS] + [str(summary['statuses'])]
+                ))
@@ -0,0 +1,38 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tracking.heatmap import build_days, build_new_days
+
+
+class Command(BaseCommand):
+    help = "Aggregate GPSLog points into daily heatmap grid cells."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--until', type=date.fromisoformat,
+            help='Last service date to build (YYYY-MM-DD), default yesterday'
+        )
+        parser.add_argument(
+            '--rebuild-from', type=date.fromisoformat,
+            help='Rebuild from this date regardless of the watermark (needs --until)'
+        )
+
+    def handle(self, *args, **options):
+        began = time.perf_counter()
+        if options['rebuild_from']:
+            if not options['until']:
+                raise CommandError("--rebuild-from needs --until")
+            written = build_days(options['rebuild_from'], options['until'])
+            self.stdout.write(f"{written} cell(s) written in {time.perf_counter() - began:.2f}s.")
+            return
+
+        result = build_new_days(until=options['until'])
+        if result is None:
+            self.stdout.write("Nothing to build.")
+        else:
+            start, end, written = result
+            self.stdout.write(
+                f"{written} cell(s) written for {start} to {end} in {time.perf_counter() - began:.2f}s."
+            )
@@ -0,0 +1,38 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from tracking.adherence import compute_adherence
+
+
+class Command(BaseCommand):
+    help = "Compare GPS tracks with planned stop times and store per-stop lateness."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from', dest='start', type=date.fromisoformat,
+            help='First service date (YYYY-MM-DD), default yesterday'
+        )
+        parser.add_argument(
+            '--to', dest='end', type=date.fromisoformat,
+            help='Last service date (YYYY-MM-DD), default same as --from'
+        )
+        parser.add_argument(
+            '--route', type=int, action='append', dest='routes',
+            help='Only this route id (repeatable)'
+        )
+
+    def handle(self, *args, **options):
+        start = options['start'] or timezone.localdate() - timedelta(days=1)
+        end = options['end'] or start
+        if end < start:
+            raise CommandError("--to must not be before --from")
+
+        began = time.perf_counter()
+        written = compute_adherence(start, end, route_ids=options['routes'])
+        self.stdout.write(
+            f"{written} stop arrival(s) scored for {start} to {end} "
+            f"in {time.perf_counter() - began:.2f}s."
+        )
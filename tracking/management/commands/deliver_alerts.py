@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tracking.alerts import BATCH_SIZE, deliver_pending
+
+
+class Command(BaseCommand):
+    help = "Deliver triggered stop-approach alerts from the outbox."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Outbox rows claimed per batch'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep running, polling the outbox every --interval seconds when it is empty'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=2.0,
+            help='Seconds to wait after an empty batch when --loop is given'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = deliver_pending(batch_size=options['batch_size'])
+            if sent or failed or options['verbosity'] > 1:
+                self.stdout.write(f"{sent} alert(s) sent, {failed} failed.")
+            if sent >= options['batch_size']:
+                continue   # more waiting: drain without sleeping
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tracking.synthetic import CHUNK, SyntheticData, clear_synthetic, synthetic_exists
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate reproducible synthetic students, routes, stops, fees and GPS logs "
+        "for scale testing (chunked bulk inserts, no password hashing)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--students', type=int, default=10_000)
+        parser.add_argument('--routes', type=int, default=200)
+        parser.add_argument('--stops', type=int, default=5_000, help='Stops in total, spread over the routes')
+        parser.add_argument('--gps-logs', type=int, default=50_000_000)
+        parser.add_argument('--fee-records', type=int, default=100_000)
+        parser.add_argument('--fee-payments', type=int, default=100_000)
+        parser.add_argument('--days', type=int, default=30, help='Days of GPS history to spread logs over')
+        parser.add_argument('--chunk', type=int, default=CHUNK, help='Rows per bulk_create')
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Delete previously generated data, then exit'
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            self.stdout.write(f"{clear_synthetic()} synthetic route(s) removed with their data.")
+            return
+        if synthetic_exists():
+            raise CommandError("Synthetic data already present; run with --clear first.")
+
+        try:
+            data = SyntheticData(
+                seed=options['seed'], students=options['students'], routes=options['routes'],
+                stops=options['stops'], gps_logs=options['gps_logs'],
+                fee_records=options['fee_records'], fee_payments=options['fee_payments'],
+                days=options['days'], chunk=options['chunk'],
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        started = time.monotonic()
+        last_report = [started]
+
+        def progress(model, done):
+            now = time.monotonic()
+            if options['verbosity'] > 1 or now - last_report[0] >= 10:
+                last_report[0] = now
+                self.stdout.write(f"  {model}: {done:,} ({now - started:.0f}s)")
+
+        counts = data.generate(progress=progress)
+        for model, count in counts.items():
+            self.stdout.write(f"{model}: {count:,}")
+        self.stdout.write(f"Generated in {time.monotonic() - started:.1f}s.")
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from tracking.events import RETENTION_DAYS, prune_events
+
+
+class Command(BaseCommand):
+    help = "Delete old LocationEvents that every consumer has already read."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=RETENTION_DAYS,
+            help='Keep events younger than this many days'
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_events(retention_days=options['days'])
+        self.stdout.write(f"{deleted} event(s) deleted.")
@@ -0,0 +1,41 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from tracking.scorecards import score_driver_days, score_pending_days
+
+
+class Command(BaseCommand):
+    help = "Compute daily driver behaviour scorecards for days not yet scored."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--until', type=date.fromisoformat,
+            help='Last service date to score (YYYY-MM-DD), default yesterday'
+        )
+        parser.add_argument(
+            '--driver', type=int, action='append', dest='drivers',
+            help='Only this driver id (repeatable)'
+        )
+        parser.add_argument(
+            '--rescore-from', type=date.fromisoformat,
+            help='Recompute from this date even if already scored (needs --driver)'
+        )
+
+    def handle(self, *args, **options):
+        began = time.perf_counter()
+        if options['rescore_from']:
+            from django.utils import timezone
+            from datetime import timedelta
+
+            until = options['until'] or timezone.localdate() - timedelta(days=1)
+            written = sum(
+                score_driver_days(driver_id, options['rescore_from'], until)
+                for driver_id in options['drivers'] or []
+            )
+        else:
+            written = score_pending_days(until=options['until'], driver_ids=options['drivers'])
+        self.stdout.write(
+            f"{written} scorecard(s) written in {time.perf_counter() - began:.2f}s."
+        )
@@ -0,0 +1,121 @@
+import asyncio
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from tracking.simulator import (
+    HttpTransport,
+    InProcessTransport,
+    build_fleet,
+    clear_fleet,
+    replay_logs,
+    run_fleet,
+)
+
+
+COLUMNS = ['endpoint', 'requests', 'rps', 'p50_ms', 'p95_ms', 'p99_ms', 'statuses']
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate buses and students against the live tracking endpoints, or replay "
+        "recorded GPSLog traces, and report throughput and latency per endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--routes', type=int, default=10, help='Simulated routes (one bus each)')
+        parser.add_argument('--stops', type=int, default=12, help='Stops per simulated route')
+        parser.add_argument(
+            '--buses', type=int,
+            help='Buses to drive (default: one per route)'
+        )
+        parser.add_argument('--students', type=int, default=100, help='Simulated students polling')
+        parser.add_argument('--duration', type=float, default=60.0, help='Seconds to run')
+        parser.add_argument('--fix-interval', type=float, default=5.0, help='Seconds between bus fixes')
+        parser.add_argument('--poll-interval', type=float, default=5.0, help='Seconds between student polls')
+        parser.add_argument('--speed', type=float, default=30.0, help='Average bus speed in km/h')
+        parser.add_argument(
+            '--viewport-share', type=float, default=0.2,
+            help='Share of students polling the fleet viewport instead of one route'
+        )
+        parser.add_argument(
+            '--follow-hints', action='store_true',
+            help='Honour next_report_ms / retry_after_ms from the server'
+        )
+        parser.add_argument('--packed', action='store_true', help='Post fixes in the packed binary format')
+        parser.add_argument('--async-api', action='store_true', help='Use the /api/async/ endpoints')
+        parser.add_argument(
+            '--url',
+            help='Base URL of a running server (same database); default is in process'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=32,
+            help='Threads serving in-process requests'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--replay', action='store_true',
+            help='Replay GPSLog rows between --since and --until instead of simulating'
+        )
+        parser.add_argument('--since', help='Replay start (ISO datetime, default: 1 hour ago)')
+        parser.add_argument('--until', help='Replay end (ISO datetime, default: now)')
+        parser.add_argument('--route', type=int, action='append', help='Replay only these route ids')
+        parser.add_argument('--speedup', type=float, default=10.0, help='Replay this many times faster')
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Delete the simulated routes and users, then exit'
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            self.stdout.write(f"{clear_fleet()} simulated route(s) removed.")
+            return
+
+        if options['url']:
+            transport = HttpTransport(options['url'])
+        else:
+            transport = InProcessTransport(workers=options['workers'])
+
+        if options['replay']:
+            now = timezone.now()
+            since = self._moment(options['since'], now - timedelta(hours=1))
+            until = self._moment(options['until'], now)
+            recorder = asyncio.run(replay_logs(
+                transport, since, until, speedup=options['speedup'], route_ids=options['route'],
+                packed=options['packed'], async_api=options['async_api'],
+            ))
+        else:
+            fleet = build_fleet(options['routes'], options['stops'], options['students'], seed=options['seed'])
+            self.stdout.write(
+                f"Simulating {options['buses'] or len(fleet.routes)} bus(es) and "
+                f"{len(fleet.students)} student(s) for {options['duration']:.0f}s..."
+            )
+            recorder = asyncio.run(run_fleet(
+                transport, fleet, options['duration'], buses=options['buses'],
+                fix_interval=options['fix_interval'], poll_interval=options['poll_interval'],
+                speed_kmh=options['speed'], viewport_share=options['viewport_share'],
+                packed=options['packed'], follow_hints=options['follow_hints'],
+                async_api=options['async_api'], seed=options['seed'],
+            ))
+
+        self.stdout.write('\t'.join(COLUMNS))
+        for row in recorder.report():
+            self.stdout.write('\t'.join(str(row[column]) for column in COLUMNS))
+
+        if not options['url']:
+            from tracking.ingest_queue import ingest_queue
+            from tracking.ratelimit import ingest_limiter
+
+            self.stdout.write(f"ingest queue: {ingest_queue.metrics()}")
+            self.stdout.write(f"rate limit: {ingest_limiter.metrics()}")
+
+    @staticmethod
+    def _moment(value, default):
+        if not value:
+            return default
+        moment = parse_datetime(value)
+        if moment is None:
+            raise CommandError(f"Not an ISO datetime: {value}")
+        return moment if timezone.is_aware(moment) else timezone.make_aware(moment)
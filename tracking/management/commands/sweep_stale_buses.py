@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tracking.sweeper import STALE_AFTER_SECONDS, SWEEP_INTERVAL_SECONDS, sweep_stale_trackers
+
+
+class Command(BaseCommand):
+    help = "Mark buses that stopped reporting as inactive (BusTracker.is_active)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-after', type=int, default=STALE_AFTER_SECONDS,
+            help='Seconds without an update before a bus counts as stale'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep running, sweeping every --interval seconds'
+        )
+        parser.add_argument(
+            '--interval', type=int, default=SWEEP_INTERVAL_SECONDS,
+            help='Seconds between sweeps when --loop is given'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            updated = sweep_stale_trackers(stale_after=options['stale_after'])
+            if updated or options['verbosity'] > 1:
+                self.stdout.write(f"{updated} stale tracker(s) deactivated.")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
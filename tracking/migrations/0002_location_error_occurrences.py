@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 02:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='locationerror',
+            name='last_seen',
+            field=models.DateTimeField(blank=True, help_text='When the latest repeat of this error occurred', null=True),
+        ),
+        migrations.AddField(
+            model_name='locationerror',
+            name='occurrence_count',
+            field=models.PositiveIntegerField(default=1, help_text='How many times this error repeated while open'),
+        ),
+        migrations.AlterField(
+            model_name='locationerror',
+            name='error_type',
+            field=models.CharField(choices=[('signal_lost', 'GPS Signal Lost'), ('invalid_coords', 'Invalid Coordinates'), ('accuracy_low', 'Low Accuracy'), ('position_jump', 'Position Jump'), ('speed_invalid', 'Impossible Speed'), ('timeout', 'Location Timeout'), ('permission_denied', 'Permission Denied'), ('unknown', 'Unknown Error')], help_text='Type of error', max_length=20),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 02:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0002_location_error_occurrences'),
+        ('transport', '0001_initial'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gpslog',
+            index=models.Index(fields=['timestamp', 'id'], name='tracking_gp_timesta_b83411_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0003_gpslog_timestamp_id_index'),
+        ('transport', '0001_initial'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StopArrival',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('service_date', models.DateField(help_text='Local date of the trip')),
+                ('arrived_at', models.DateTimeField(blank=True, help_text='First fix within range of the stop (NULL if missed)', null=True)),
+                ('lateness_seconds', models.IntegerField(blank=True, help_text='Actual minus planned arrival in seconds (negative = early)', null=True)),
+                ('driver', models.ForeignKey(blank=True, help_text='Driver who reported most fixes on this route that day', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stop_arrivals', to='users.driver')),
+                ('route', models.ForeignKey(help_text='Route that served the stop', on_delete=django.db.models.deletion.CASCADE, related_name='stop_arrivals', to='transport.route')),
+                ('stop', models.ForeignKey(help_text='Stop that was (or should have been) reached', on_delete=django.db.models.deletion.CASCADE, related_name='arrivals', to='transport.stop')),
+            ],
+            options={
+                'ordering': ['-service_date', 'route', 'stop__order'],
+                'indexes': [models.Index(fields=['route', 'service_date'], name='tracking_st_route_i_437f7b_idx'), models.Index(fields=['driver', 'service_date'], name='tracking_st_driver__cac74f_idx')],
+                'constraints': [models.UniqueConstraint(fields=('stop', 'service_date'), name='unique_stop_arrival_per_day')],
+            },
+        ),
+    ]
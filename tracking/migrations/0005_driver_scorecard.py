@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0004_stop_arrival'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriverScorecard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('service_date', models.DateField(help_text='Local date of the driving day')),
+                ('fix_count', models.PositiveIntegerField(default=0, help_text='GPS fixes the day was computed from')),
+                ('distance_km', models.FloatField(default=0, help_text='Total distance driven')),
+                ('driving_seconds', models.PositiveIntegerField(default=0, help_text='Time covered by fixes (gaps excluded)')),
+                ('max_speed', models.FloatField(blank=True, help_text='Highest speed seen (km/h)', null=True)),
+                ('speeding_episodes', models.PositiveIntegerField(default=0, help_text='Separate stretches above the route speed limit')),
+                ('speeding_seconds', models.PositiveIntegerField(default=0, help_text='Time spent above the route speed limit')),
+                ('harsh_accelerations', models.PositiveIntegerField(default=0, help_text='Speed gains above the harsh-acceleration threshold')),
+                ('harsh_brakings', models.PositiveIntegerField(default=0, help_text='Speed drops above the harsh-braking threshold')),
+                ('idle_seconds', models.PositiveIntegerField(default=0, help_text='Time spent stationary while reporting')),
+                ('score', models.PositiveSmallIntegerField(default=100, help_text='0-100, higher is better')),
+                ('computed_at', models.DateTimeField(auto_now=True, help_text='When this scorecard was computed')),
+                ('driver', models.ForeignKey(help_text='Driver being scored', on_delete=django.db.models.deletion.CASCADE, related_name='scorecards', to='users.driver')),
+            ],
+            options={
+                'ordering': ['-service_date', 'driver'],
+                'indexes': [models.Index(fields=['service_date'], name='tracking_dr_service_573e6c_idx')],
+                'constraints': [models.UniqueConstraint(fields=('driver', 'service_date'), name='unique_scorecard_per_driver_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0005_driver_scorecard'),
+        ('transport', '0002_route_speed_limit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AggregationWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Batch job name', max_length=50, unique=True)),
+                ('last_date', models.DateField(help_text='Newest service date already processed')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='When the watermark last moved')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SegmentStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('travel', 'Travel to next stop'), ('dwell', 'Dwell at stop')], help_text='Travel time or dwell time', max_length=6)),
+                ('bucket', models.PositiveSmallIntegerField(help_text='Time-of-day slice index')),
+                ('count', models.PositiveIntegerField(default=0, help_text='Observations merged so far')),
+                ('mean', models.FloatField(default=0, help_text='Mean seconds')),
+                ('m2', models.FloatField(default=0, help_text='Sum of squared deviations (variance = m2 / (count - 1))')),
+                ('min_seconds', models.FloatField(blank=True, help_text='Shortest observation', null=True)),
+                ('max_seconds', models.FloatField(blank=True, help_text='Longest observation', null=True)),
+                ('sketch', models.JSONField(default=list, help_text='Histogram counts on log-spaced bins')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Last merge')),
+                ('route', models.ForeignKey(help_text='Route the segment belongs to', on_delete=django.db.models.deletion.CASCADE, related_name='segment_stats', to='transport.route')),
+                ('stop', models.ForeignKey(help_text='Stop the segment starts at (or the stop dwelt at)', on_delete=django.db.models.deletion.CASCADE, related_name='segment_stats', to='transport.stop')),
+            ],
+            options={
+                'ordering': ['route', 'kind', 'bucket'],
+                'indexes': [models.Index(fields=['route', 'kind'], name='tracking_se_route_i_f2b740_idx')],
+                'constraints': [models.UniqueConstraint(fields=('stop', 'kind', 'bucket'), name='unique_segment_stat')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0006_segment_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HeatmapCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('service_date', models.DateField(help_text='Local date of the points')),
+                ('level', models.PositiveSmallIntegerField(help_text='0 = finest grid, each level doubles the cell size')),
+                ('cell_x', models.IntegerField(help_text='Cell column (longitude)')),
+                ('cell_y', models.IntegerField(help_text='Cell row (latitude)')),
+                ('point_count', models.PositiveIntegerField(help_text='GPS fixes in the cell')),
+                ('speed_samples', models.PositiveIntegerField(default=0, help_text='Fixes with a known speed')),
+                ('mean_speed', models.FloatField(blank=True, help_text='Mean speed of those fixes (km/h)', null=True)),
+                ('dwell_p90', models.FloatField(blank=True, help_text='90th percentile of seconds a bus stayed in the cell per pass', null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['level', 'cell_y', 'cell_x'], name='tracking_he_level_2eeb5a_idx')],
+                'constraints': [models.UniqueConstraint(fields=('service_date', 'level', 'cell_y', 'cell_x'), name='unique_heatmap_cell')],
+            },
+        ),
+    ]
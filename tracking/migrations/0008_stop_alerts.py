@@ -0,0 +1,62 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0007_heatmap_cell'),
+        ('transport', '0002_route_speed_limit'),
+        ('users', '0002_student_boarding_stop'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StopAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('threshold_minutes', models.PositiveSmallIntegerField(blank=True, help_text='Alert when the bus is this many minutes away', null=True)),
+                ('threshold_meters', models.PositiveIntegerField(blank=True, help_text='Alert when the bus is this many meters away (along the route)', null=True)),
+                ('is_active', models.BooleanField(default=True, help_text='Paused alerts are not evaluated')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('route', models.ForeignKey(help_text='Route of the stop (copied from the stop on save)', on_delete=django.db.models.deletion.CASCADE, related_name='stop_alerts', to='transport.route')),
+                ('stop', models.ForeignKey(help_text='Stop the bus is approaching', on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='transport.stop')),
+                ('student', models.ForeignKey(help_text='Student to notify', on_delete=django.db.models.deletion.CASCADE, related_name='stop_alerts', to='users.student')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AlertOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('service_date', models.DateField(help_text='Local date of the trip')),
+                ('message', models.CharField(help_text='Text to deliver', max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', help_text='Delivery state', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0, help_text='Delivery attempts so far')),
+                ('last_error', models.CharField(blank=True, help_text='Error of the last failed attempt', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='When the alert fired')),
+                ('sent_at', models.DateTimeField(blank=True, help_text='When delivery succeeded', null=True)),
+                ('alert', models.ForeignKey(help_text='Alert that fired', on_delete=django.db.models.deletion.CASCADE, related_name='outbox', to='tracking.stopalert')),
+            ],
+            options={
+                'verbose_name_plural': 'Alert outbox',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='stopalert',
+            constraint=models.UniqueConstraint(fields=('student', 'stop'), name='unique_stop_alert_per_student'),
+        ),
+        migrations.AddConstraint(
+            model_name='stopalert',
+            constraint=models.CheckConstraint(condition=models.Q(('threshold_minutes__isnull', False), ('threshold_meters__isnull', False), _connector='OR'), name='stop_alert_has_threshold'),
+        ),
+        migrations.AddIndex(
+            model_name='alertoutbox',
+            index=models.Index(fields=['status', 'id'], name='tracking_al_status_8befd2_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='alertoutbox',
+            constraint=models.UniqueConstraint(fields=('alert', 'service_date'), name='unique_alert_per_day'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0008_stop_alerts'),
+        ('transport', '0002_route_speed_limit'),
+        ('users', '0002_student_boarding_stop'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('consumer', models.CharField(help_text='Consumer name', max_length=50, unique=True)),
+                ('position', models.BigIntegerField(default=0, help_text='Highest event id already processed')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='When the cursor last moved')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LocationEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('location', 'Location update'), ('trip_start', 'Trip start'), ('trip_end', 'Trip end'), ('stop_arrival', 'Stop arrival'), ('bus_stale', 'Bus stale')], help_text='What happened', max_length=20)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('speed', models.FloatField(blank=True, null=True)),
+                ('heading', models.FloatField(blank=True, null=True)),
+                ('occurred_at', models.DateTimeField(help_text='Device time of the fix, or when the change was detected')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='When the event was appended')),
+                ('driver', models.ForeignKey(blank=True, db_constraint=False, help_text='Driver reporting, if known', null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='users.driver')),
+                ('route', models.ForeignKey(db_constraint=False, help_text='Route of the bus', on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='transport.route')),
+                ('stop', models.ForeignKey(blank=True, db_constraint=False, help_text='Stop reached (stop_arrival, trip_end)', null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='transport.stop')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'id'], name='tracking_lo_kind_ac684a_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_tracker_routes(apps, schema_editor):
+    LocationError = apps.get_model('tracking', 'LocationError')
+    BusTracker = apps.get_model('tracking', 'BusTracker')
+    for tracker_id, route_id in BusTracker.objects.values_list('id', 'route_id'):
+        LocationError.objects.filter(tracker_id=tracker_id).update(route_id=route_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0009_location_event_log'),
+        ('transport', '0003_gtfs_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='locationerror',
+            name='route',
+            field=models.ForeignKey(blank=True, help_text='Route the bad fixes were sent for', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='location_errors', to='transport.route'),
+        ),
+        migrations.AlterField(
+            model_name='locationerror',
+            name='tracker',
+            field=models.ForeignKey(blank=True, help_text='Bus tracker that had issue', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='errors', to='tracking.bustracker'),
+        ),
+        migrations.RunPython(copy_tracker_routes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='locationerror',
+            index=models.Index(fields=['route', 'error_type', 'resolved_at'], name='tracking_lo_route_i_5ffa7a_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0010_location_error_route'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alertoutbox',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, help_text='When a delivery worker last claimed the row', null=True),
+        ),
+        migrations.AlterField(
+            model_name='alertoutbox',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', help_text='Delivery state', max_length=10),
+        ),
+    ]
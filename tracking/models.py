@@ -70,6 +70,7 @@ class GPSLog(models.Model):
             models.Index(fields=['driver', 'timestamp']),
             models.Index(fields=['route', 'timestamp']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['timestamp', 'id']),
         ]
         get_latest_by = 'timestamp'
 
@@ -110,7 +111,9 @@ class BusTracker(models.Model):
     - is_active flag for operational status
     - Better timestamp handling
     
-    Design: Single record per route, updated frequently
+    Design: Single record per route, updated frequently.
+    is_active is cleared by tracking.sweeper when updates stop and set
+    again by the next accepted fix.
     """
     route = models.OneToOneField(
         'transport.Route',
@@ -172,7 +175,7 @@ class BusTracker(models.Model):
     def __str__(self):
         return f"{self.route.name} - Live Location"
 
-    def update_location(self, lat, lon, speed=None, heading=None):
+    def update_location(self, lat, lon, speed=None, heading=None, accuracy=None, timestamp=None):
         """Update bus location and create GPS log."""
         from django.utils import timezone
         
@@ -183,18 +186,21 @@ class BusTracker(models.Model):
             self.speed = speed
         if heading is not None:
             self.heading = heading
+        # A fresh fix revives a bus the stale sweeper switched off
+        self.is_active = True
         self.save()
         
-        # Create history log
-        if self.driver:
+        # Create history log (ids only: no extra queries for route/driver)
+        if self.driver_id:
             GPSLog.objects.create(
-                route=self.route,
-                driver=self.driver,
+                route_id=self.route_id,
+                driver_id=self.driver_id,
                 latitude=lat,
                 longitude=lon,
+                accuracy=accuracy,
                 speed=speed,
                 heading=heading,
-                timestamp=timezone.now()
+                timestamp=timestamp or timezone.now()
             )
 
 
@@ -206,19 +212,36 @@ class LocationError(models.Model):
     - Monitoring of GPS signal issues
     - Data quality tracking
     - Driver notification of tech issues
+    
+    Design: Repeats of an open error bump occurrence_count instead of
+    adding rows (see tracking.validation.ErrorRecorder). Errors belong to
+    a route; tracker is filled in once the route has one, so a bus whose
+    very first fixes are rejected is still reported.
     """
     ERROR_TYPES = (
         ('signal_lost', 'GPS Signal Lost'),
         ('invalid_coords', 'Invalid Coordinates'),
         ('accuracy_low', 'Low Accuracy'),
+        ('position_jump', 'Position Jump'),
+        ('speed_invalid', 'Impossible Speed'),
         ('timeout', 'Location Timeout'),
         ('permission_denied', 'Permission Denied'),
         ('unknown', 'Unknown Error'),
     )
     
+    route = models.ForeignKey(
+        'transport.Route',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='location_errors',
+        help_text="Route the bad fixes were sent for"
+    )
     tracker = models.ForeignKey(
         BusTracker,
         on_delete=models.CASCADE,
+        null=True,
+        blank=True,
         related_name='errors',
         help_text="Bus tracker that had issue"
     )
@@ -245,17 +268,32 @@ class LocationError(models.Model):
         default=False,
         help_text="Whether this error needs immediate attention"
     )
+    occurrence_count = models.PositiveIntegerField(
+        default=1,
+        help_text="How many times this error repeated while open"
+    )
+    last_seen = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When the latest repeat of this error occurred"
+    )
 
     class Meta:
         app_label = 'tracking'
         ordering = ['-timestamp']
         indexes = [
             models.Index(fields=['tracker', 'timestamp']),
+            models.Index(fields=['route', 'error_type', 'resolved_at']),
             models.Index(fields=['is_critical', 'resolved_at']),
         ]
 
     def __str__(self):
-        return f"{self.tracker.route.name} - {self.get_error_type_display()}"
+        return f"{self.route.name if self.route_id else '-'} - {self.get_error_type_display()}"
+
+    def save(self, *args, **kwargs):
+        if self.route_id is None and self.tracker is not None:
+            self.route_id = self.tracker.route_id
+        super().save(*args, **kwargs)
 
     def mark_resolved(self):
         """Mark this error as resolved."""
@@ -264,3 +302,529 @@ class LocationError(models.Model):
         self.resolved_at = timezone.now()
         self.save()
 
+
+
+class StopArrival(models.Model):
+    """
+    SCHEDULE ADHERENCE result: one row per stop per service day.
+
+    Written in bulk by tracking.adherence from GPSLog trajectories; never
+    edited by hand. lateness_seconds is actual minus planned
+    (Stop.arrival_time), negative when early, NULL when the bus was never
+    seen within range of the stop that day.
+
+    One row per day is all the plan can be compared with: a route has a
+    single planned trip per day (one Stop.arrival_time per stop, one
+    RouteSchedule per weekday). A loop that serves the same place twice
+    has a Stop row per visit, so each visit gets its own row. Further
+    passes on the same day have no planned time and are not scored.
+    """
+    service_date = models.DateField(
+        help_text="Local date of the trip"
+    )
+    route = models.ForeignKey(
+        'transport.Route',
+        on_delete=models.CASCADE,
+        related_name='stop_arrivals',
+        help_text="Route that served the stop"
+    )
+    stop = models.ForeignKey(
+        'transport.Stop',
+        on_delete=models.CASCADE,
+        related_name='arrivals',
+        help_text="Stop that was (or should have been) reached"
+    )
+    driver = models.ForeignKey(
+        'users.Driver',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='stop_arrivals',
+        help_text="Driver who reported most fixes on this route that day"
+    )
+    arrived_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="First fix within range of the stop (NULL if missed)"
+    )
+    lateness_seconds = models.IntegerField(
+        null=True,
+        blank=True,
+        help_text="Actual minus planned arrival in seconds (negative = early)"
+    )
+
+    class Meta:
+        app_label = 'tracking'
+        ordering = ['-service_date', 'route', 'stop__order']
+        constraints = [
+            models.UniqueConstraint(fields=['stop', 'service_date'], name='unique_stop_arrival_per_day'),
+        ]
+        indexes = [
+            models.Index(fields=['route', 'service_date']),
+            models.Index(fields=['driver', 'service_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.stop.name} - {self.service_date}"
+
+
+class DriverScorecard(models.Model):
+    """
+    DRIVER BEHAVIOUR summary: one row per driver per service day.
+
+    Written by tracking.scorecards from GPSLog; the admin reads these rows
+    instead of rescanning raw fixes. score starts at 100 and loses points
+    for each speeding episode, harsh acceleration/braking and long idling.
+    """
+    driver = models.ForeignKey(
+        'users.Driver',
+        on_delete=models.CASCADE,
+        related_name='scorecards',
+        help_text="Driver being scored"
+    )
+    service_date = models.DateField(
+        help_text="Local date of the driving day"
+    )
+    fix_count = models.PositiveIntegerField(
+        default=0,
+        help_text="GPS fixes the day was computed from"
+    )
+    distance_km = models.FloatField(
+        default=0,
+        help_text="Total distance driven"
+    )
+    driving_seconds = models.PositiveIntegerField(
+        default=0,
+        help_text="Time covered by fixes (gaps excluded)"
+    )
+    max_speed = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Highest speed seen (km/h)"
+    )
+    speeding_episodes = models.PositiveIntegerField(
+        default=0,
+        help_text="Separate stretches above the route speed limit"
+    )
+    speeding_seconds = models.PositiveIntegerField(
+        default=0,
+        help_text="Time spent above the route speed limit"
+    )
+    harsh_accelerations = models.PositiveIntegerField(
+        default=0,
+        help_text="Speed gains above the harsh-acceleration threshold"
+    )
+    harsh_brakings = models.PositiveIntegerField(
+        default=0,
+        help_text="Speed drops above the harsh-braking threshold"
+    )
+    idle_seconds = models.PositiveIntegerField(
+        default=0,
+        help_text="Time spent stationary while reporting"
+    )
+    score = models.PositiveSmallIntegerField(
+        default=100,
+        help_text="0-100, higher is better"
+    )
+    computed_at = models.DateTimeField(
+        auto_now=True,
+        help_text="When this scorecard was computed"
+    )
+
+    class Meta:
+        app_label = 'tracking'
+        ordering = ['-service_date', 'driver']
+        constraints = [
+            models.UniqueConstraint(fields=['driver', 'service_date'], name='unique_scorecard_per_driver_day'),
+        ]
+        indexes = [
+            models.Index(fields=['service_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.driver} - {self.service_date} ({self.score})"
+
+
+class SegmentStat(models.Model):
+    """
+    RUNNING TRAVEL/DWELL STATISTICS per route segment and time of day.
+
+    kind='travel': stop -> next stop on the route; kind='dwell': time spent
+    at the stop itself. bucket is the local time of day in
+    tracking.segments.BUCKET_MINUTES slices. Rows are merged, never
+    recomputed: count/mean/m2 (Welford) plus a log-binned histogram sketch
+    for quantiles (see tracking.segments).
+    """
+    KINDS = (
+        ('travel', 'Travel to next stop'),
+        ('dwell', 'Dwell at stop'),
+    )
+
+    route = models.ForeignKey(
+        'transport.Route',
+        on_delete=models.CASCADE,
+        related_name='segment_stats',
+        help_text="Route the segment belongs to"
+    )
+    stop = models.ForeignKey(
+        'transport.Stop',
+        on_delete=models.CASCADE,
+        related_name='segment_stats',
+        help_text="Stop the segment starts at (or the stop dwelt at)"
+    )
+    kind = models.CharField(
+        max_length=6,
+        choices=KINDS,
+        help_text="Travel time or dwell time"
+    )
+    bucket = models.PositiveSmallIntegerField(
+        help_text="Time-of-day slice index"
+    )
+    count = models.PositiveIntegerField(
+        default=0,
+        help_text="Observations merged so far"
+    )
+    mean = models.FloatField(
+        default=0,
+        help_text="Mean seconds"
+    )
+    m2 = models.FloatField(
+        default=0,
+        help_text="Sum of squared deviations (variance = m2 / (count - 1))"
+    )
+    min_seconds = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Shortest observation"
+    )
+    max_seconds = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Longest observation"
+    )
+    sketch = models.JSONField(
+        default=list,
+        help_text="Histogram counts on log-spaced bins"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text="Last merge"
+    )
+
+    class Meta:
+        app_label = 'tracking'
+        ordering = ['route', 'kind', 'bucket']
+        constraints = [
+            models.UniqueConstraint(fields=['stop', 'kind', 'bucket'], name='unique_segment_stat'),
+        ]
+        indexes = [
+            models.Index(fields=['route', 'kind']),
+        ]
+
+    def __str__(self):
+        return f"{self.stop.name} {self.kind} #{self.bucket}"
+
+
+class AggregationWatermark(models.Model):
+    """Last service date a nightly batch job has consumed (by job name)."""
+    name = models.CharField(
+        max_length=50,
+        unique=True,
+        help_text="Batch job name"
+    )
+    last_date = models.DateField(
+        help_text="Newest service date already processed"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text="When the watermark last moved"
+    )
+
+    class Meta:
+        app_label = 'tracking'
+
+    def __str__(self):
+        return f"{self.name}: {self.last_date}"
+
+
+class HeatmapCell(models.Model):
+    """
+    GRID AGGREGATE of GPSLog points for the speed/coverage heatmap.
+
+    One row per (service_date, level, cell). Level 0 cells are
+    tracking.heatmap.BASE_CELL_DEG degrees square; each further level
+    doubles the cell size for zoomed-out views. cell_x / cell_y count cells
+    east of -180 and north of -90.
+    """
+    service_date = models.DateField(
+        help_text="Local date of the points"
+    )
+    level = models.PositiveSmallIntegerField(
+        help_text="0 = finest grid, each level doubles the cell size"
+    )
+    cell_x = models.IntegerField(
+        help_text="Cell column (longitude)"
+    )
+    cell_y = models.IntegerField(
+        help_text="Cell row (latitude)"
+    )
+    point_count = models.PositiveIntegerField(
+        help_text="GPS fixes in the cell"
+    )
+    speed_samples = models.PositiveIntegerField(
+        default=0,
+        help_text="Fixes with a known speed"
+    )
+    mean_speed = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Mean speed of those fixes (km/h)"
+    )
+    dwell_p90 = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="90th percentile of seconds a bus stayed in the cell per pass"
+    )
+
+    class Meta:
+        app_label = 'tracking'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['service_date', 'level', 'cell_y', 'cell_x'], name='unique_heatmap_cell'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['level', 'cell_y', 'cell_x']),
+        ]
+
+    def __str__(self):
+        return f"{self.service_date} L{self.level} ({self.cell_x}, {self.cell_y})"
+
+
+class StopAlert(models.Model):
+    """
+    A student's request to be told when their bus nears a stop.
+
+    Fires once per service day, when the bus is within threshold_minutes
+    or threshold_meters of the stop (either one may be left empty).
+    Evaluated on every accepted fix through tracking.alerts.alert_index.
+    """
+    student = models.ForeignKey(
+        'users.Student',
+        on_delete=models.CASCADE,
+        related_name='stop_alerts',
+        help_text="Student to notify"
+    )
+    route = models.ForeignKey(
+        'transport.Route',
+        on_delete=models.CASCADE,
+        related_name='stop_alerts',
+        help_text="Route of the stop (copied from the stop on save)"
+    )
+    stop = models.ForeignKey(
+        'transport.Stop',
+        on_delete=models.CASCADE,
+        related_name='alerts',
+        help_text="Stop the bus is approaching"
+    )
+    threshold_minutes = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        help_text="Alert when the bus is this many minutes away"
+    )
+    threshold_meters = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Alert when the bus is this many meters away (along the route)"
+    )
+    is_active = models.BooleanField(
+        default=True,
+        help_text="Paused alerts are not evaluated"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True
+    )
+
+    class Meta:
+        app_label = 'tracking'
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'stop'], name='unique_stop_alert_per_student'),
+            models.CheckConstraint(
+                condition=models.Q(threshold_minutes__isnull=False) | models.Q(threshold_meters__isnull=False),
+                name='stop_alert_has_threshold',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.student.hall_ticket} @ {self.stop.name}"
+
+    def save(self, *args, **kwargs):
+        self.route_id = self.stop.route_id
+        super().save(*args, **kwargs)
+
+
+class AlertOutbox(models.Model):
+    """
+    TRIGGERED STOP ALERTS waiting for delivery (transactional outbox).
+
+    The ingest path only inserts rows; the deliver_alerts worker claims
+    them ('sending'), sends them and records the outcome. (alert,
+    service_date) is unique so a stop alert is queued at most once per day
+    even with several ingest workers.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+
+    alert = models.ForeignKey(
+        StopAlert,
+        on_delete=models.CASCADE,
+        related_name='outbox',
+        help_text="Alert that fired"
+    )
+    service_date = models.DateField(
+        help_text="Local date of the trip"
+    )
+    message = models.CharField(
+        max_length=255,
+        help_text="Text to deliver"
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='pending',
+        help_text="Delivery state"
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Delivery attempts so far"
+    )
+    last_error = models.CharField(
+        max_length=255,
+        blank=True,
+        help_text="Error of the last failed attempt"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="When the alert fired"
+    )
+    claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When a delivery worker last claimed the row"
+    )
+    sent_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When delivery succeeded"
+    )
+
+    class Meta:
+        app_label = 'tracking'
+        verbose_name_plural = "Alert outbox"
+        constraints = [
+            models.UniqueConstraint(fields=['alert', 'service_date'], name='unique_alert_per_day'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.alert} {self.service_date} ({self.status})"
+
+
+class LocationEvent(models.Model):
+    """
+    APPEND-ONLY EVENT LOG of accepted fixes and bus state changes.
+
+    The primary key is the sequence number: consumers (tracking.events)
+    remember the last id they processed in an EventCursor and read forward
+    from there. Rows are never updated; old ones are pruned once every
+    consumer has read past them. Foreign keys carry no database constraint
+    so deleting a route or driver does not rewrite history.
+    """
+    KIND_CHOICES = (
+        ('location', 'Location update'),
+        ('trip_start', 'Trip start'),
+        ('trip_end', 'Trip end'),
+        ('stop_arrival', 'Stop arrival'),
+        ('bus_stale', 'Bus stale'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(
+        max_length=20,
+        choices=KIND_CHOICES,
+        help_text="What happened"
+    )
+    route = models.ForeignKey(
+        'transport.Route',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        help_text="Route of the bus"
+    )
+    driver = models.ForeignKey(
+        'users.Driver',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='+',
+        help_text="Driver reporting, if known"
+    )
+    stop = models.ForeignKey(
+        'transport.Stop',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='+',
+        help_text="Stop reached (stop_arrival, trip_end)"
+    )
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    speed = models.FloatField(null=True, blank=True)
+    heading = models.FloatField(null=True, blank=True)
+    occurred_at = models.DateTimeField(
+        help_text="Device time of the fix, or when the change was detected"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="When the event was appended"
+    )
+
+    class Meta:
+        app_label = 'tracking'
+        indexes = [
+            models.Index(fields=['kind', 'id']),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.kind} route {self.route_id}"
+
+
+class EventCursor(models.Model):
+    """Last LocationEvent id a named consumer has processed."""
+    consumer = models.CharField(
+        max_length=50,
+        unique=True,
+        help_text="Consumer name"
+    )
+    position = models.BigIntegerField(
+        default=0,
+        help_text="Highest event id already processed"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text="When the cursor last moved"
+    )
+
+    class Meta:
+        app_label = 'tracking'
+
+    def __str__(self):
+        return f"{self.consumer}: {self.position}"
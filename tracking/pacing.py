@@ -0,0 +1,132 @@
+"""
+ADAPTIVE PING-RATE CONTROL.
+
+The ingest response tells the driver phone when to report next. The
+interval is computed from:
+- demand: how many distinct clients polled this route recently
+- motion: parked buses report rarely, moving buses more often
+- proximity: a bus closing in on its next stop while students are
+  watching reports at the fastest rate. Only the stop ahead counts
+  (tracking.eta.locate_bus), so a bus pulling away from a stop goes
+  straight back to the slower rate.
+
+Demand is counted in process memory (one dict of last-seen times per
+route). Stop coordinates come from the in-memory route topology, so the
+computation costs no queries on the hot path.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+
+MIN_INTERVAL_SECONDS = getattr(settings, 'TRACKING_MIN_REPORT_INTERVAL', 5)
+MAX_INTERVAL_SECONDS = getattr(settings, 'TRACKING_MAX_REPORT_INTERVAL', 60)
+MOVING_INTERVAL_SECONDS = 15   # moving, watched, not near a stop
+UNWATCHED_INTERVAL_SECONDS = 30  # moving, nobody polling
+
+DEMAND_WINDOW_SECONDS = 60   # a poller counts as active for this long
+PARKED_SPEED_KMH = 2
+APPROACH_RADIUS_METERS = 500
+
+
+class RouteDemand:
+    """Counts distinct clients polling each route within a sliding window."""
+
+    def __init__(self, window=DEMAND_WINDOW_SECONDS):
+        self.window = window
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def touch(self, route_id, client_key):
+        """
+        Record that ``client_key`` just asked about ``route_id``.
+
+        Returns:
+            Seconds since this client's previous request for the route,
+            or None if it is new (or fell out of the window).
+        """
+        now = time.monotonic()
+        with self._lock:
+            clients = self._seen.setdefault(route_id, {})
+            previous = clients.get(client_key)
+            clients[client_key] = now
+        if previous is None or now - previous > self.window:
+            return None
+        return now - previous
+
+    def count(self, route_id):
+        """Number of clients seen for the route within the window."""
+        cutoff = time.monotonic() - self.window
+        with self._lock:
+            clients = self._seen.get(route_id)
+            if not clients:
+                return 0
+            for key in [k for k, seen in clients.items() if seen < cutoff]:
+                del clients[key]
+            return len(clients)
+
+
+_cadence = {}
+
+
+def distance_to_next_stop(route_id, lat, lon):
+    """Meters from the given point to the route's next stop ahead, or None."""
+    from transport.topology import _haversine_m, get_topology
+    from .eta import AT_STOP_RADIUS_M, locate_bus
+
+    route = get_topology().routes.get(route_id)
+    if route is None:
+        return None
+    from_index, covered = locate_bus(route, lat, lon)
+    if from_index is None:
+        return None
+    if from_index + 1 >= route.stop_count:
+        # One-stop route, or beyond the last stop: only distance is known
+        return route.nearest_stop(lat, lon)[1]
+    if covered == 0.0:
+        # At the stop, or still short of the first one
+        to_stop = _haversine_m(lat, lon, route.stop_lats[from_index], route.stop_lons[from_index])
+        if to_stop > AT_STOP_RADIUS_M:
+            return to_stop
+    return max(0.0, route.segment_m[from_index] - covered)
+
+
+def next_report_interval(route_id, lat, lon, speed=None):
+    """
+    Seconds the driver phone should wait before sending its next fix.
+
+    Args:
+        route_id: Route the bus is on
+        lat, lon: Latest accepted position
+        speed: Latest speed in km/h (None if unknown)
+    """
+    watchers = route_demand.count(route_id)
+    parked = speed is not None and speed < PARKED_SPEED_KMH
+
+    if parked:
+        interval = MAX_INTERVAL_SECONDS if not watchers else MAX_INTERVAL_SECONDS / 2
+    elif not watchers:
+        interval = UNWATCHED_INTERVAL_SECONDS
+    else:
+        interval = MOVING_INTERVAL_SECONDS
+        distance = distance_to_next_stop(route_id, lat, lon)
+        if distance is not None and distance <= APPROACH_RADIUS_METERS:
+            interval = MIN_INTERVAL_SECONDS
+        elif distance is not None and speed:
+            # Report about four times before the bus can reach the stop
+            eta_seconds = distance / (speed / 3.6)
+            interval = min(interval, eta_seconds / 4)
+
+    interval = max(MIN_INTERVAL_SECONDS, min(MAX_INTERVAL_SECONDS, interval))
+    _cadence[route_id] = interval
+    return interval
+
+
+def expected_interval(route_id):
+    """Interval the route's driver was last asked to report at (seconds)."""
+    return _cadence.get(route_id, MOVING_INTERVAL_SECONDS)
+
+
+# Process-wide demand counter fed by the polling endpoints
+route_demand = RouteDemand()
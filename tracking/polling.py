@@ -0,0 +1,75 @@
+"""
+POLL HINTS AND BACKOFF for the student location endpoint.
+
+The server knows when the next fix for a route is due (the interval it
+handed the driver in tracking.pacing), so it tells pollers when asking
+again is worthwhile:
+- retry_after_ms in the body and a matching Cache-Control max-age
+- 429 + Retry-After when a client polls faster than MIN_POLL_SECONDS,
+  doubling the wait for every repeat offence
+
+The rate check runs before any database work and costs one dict lookup.
+"""
+import threading
+
+from django.conf import settings
+
+from .pacing import PARKED_SPEED_KMH, expected_interval, route_demand
+
+
+MIN_POLL_SECONDS = getattr(settings, 'TRACKING_MIN_POLL_SECONDS', 2)
+MAX_BACKOFF_SECONDS = 60
+NOT_RUNNING_RETRY_SECONDS = 30   # bus inactive or never started
+
+
+class PollGovernor:
+    """Tracks per-client strikes and decides whether a poll is admitted."""
+
+    def __init__(self, min_poll=MIN_POLL_SECONDS, max_backoff=MAX_BACKOFF_SECONDS):
+        self.min_poll = min_poll
+        self.max_backoff = max_backoff
+        self._strikes = {}
+        self._lock = threading.Lock()
+
+    def admit(self, route_id, client_key):
+        """
+        Register a poll.
+
+        Returns:
+            (admitted, backoff_seconds). backoff_seconds is 0 when admitted.
+        """
+        since_last = route_demand.touch(route_id, client_key)
+        key = (route_id, client_key)
+
+        with self._lock:
+            if since_last is None or since_last >= self.min_poll:
+                self._strikes.pop(key, None)
+                return True, 0
+            strikes = self._strikes.get(key, 0) + 1
+            self._strikes[key] = strikes
+
+        return False, min(self.min_poll * 2 ** strikes, self.max_backoff)
+
+
+def retry_after_seconds(route_id, bus, now):
+    """
+    Seconds until polling the route again is likely to return new data.
+
+    Args:
+        route_id: Route being polled
+        bus: dict with 'speed' and 'last_updated' (None if not running)
+        now: Current aware datetime
+    """
+    if bus is None:
+        return NOT_RUNNING_RETRY_SECONDS
+
+    interval = expected_interval(route_id)
+    if bus['speed'] is not None and bus['speed'] < PARKED_SPEED_KMH:
+        return interval
+
+    age = (now - bus['last_updated']).total_seconds()
+    return max(MIN_POLL_SECONDS, min(interval - age, interval))
+
+
+# Process-wide governor used by get_bus_location
+poll_governor = PollGovernor()
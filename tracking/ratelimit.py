@@ -0,0 +1,196 @@
+"""
+PER-DRIVER TOKEN-BUCKET RATE LIMITING for location ingest.
+
+A buggy driver app or replayed traffic must not be able to flood
+update_bus_location and starve SQLite for everybody else.
+
+Design:
+- One token bucket per driver id: RATE fixes/second sustained, BURST deep.
+- Excess fixes are coalesced, not failed: the newest excess fix of each
+  driver is parked, replacing any older one. It is applied as soon as the
+  driver's bucket refills (checked on every admitted ingest and by idle
+  ingest writers, see tracking.ingest.housekeeping), or dropped if a
+  newer fix is admitted first or it sits longer than STASH_TTL.
+- Backends:
+    'memory' - a dict per process (default)
+    'shared' - a fixed-size table in an mmap'd file guarded by flock, so
+               all workers on one host share the same buckets (POSIX only)
+  Neither needs Redis, and a take() costs a few microseconds.
+"""
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+
+RATE = getattr(settings, 'TRACKING_INGEST_RATE', 1.0)        # fixes per second
+BURST = getattr(settings, 'TRACKING_INGEST_BURST', 5)
+BACKEND = getattr(settings, 'TRACKING_INGEST_LIMIT_BACKEND', 'memory')
+SHARED_PATH = getattr(
+    settings,
+    'TRACKING_INGEST_LIMIT_PATH',
+    os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+                 'tkr-ingest-buckets'),
+)
+SHARED_SLOTS = 4096
+STASH_TTL = 10.0   # seconds a coalesced fix may wait before it is dropped
+
+
+class MemoryBucketStore:
+    """Token buckets in a per-process dict."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        """
+        Take one token for ``key``.
+
+        Returns:
+            0.0 if a token was taken, else seconds until one is available
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0.0
+            self._buckets[key] = (tokens, now)
+        return (1 - tokens) / rate
+
+
+class SharedBucketStore:
+    """
+    Token buckets in an mmap'd file shared by every worker on the host.
+
+    The file holds SHARED_SLOTS fixed-size slots of (key, tokens, last_time)
+    addressed by open hashing. If no slot is free the request is let through
+    rather than blocked.
+    """
+    SLOT = struct.Struct('<qdd')
+    PROBES = 8
+
+    def __init__(self, path=SHARED_PATH, slots=SHARED_SLOTS):
+        import fcntl
+
+        self._fcntl = fcntl
+        self.slots = slots
+        size = self.SLOT.size * slots
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+        # flock does not exclude threads sharing this descriptor
+        self._lock = threading.Lock()
+
+    def _slot(self, key):
+        for probe in range(self.PROBES):
+            offset = ((key * 2654435761 + probe) % self.slots) * self.SLOT.size
+            stored_key = self.SLOT.unpack_from(self._map, offset)[0]
+            if stored_key in (key, 0):
+                return offset
+        return None
+
+    def take(self, key, rate, burst):
+        """Same contract as MemoryBucketStore.take()."""
+        now = time.time()
+        with self._lock:
+            self._fcntl.flock(self._fd, self._fcntl.LOCK_EX)
+            try:
+                offset = self._slot(key)
+                if offset is None:
+                    return 0.0
+                stored_key, tokens, last = self.SLOT.unpack_from(self._map, offset)
+                if stored_key != key:
+                    tokens, last = burst, now
+                tokens = min(burst, tokens + max(now - last, 0) * rate)
+                if tokens >= 1:
+                    self.SLOT.pack_into(self._map, offset, key, tokens - 1, now)
+                    return 0.0
+                self.SLOT.pack_into(self._map, offset, key, tokens, now)
+            finally:
+                self._fcntl.flock(self._fd, self._fcntl.LOCK_UN)
+        return (1 - tokens) / rate
+
+
+class IngestLimiter:
+    """Admits fixes per driver and coalesces the excess."""
+
+    def __init__(self, store, rate=RATE, burst=BURST):
+        self.store = store
+        self.rate = rate
+        self.burst = burst
+        self._stash = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            'admitted': 0,
+            'coalesced': 0,
+            'released': 0,
+            'superseded': 0,
+            'expired': 0,
+        }
+
+    def admit(self, driver_id, route_id, fix):
+        """
+        Try to admit a fix.
+
+        Returns:
+            0.0 if the fix should be applied now, else the seconds until the
+            driver may send again (the fix has been parked as the latest).
+        """
+        wait = self.store.take(driver_id, self.rate, self.burst)
+        with self._lock:
+            if wait == 0.0:
+                self._counters['admitted'] += 1
+                if self._stash.pop(driver_id, None) is not None:
+                    self._counters['superseded'] += 1
+                return 0.0
+            if driver_id in self._stash:
+                self._counters['superseded'] += 1
+            self._stash[driver_id] = (route_id, fix, time.monotonic())
+            self._counters['coalesced'] += 1
+        return wait
+
+    def release_due(self):
+        """
+        Pop parked fixes whose driver has a token again.
+
+        Returns:
+            list of (driver_id, route_id, fix) to apply
+        """
+        if not self._stash:
+            return []
+
+        now = time.monotonic()
+        released = []
+        with self._lock:
+            for driver_id, (route_id, fix, parked_at) in list(self._stash.items()):
+                if now - parked_at > STASH_TTL:
+                    del self._stash[driver_id]
+                    self._counters['expired'] += 1
+                elif self.store.take(driver_id, self.rate, self.burst) == 0.0:
+                    del self._stash[driver_id]
+                    self._counters['released'] += 1
+                    released.append((driver_id, route_id, fix))
+        return released
+
+    def metrics(self):
+        """Counters for this process plus the number of parked fixes."""
+        with self._lock:
+            return dict(self._counters, pending=len(self._stash))
+
+
+def _build_store():
+    if BACKEND == 'shared':
+        return SharedBucketStore()
+    return MemoryBucketStore()
+
+
+# Process-wide limiter used by the ingest view
+ingest_limiter = IngestLimiter(_build_store())
@@ -0,0 +1,228 @@
+"""
+DRIVER BEHAVIOUR SCORECARDS from GPSLog.
+
+    score_pending_days()          # every driver, days not yet scored up to yesterday
+    score_driver_days(driver_id, start, end)
+
+Design:
+- Incremental: an AggregationWatermark records the last day scored, so a
+  nightly run only looks at GPSLog after it (by the timestamp index) to
+  find the drivers to score, each resuming after their newest
+  DriverScorecard. Today is never scored because it is still running.
+- Chunked: fixes are loaded CHUNK_DAYS at a time per driver as numpy
+  arrays (tracking.adherence.load_fixes), which bounds memory on long
+  backfills.
+- Per driver-day, all metrics are array operations over consecutive fixes:
+    * distance: haversine between neighbours
+    * speed: reported speed, else distance / time to the previous fix
+    * speeding: intervals above the route's Route.speed_limit_kmh; an
+      episode is a run of such intervals
+    * harsh acceleration / braking: speed change per second between fixes
+      at most ACCEL_MAX_GAP apart
+    * idle: intervals below IDLE_SPEED_KMH
+  Intervals longer than MAX_GAP_SECONDS (phone off, tunnel) are skipped,
+  for distance as much as for time.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .adherence import day_boundaries, haversine_m, load_fixes
+
+
+CHUNK_DAYS = 7
+MAX_GAP_SECONDS = 120
+ACCEL_MAX_GAP = 10
+HARSH_ACCEL_MS2 = 3.0
+HARSH_BRAKE_MS2 = -3.5
+IDLE_SPEED_KMH = 2
+DEFAULT_SPEED_LIMIT_KMH = 50
+
+# Score penalties
+SPEEDING_PENALTY = 5
+HARSH_EVENT_PENALTY = 3
+IDLE_ALLOWANCE_SECONDS = 30 * 60   # dwell at stops is normal
+IDLE_PENALTY_PER_5_MIN = 1
+
+WATERMARK_NAME = 'driver_scorecards'
+
+
+def _episodes(flags):
+    """Number of runs of True in a boolean array."""
+    if not flags.size:
+        return 0
+    return int(flags[0]) + int(np.count_nonzero(flags[1:] & ~flags[:-1]))
+
+
+def day_metrics(ts, lats, lons, speeds, limits):
+    """
+    Behaviour metrics of one driver-day.
+
+    Args:
+        ts, lats, lons, speeds: per-fix arrays, oldest first (speed NaN if unknown)
+        limits: per-fix speed limit of the fix's route (km/h)
+    """
+    dt = np.diff(ts)
+    seg_m = haversine_m(lats[:-1], lons[:-1], lats[1:], lons[1:])
+    valid = (dt > 0) & (dt <= MAX_GAP_SECONDS)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        derived = np.where(dt > 0, seg_m / dt * 3.6, np.nan)
+    # Speed of each fix: reported, else implied by the interval ending there
+    fix_speed = speeds.copy()
+    missing = np.isnan(fix_speed)
+    missing[0] = False
+    fix_speed[1:][missing[1:]] = derived[missing[1:]]
+    fix_speed = np.nan_to_num(fix_speed)
+
+    interval_speed = fix_speed[1:]
+    speeding = valid & (interval_speed > limits[1:])
+    idle = valid & (interval_speed < IDLE_SPEED_KMH)
+
+    close = valid & (dt <= ACCEL_MAX_GAP)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        accel = np.where(close, np.diff(fix_speed) / 3.6 / dt, 0.0)
+
+    return {
+        'fix_count': int(ts.size),
+        'distance_km': float(seg_m[valid].sum() / 1000),
+        'driving_seconds': int(dt[valid].sum()),
+        'max_speed': float(fix_speed.max()) if fix_speed.size else None,
+        'speeding_episodes': _episodes(speeding),
+        'speeding_seconds': int(dt[speeding].sum()),
+        'harsh_accelerations': _episodes(accel > HARSH_ACCEL_MS2),
+        'harsh_brakings': _episodes(accel < HARSH_BRAKE_MS2),
+        'idle_seconds': int(dt[idle].sum()),
+    }
+
+
+def day_score(metrics):
+    excess_idle = max(0, metrics['idle_seconds'] - IDLE_ALLOWANCE_SECONDS)
+    penalty = (
+        SPEEDING_PENALTY * metrics['speeding_episodes'] +
+        HARSH_EVENT_PENALTY * (metrics['harsh_accelerations'] + metrics['harsh_brakings']) +
+        IDLE_PENALTY_PER_5_MIN * (excess_idle // 300)
+    )
+    return max(0, 100 - penalty)
+
+
+def _route_limits():
+    from transport.topology import get_topology
+
+    routes = get_topology().routes
+    size = max(routes, default=0) + 1
+    limits = np.full(size + 1, DEFAULT_SPEED_LIMIT_KMH, dtype=np.float64)
+    for route_id, route in routes.items():
+        limits[route_id] = route.speed_limit_kmh
+    return limits   # limits[-1] is the default for unknown routes
+
+
+def score_driver_days(driver_id, start_date, end_date, limits=None):
+    """
+    (Re)compute scorecards of one driver for [start_date, end_date].
+
+    Returns:
+        Number of scorecards written
+    """
+    from .models import DriverScorecard
+
+    if limits is None:
+        limits = _route_limits()
+    tz = timezone.get_current_timezone()
+
+    written = 0
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        chunk_end = min(chunk_start + timedelta(days=CHUNK_DAYS - 1), end_date)
+        dates, edges = day_boundaries(chunk_start, chunk_end)
+        ts, columns = load_fixes(
+            datetime.fromtimestamp(edges[0], tz=tz),
+            datetime.fromtimestamp(edges[-1], tz=tz),
+            fields=('latitude', 'longitude', 'speed', 'route_id'),
+            driver_id=driver_id,
+        )
+        route_ids = columns['route_id']
+        fix_limits = limits[np.where((route_ids >= 0) & (route_ids < limits.size - 1), route_ids, -1)]
+        day_index = np.searchsorted(ts, edges)
+
+        cards = []
+        for day, service_date in enumerate(dates):
+            lo, hi = day_index[day], day_index[day + 1]
+            if hi - lo < 2:
+                continue
+            metrics = day_metrics(
+                ts[lo:hi], columns['latitude'][lo:hi], columns['longitude'][lo:hi],
+                columns['speed'][lo:hi], fix_limits[lo:hi],
+            )
+            cards.append(DriverScorecard(
+                driver_id=driver_id,
+                service_date=service_date,
+                score=day_score(metrics),
+                **metrics,
+            ))
+
+        with transaction.atomic():
+            DriverScorecard.objects.filter(
+                driver_id=driver_id,
+                service_date__range=(chunk_start, chunk_end),
+            ).delete()
+            DriverScorecard.objects.bulk_create(cards)
+        written += len(cards)
+        chunk_start = chunk_end + timedelta(days=1)
+    return written
+
+
+def score_pending_days(until=None, driver_ids=None):
+    """
+    Score every driver-day after the watermark, up to ``until`` (default
+    yesterday), then move the watermark. Runs limited to ``driver_ids``
+    leave the watermark alone.
+
+    Returns:
+        Number of scorecards written
+    """
+    from .models import AggregationWatermark, DriverScorecard, GPSLog
+
+    until = until or timezone.localdate() - timedelta(days=1)
+    watermark = AggregationWatermark.objects.filter(name=WATERMARK_NAME).first()
+    if watermark is not None:
+        since = watermark.last_date + timedelta(days=1)
+    else:
+        first = GPSLog.objects.aggregate(first=Min('timestamp'))['first']
+        if first is None:
+            return 0
+        since = timezone.localdate(first)
+    if since > until:
+        return 0
+
+    tz = timezone.get_current_timezone()
+    _, edges = day_boundaries(since, until)
+    fixes = GPSLog.objects.filter(
+        timestamp__gte=datetime.fromtimestamp(edges[0], tz=tz),
+        timestamp__lt=datetime.fromtimestamp(edges[-1], tz=tz),
+    )
+    scorecards = DriverScorecard.objects.filter(service_date__gte=since)
+    if driver_ids is not None:
+        fixes = fixes.filter(driver_id__in=driver_ids)
+        scorecards = scorecards.filter(driver_id__in=driver_ids)
+    # Cards already inside the window (a targeted rerun) are not redone
+    last_scored = dict(
+        scorecards.values('driver_id').annotate(last=Max('service_date')).values_list('driver_id', 'last')
+    )
+    first_fix = fixes.values('driver_id').annotate(first=Min('timestamp')).values_list('driver_id', 'first')
+
+    limits = _route_limits()
+    written = 0
+    for driver_id, first in first_fix:
+        start = timezone.localdate(first)
+        if driver_id in last_scored:
+            start = max(start, last_scored[driver_id] + timedelta(days=1))
+        if start <= until:
+            written += score_driver_days(driver_id, start, until, limits=limits)
+
+    if driver_ids is None:
+        AggregationWatermark.objects.update_or_create(name=WATERMARK_NAME, defaults={'last_date': until})
+    return written
@@ -0,0 +1,488 @@
+"""
+SEGMENT TRAVEL AND DWELL STATISTICS.
+
+Per (stop, kind, time-of-day bucket) we keep, in SegmentStat:
+- count / mean / m2: Welford running mean and variance
+- sketch: counts on log-spaced bins (each bin SKETCH_GAMMA times wider
+  than the last), giving quantiles to within ~7% relative error
+
+Both parts merge by addition (Chan's formula for the moments), so history
+is never rescanned. Observations come from one of two feeders, picked by
+TRACKING_SEGMENT_STATS_SOURCE:
+    'ingest' - StopVisitTracker watches accepted fixes as they arrive (default)
+    'batch'  - aggregate_new_days() replays each new day of GPSLog once,
+               tracked by an AggregationWatermark
+Both hand observations to segment_aggregator, which buffers them and
+merges into the table in batches, like the validation ErrorRecorder.
+Idle ingest writers call flush_due() (tracking.ingest.housekeeping), so
+the last observations of a trip are written without waiting for the
+next one.
+
+Readers: segment_profile() for re-planning Stop.arrival_time, and
+eta_seconds() for arrival estimates.
+"""
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .adherence import day_boundaries, haversine_m, load_fixes
+
+
+SOURCE = getattr(settings, 'TRACKING_SEGMENT_STATS_SOURCE', 'ingest')
+BUCKET_MINUTES = 30
+VISIT_RADIUS_M = 75            # within this distance the bus is "at" the stop
+MAX_SEGMENT_SECONDS = 3600     # longer stop-to-stop times are not a normal trip
+MAX_VISIT_GAP_SECONDS = 600    # a silence this long forgets the visit in progress
+FLUSH_INTERVAL = 60
+FLUSH_SIZE = 200
+
+SKETCH_GAMMA = 1.15
+SKETCH_BINS = 64               # bin 63 starts at ~1.15^62 s, about 50 minutes
+_LOG_GAMMA = math.log(SKETCH_GAMMA)
+
+PROFILE_CACHE_SECONDS = 600
+WATERMARK_NAME = 'segment_stats'
+
+
+# ---------------------------------------------------------------------------
+# Mergeable statistics
+# ---------------------------------------------------------------------------
+
+def sketch_bin(seconds):
+    if seconds < 1:
+        return 0
+    return min(SKETCH_BINS - 1, int(math.log(seconds) / _LOG_GAMMA) + 1)
+
+
+def sketch_quantile(counts, q):
+    """Approximate q-quantile (0..1) from sketch counts, None if empty."""
+    total = sum(counts)
+    if not total:
+        return None
+    rank = q * (total - 1)
+    seen = 0
+    for i, n in enumerate(counts):
+        seen += n
+        if seen > rank:
+            if i == 0:
+                return 0.5
+            low, high = SKETCH_GAMMA ** (i - 1), SKETCH_GAMMA ** i
+            return math.sqrt(low * high)
+    return SKETCH_GAMMA ** (len(counts) - 1)
+
+
+class RunningStat:
+    """Count, mean, m2, min, max and sketch of one series; merges with another."""
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max', 'sketch')
+
+    def __init__(self, count=0, mean=0.0, m2=0.0, min=None, max=None, sketch=None):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.min = min
+        self.max = max
+        self.sketch = list(sketch or []) + [0] * (SKETCH_BINS - len(sketch or []))
+
+    def add(self, seconds):
+        self.count += 1
+        delta = seconds - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (seconds - self.mean)
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+        self.sketch[sketch_bin(seconds)] += 1
+
+    def merge(self, other):
+        if not other.count:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self.sketch = [a + b for a, b in zip(self.sketch, other.sketch)]
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+
+def time_bucket(moment):
+    local = timezone.localtime(moment)
+    return (local.hour * 60 + local.minute) // BUCKET_MINUTES
+
+
+# ---------------------------------------------------------------------------
+# Buffered writer
+# ---------------------------------------------------------------------------
+
+class SegmentAggregator:
+    """
+    Buffers observations per (route, stop, kind, bucket) and merges them
+    into SegmentStat rows in one transaction per flush.
+    """
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL, flush_size=FLUSH_SIZE):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._pending = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def observe(self, route_id, stop_id, kind, bucket, seconds, autoflush=True):
+        with self._lock:
+            stat = self._pending.get((route_id, stop_id, kind, bucket))
+            if stat is None:
+                stat = self._pending[(route_id, stop_id, kind, bucket)] = RunningStat()
+            stat.add(seconds)
+            due = autoflush and (
+                len(self._pending) >= self.flush_size or
+                time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def flush_due(self):
+        """Flush if anything has waited flush_interval; for callers with no new observation."""
+        if self._pending and time.monotonic() - self._last_flush >= self.flush_interval:
+            return self.flush()
+        return 0
+
+    def flush(self):
+        """Merge pending observations. Returns the number of rows touched."""
+        from django.db import transaction
+        from .models import SegmentStat
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        with transaction.atomic():
+            existing = {
+                (row.stop_id, row.kind, row.bucket): row
+                for row in SegmentStat.objects.select_for_update().filter(
+                    stop_id__in={stop_id for _, stop_id, _, _ in pending}
+                )
+            }
+            now = timezone.now()
+            to_update, to_create = [], []
+            for (route_id, stop_id, kind, bucket), stat in pending.items():
+                row = existing.get((stop_id, kind, bucket))
+                if row is None:
+                    row = SegmentStat(route_id=route_id, stop_id=stop_id, kind=kind, bucket=bucket)
+                    to_create.append(row)
+                else:
+                    row.updated_at = now   # bulk_update skips auto_now
+                    to_update.append(row)
+                merged = RunningStat(row.count, row.mean, row.m2, row.min_seconds, row.max_seconds, row.sketch)
+                merged.merge(stat)
+                row.count, row.mean, row.m2 = merged.count, merged.mean, merged.m2
+                row.min_seconds, row.max_seconds, row.sketch = merged.min, merged.max, merged.sketch
+
+            if to_update:
+                SegmentStat.objects.bulk_update(
+                    to_update, ['count', 'mean', 'm2', 'min_seconds', 'max_seconds', 'sketch', 'updated_at']
+                )
+            if to_create:
+                SegmentStat.objects.bulk_create(to_create)
+        return len(pending)
+
+
+# ---------------------------------------------------------------------------
+# Feeders
+# ---------------------------------------------------------------------------
+
+class StopVisitTracker:
+    """
+    Turns a route's live fixes into stop visits.
+
+    A visit starts with the first fix within VISIT_RADIUS_M of a stop and
+    ends with the first fix outside it. Visit length is a dwell
+    observation; the gap from leaving stop i to reaching stop i+1 is a
+    travel observation. Without an aggregator only arrivals are reported.
+    """
+
+    def __init__(self, aggregator):
+        self.aggregator = aggregator
+        self._state = {}   # route_id -> dict(stop, arrived, last_in, left, seen)
+        self._lock = threading.Lock()
+
+    def feed(self, route_id, lat, lon, moment=None):
+        """Index of the stop whose visit this fix starts, else None."""
+        from transport.topology import get_topology
+
+        route = get_topology().routes.get(route_id)
+        if route is None or not route.stop_count:
+            return None
+        moment = moment or timezone.now()
+        ts = moment.timestamp()
+        index, meters = route.nearest_stop(lat, lon)
+        at_stop = index if meters <= VISIT_RADIUS_M else None
+
+        observations = []
+        with self._lock:
+            state = self._state.get(route_id)
+            if state is None or ts - state['seen'] > MAX_VISIT_GAP_SECONDS:
+                state = self._state[route_id] = {'stop': None, 'arrived': None, 'last_in': None, 'left': None}
+            state['seen'] = ts
+
+            if state['stop'] is not None:
+                if at_stop == state['stop']:
+                    state['last_in'] = ts
+                    return None
+                observations.append(
+                    (state['stop'], 'dwell', state['arrived'], state['last_in'] - state['arrived'])
+                )
+                state['left'] = (state['stop'], state['last_in'])
+                state['stop'] = None
+
+            if at_stop is not None:
+                left = state['left']
+                if left is not None and at_stop == left[0] + 1 and ts - left[1] <= MAX_SEGMENT_SECONDS:
+                    observations.append((left[0], 'travel', left[1], ts - left[1]))
+                state['stop'], state['arrived'], state['last_in'] = at_stop, ts, ts
+
+        if self.aggregator is not None:
+            tz = timezone.get_current_timezone()
+            for stop_index, kind, started, seconds in observations:
+                bucket = time_bucket(datetime.fromtimestamp(started, tz=tz))
+                self.aggregator.observe(route_id, route.stop_ids[stop_index], kind, bucket, seconds)
+        return at_stop
+
+
+def day_visits(ts, lats, lons, stop_lats, stop_lons):
+    """
+    Stop visits in one route-day trajectory.
+
+    Returns:
+        list of (stop index, arrived ts, left ts), oldest first
+    """
+    if not ts.size:
+        return []
+    dist = haversine_m(
+        lats[:, None], lons[:, None],
+        np.asarray(stop_lats)[None, :], np.asarray(stop_lons)[None, :],
+    )
+    nearest = dist.argmin(axis=1)
+    at_stop = np.where(dist[np.arange(ts.size), nearest] <= VISIT_RADIUS_M, nearest, -1)
+
+    # Runs of the same at_stop value, also split where the phone went silent
+    breaks = np.flatnonzero(
+        (np.diff(at_stop) != 0) | (np.diff(ts) > MAX_VISIT_GAP_SECONDS)
+    ) + 1
+    starts = np.concatenate(([0], breaks))
+    ends = np.concatenate((breaks, [ts.size])) - 1
+    return [
+        (int(at_stop[s]), float(ts[s]), float(ts[e]))
+        for s, e in zip(starts, ends)
+        if at_stop[s] >= 0
+    ]
+
+
+def aggregate_days(start_date, end_date, aggregator=None):
+    """
+    Feed every route-day of GPSLog in [start_date, end_date] to the aggregator.
+
+    Returns:
+        Number of observations recorded
+    """
+    from transport.topology import get_topology
+
+    aggregator = aggregator or segment_aggregator
+    tz = timezone.get_current_timezone()
+    dates, edges = day_boundaries(start_date, end_date)
+    since = datetime.fromtimestamp(edges[0], tz=tz)
+    until = datetime.fromtimestamp(edges[-1], tz=tz)
+
+    observed = 0
+    for route in get_topology().routes.values():
+        if not route.stop_count:
+            continue
+        ts, columns = load_fixes(since, until, fields=('latitude', 'longitude'), route_id=route.id)
+        if not ts.size:
+            continue
+        day_index = np.searchsorted(ts, edges)
+
+        for day in range(len(dates)):
+            lo, hi = day_index[day], day_index[day + 1]
+            visits = day_visits(
+                ts[lo:hi], columns['latitude'][lo:hi], columns['longitude'][lo:hi],
+                route.stop_lats, route.stop_lons,
+            )
+            previous = None
+            for index, arrived, left in visits:
+                bucket = time_bucket(datetime.fromtimestamp(arrived, tz=tz))
+                aggregator.observe(route.id, route.stop_ids[index], 'dwell', bucket, left - arrived, autoflush=False)
+                observed += 1
+                if previous is not None and index == previous[0] + 1 and arrived - previous[2] <= MAX_SEGMENT_SECONDS:
+                    bucket = time_bucket(datetime.fromtimestamp(previous[2], tz=tz))
+                    aggregator.observe(
+                        route.id, route.stop_ids[previous[0]], 'travel', bucket,
+                        arrived - previous[2], autoflush=False,
+                    )
+                    observed += 1
+                previous = (index, arrived, left)
+
+    aggregator.flush()
+    return observed
+
+
+def aggregate_new_days(until=None):
+    """
+    Batch feeder: aggregate each day after the watermark up to ``until``
+    (default yesterday), then move the watermark.
+
+    Does nothing unless SOURCE is 'batch': with the 'ingest' feeder the
+    same visits are already in SegmentStat and would be counted twice.
+
+    Returns:
+        (first date, last date, observations) or None if nothing was due
+    """
+    from django.db.models import Min
+    from .models import AggregationWatermark, GPSLog
+
+    if SOURCE != 'batch':
+        return None
+    until = until or timezone.localdate() - timedelta(days=1)
+    watermark = AggregationWatermark.objects.filter(name=WATERMARK_NAME).first()
+    if watermark is not None:
+        start = watermark.last_date + timedelta(days=1)
+    else:
+        first = GPSLog.objects.aggregate(first=Min('timestamp'))['first']
+        if first is None:
+            return None
+        start = timezone.localdate(first)
+    if start > until:
+        return None
+
+    observed = aggregate_days(start, until)
+    AggregationWatermark.objects.update_or_create(name=WATERMARK_NAME, defaults={'last_date': until})
+    return start, until, observed
+
+
+# ---------------------------------------------------------------------------
+# Readers
+# ---------------------------------------------------------------------------
+
+def segment_profile(route_id, cached_only=False):
+    """
+    Statistics of a route, cached for PROFILE_CACHE_SECONDS.
+
+    With ``cached_only`` a cache miss returns None instead of querying.
+
+    Returns:
+        {(stop_id, kind, bucket): {'count', 'mean', 'stddev', 'p50', 'p90', 'min', 'max'}}
+    """
+    from .models import SegmentStat
+
+    key = f'tracking:segment_profile:{route_id}'
+    profile = cache.get(key)
+    if profile is None and not cached_only:
+        profile = {}
+        for row in SegmentStat.objects.filter(route_id=route_id):
+            stat = RunningStat(row.count, row.mean, row.m2)
+            profile[(row.stop_id, row.kind, row.bucket)] = {
+                'count': row.count,
+                'mean': row.mean,
+                'stddev': math.sqrt(stat.variance),
+                'p50': sketch_quantile(row.sketch, 0.5),
+                'p90': sketch_quantile(row.sketch, 0.9),
+                'min': row.min_seconds,
+                'max': row.max_seconds,
+            }
+        cache.set(key, profile, PROFILE_CACHE_SECONDS)
+    return profile
+
+
+def _typical(profile, stop_id, kind, bucket):
+    """Median for the bucket, else for the nearest bucket that has data."""
+    for distance in range(24 * 60 // BUCKET_MINUTES):
+        for candidate in (bucket - distance, bucket + distance):
+            entry = profile.get((stop_id, kind, candidate % (24 * 60 // BUCKET_MINUTES)))
+            if entry and entry['p50'] is not None:
+                return entry['p50']
+    return None
+
+
+def eta_seconds(route_id, from_index, to_index, at=None, cached_only=False):
+    """
+    Typical seconds from leaving stop ``from_index`` to reaching ``to_index``
+    (median travel plus intermediate dwells), or None without enough data
+    (or, with ``cached_only``, when the profile is not cached).
+    """
+    from transport.topology import get_topology
+
+    route = get_topology().routes.get(route_id)
+    if route is None or not 0 <= from_index < to_index < route.stop_count:
+        return None
+    profile = segment_profile(route_id, cached_only=cached_only)
+    if profile is None:
+        return None
+    bucket = time_bucket(at or timezone.now())
+
+    total = 0.0
+    for i in range(from_index, to_index):
+        travel = _typical(profile, route.stop_ids[i], 'travel', bucket)
+        if travel is None:
+            return None
+        total += travel
+        if i + 1 < to_index:
+            total += _typical(profile, route.stop_ids[i + 1], 'dwell', bucket) or 0
+    return total
+
+
+def suggest_arrival_times(route_id):
+    """
+    Planned versus typical stop times for re-planning Stop.arrival_time.
+
+    Starts at the first stop's planned time and adds median travel and
+    dwell for the time-of-day bucket reached so far.
+
+    Returns:
+        list of dicts per stop: stop_id, name, planned, suggested ("HH:MM"
+        or None), travel_p50/p90 to the next stop and dwell_p50 in seconds
+    """
+    from transport.topology import get_topology
+
+    route = get_topology().routes.get(route_id)
+    if route is None:
+        return []
+    profile = segment_profile(route_id)
+
+    first = route.stop_arrivals[0] if route.stop_count else None
+    clock = first.hour * 3600 + first.minute * 60 if first else None
+    rows = []
+    for i, stop_id in enumerate(route.stop_ids):
+        bucket = (clock // 60 // BUCKET_MINUTES) % (24 * 60 // BUCKET_MINUTES) if clock is not None else 0
+        travel = profile.get((stop_id, 'travel', bucket)) or {}
+        dwell = _typical(profile, stop_id, 'dwell', bucket)
+        planned = route.stop_arrivals[i]
+        rows.append({
+            'stop_id': stop_id,
+            'name': route.stop_names[i],
+            'planned': planned.strftime('%H:%M') if planned else None,
+            'suggested': '%02d:%02d' % divmod(round(clock / 60) % (24 * 60), 60) if clock is not None else None,
+            'travel_p50': travel.get('p50'),
+            'travel_p90': travel.get('p90'),
+            'dwell_p50': dwell,
+        })
+        if clock is not None and i + 1 < route.stop_count:
+            step = _typical(profile, stop_id, 'travel', bucket)
+            clock = clock + (dwell or 0) + step if step is not None else None
+    return rows
+
+
+segment_aggregator = SegmentAggregator()
+# Always fed by ingest (stop arrivals for tracking.events); records
+# observations only when this is the configured source
+stop_visits = StopVisitTracker(segment_aggregator if SOURCE == 'ingest' else None)
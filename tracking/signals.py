@@ -0,0 +1,27 @@
+"""
+Cache invalidation for tracking's in-memory indexes.
+
+Connected in TrackingConfig.ready(). As in transport.signals, invalidation
+waits for the transaction to commit so no reader rebuilds the index from
+rows that are not committed yet (or are later rolled back).
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .alerts import invalidate_alert_index
+
+
+ALERT_SENDERS = ['tracking.StopAlert']
+
+
+def stop_alerts_changed(sender, **kwargs):
+    transaction.on_commit(invalidate_alert_index)
+
+
+for sender in ALERT_SENDERS:
+    for signal in (post_save, post_delete):
+        signal.connect(
+            stop_alerts_changed,
+            sender=sender,
+            dispatch_uid=f'stop_alerts_changed:{sender}:{signal is post_save}',
+        )
@@ -0,0 +1,476 @@
+"""
+FLEET SIMULATOR for reproducing rush-hour load.
+
+    fleet = build_fleet(routes=20, stops_per_route=12, students=500, seed=1)
+    transport = InProcessTransport()            # or HttpTransport('http://127.0.0.1:8000')
+    recorder = asyncio.run(run_fleet(transport, fleet, duration=60))
+    recorder = asyncio.run(replay_logs(transport, since, until, speedup=10))
+    recorder.report()   # per endpoint: requests, req/s, p50/p95/p99 ms, statuses
+
+Used by ``manage.py simulate_fleet``.
+
+Design:
+- Simulated data is ordinary rows marked by name: routes are called
+  "SIM <n>" and users "sim-...". clear_fleet() removes them (cascading to
+  their trackers, logs and events); build_fleet() clears first, then
+  bulk-creates routes, stops, drivers and students. Users get an unusable
+  password, so nothing is hashed.
+- Every request goes through the real endpoints, either in process
+  through django.test.Client (calls run in a thread pool, so the ingest
+  queue, limiter and caches behave as under a threaded server) or over
+  HTTP to a running server with tracking.loadgen connections. For HTTP the
+  login session and CSRF cookie are created directly in the database.
+- Buses drive their route's stop polyline at a steady speed, one fix per
+  interval, or as often as next_report_ms asks when following hints.
+  Students poll their route's location, a share of them the fleet
+  viewport instead.
+- Replay reads GPSLog rows in (timestamp, id) order one chunk at a time
+  and posts each as its driver, compressing the gaps by ``speedup``.
+  Fixes land on the driver's current route, as any ingest does.
+"""
+import asyncio
+import bisect
+import json
+import math
+import random
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time as dt_time
+from importlib import import_module
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .loadgen import HttpConnection, percentile
+from .validation import haversine_m
+from .wire import PACKED_CONTENT_TYPE, pack_fixes
+
+
+ROUTE_PREFIX = 'SIM '
+USER_PREFIX = 'sim-'
+CENTRE = (17.3850, 78.4867)
+SPREAD_M = 15000          # route start points within this distance of CENTRE
+STOP_SPACING_M = 800
+REPLAY_CHUNK = 2000
+
+# endpoint -> (sync path, async path)
+PATHS = {
+    'ingest': ('/api/driver/update-location/', '/api/async/driver/update-location/'),
+    'location': ('/api/student/bus-location/{route}/', '/api/async/student/bus-location/{route}/'),
+    'fleet': ('/api/fleet/', '/api/async/fleet/'),
+}
+
+
+# ---------------------------------------------------------------------------
+# Data
+# ---------------------------------------------------------------------------
+
+class SimRoute:
+    """A route's id, driver user and stop polyline."""
+
+    def __init__(self, route_id, driver_user, points):
+        self.id = route_id
+        self.driver_user = driver_user
+        self.points = points
+        self.cumulative = [0.0]
+        for (lat1, lon1), (lat2, lon2) in zip(points, points[1:]):
+            self.cumulative.append(self.cumulative[-1] + haversine_m(lat1, lon1, lat2, lon2))
+
+    @property
+    def length(self):
+        return self.cumulative[-1]
+
+    def position(self, distance):
+        """(lat, lon, heading) ``distance`` meters along the route, wrapping at the end."""
+        distance %= self.length
+        index = min(bisect.bisect_right(self.cumulative, distance) - 1, len(self.points) - 2)
+        (lat1, lon1), (lat2, lon2) = self.points[index], self.points[index + 1]
+        span = self.cumulative[index + 1] - self.cumulative[index]
+        share = (distance - self.cumulative[index]) / span if span else 0.0
+        heading = math.degrees(math.atan2(
+            (lon2 - lon1) * math.cos(math.radians(lat1)), lat2 - lat1
+        )) % 360
+        return lat1 + (lat2 - lat1) * share, lon1 + (lon2 - lon1) * share, heading
+
+
+class SimFleet:
+    def __init__(self, routes, students):
+        self.routes = routes                # list of SimRoute
+        self.students = students            # list of (User, route_id)
+
+
+def _offset(lat, lon, meters, bearing):
+    rad = math.radians(bearing)
+    return (
+        lat + meters * math.cos(rad) / 111320,
+        lon + meters * math.sin(rad) / (111320 * math.cos(math.radians(lat))),
+    )
+
+
+def clear_fleet():
+    """Delete simulated routes and users; returns the number of routes removed."""
+    from django.contrib.auth.models import User
+    from transport.models import Route
+    from transport.topology import invalidate_topology
+
+    deleted = Route.objects.filter(name__startswith=ROUTE_PREFIX).count()
+    Route.objects.filter(name__startswith=ROUTE_PREFIX).delete()
+    User.objects.filter(username__startswith=USER_PREFIX).delete()
+    invalidate_topology()
+    return deleted
+
+
+def build_fleet(routes, stops_per_route, students, seed=0):
+    """Replace the simulated data with ``routes`` routes and ``students`` students."""
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+    from django.db import transaction
+    from busapp.models import Profile
+    from transport.models import Route, Stop
+    from transport.topology import invalidate_topology
+    from users.models import Driver, Student
+
+    rng = random.Random(seed)
+    unusable = make_password(None)
+    clear_fleet()
+
+    with transaction.atomic():
+        route_rows = Route.objects.bulk_create(
+            Route(
+                name=f'{ROUTE_PREFIX}{n}', bus_number=f'SIM{n:04d}',
+                start_location=f'Sim start {n}', end_location='Campus',
+            )
+            for n in range(1, routes + 1)
+        )
+        geometry = {}
+        stops = []
+        for route in route_rows:
+            lat, lon = _offset(*CENTRE, rng.uniform(0, SPREAD_M), rng.uniform(0, 360))
+            bearing = rng.uniform(0, 360)
+            points = []
+            for order in range(stops_per_route):
+                points.append((lat, lon))
+                stops.append(Stop(
+                    route=route, name=f'Sim stop {route.pk}-{order}', order=order,
+                    latitude=lat, longitude=lon,
+                    arrival_time=dt_time(7 + order * 3 // 60, order * 3 % 60),
+                ))
+                bearing += rng.uniform(-30, 30)
+                lat, lon = _offset(lat, lon, STOP_SPACING_M * rng.uniform(0.7, 1.3), bearing)
+            geometry[route.pk] = points
+        stops = Stop.objects.bulk_create(stops)
+
+        users = User.objects.bulk_create(
+            [User(username=f'{USER_PREFIX}driver-{route.pk}', password=unusable) for route in route_rows] +
+            [User(username=f'{USER_PREFIX}student-{n}', password=unusable) for n in range(students)]
+        )
+        driver_users, student_users = users[:routes], users[routes:]
+        Profile.objects.bulk_create(
+            [Profile(user=user, role='driver') for user in driver_users] +
+            [Profile(user=user, role='student') for user in student_users]
+        )
+        Driver.objects.bulk_create(
+            Driver(user=user, license_number=f'SIM-{route.pk}', assigned_route=route)
+            for user, route in zip(driver_users, route_rows)
+        )
+        stops_by_route = defaultdict(list)
+        for stop in stops:
+            stops_by_route[stop.route_id].append(stop)
+        assignments = [(user, rng.choice(route_rows)) for user in student_users]
+        Student.objects.bulk_create(
+            Student(
+                user=user, hall_ticket=f'SIM{user.pk}', active_route=route,
+                boarding_stop=rng.choice(stops_by_route[route.pk]),
+            )
+            for user, route in assignments
+        )
+    invalidate_topology()
+
+    return SimFleet(
+        [SimRoute(route.pk, user, geometry[route.pk]) for route, user in zip(route_rows, driver_users)],
+        [(user, route.pk) for user, route in assignments],
+    )
+
+
+# ---------------------------------------------------------------------------
+# Transports
+# ---------------------------------------------------------------------------
+
+class InProcessTransport:
+    """Requests through django.test.Client, run in a thread pool."""
+
+    def __init__(self, workers=32):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sim')
+
+    def session(self, user):
+        from django.test import Client
+
+        client = Client(SERVER_NAME='localhost', raise_request_exception=False)
+        client.force_login(user)
+        return client
+
+    @staticmethod
+    def _call(client, method, path, body, content_type):
+        if method == 'GET':
+            response = client.get(path)
+        else:
+            response = client.post(path, body, content_type=content_type)
+        return response.status_code, response.content
+
+    async def request(self, session, method, path, body=b'', content_type=None):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._pool, self._call, session, method, path, body, content_type
+        )
+
+
+class HttpTransport:
+    """Requests over keep-alive HTTP/1.1 to a running server, one connection per actor."""
+
+    def __init__(self, base_url, timeout=10.0):
+        self.base_url = base_url
+        self.timeout = timeout
+
+    def session(self, user):
+        from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+        from django.utils.crypto import get_random_string
+
+        store = import_module(settings.SESSION_ENGINE).SessionStore()
+        store[SESSION_KEY] = str(user.pk)
+        store[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        store[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        store.save()
+        csrf = get_random_string(32)
+        return HttpConnection(self.base_url, self.timeout), {
+            'Cookie': f'{settings.SESSION_COOKIE_NAME}={store.session_key}; '
+                      f'{settings.CSRF_COOKIE_NAME}={csrf}',
+            'X-CSRFToken': csrf,
+        }
+
+    async def request(self, session, method, path, body=b'', content_type=None):
+        connection, headers = session
+        if content_type:
+            headers = dict(headers, **{'Content-Type': content_type})
+        status, _, payload = await connection.request(method, path, body, headers)
+        return status, payload
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+class Recorder:
+    """Latencies and status codes per endpoint."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.finished = None
+        self._latencies = defaultdict(list)
+        self._statuses = defaultdict(Counter)
+
+    async def timed(self, endpoint, call):
+        """Await ``call``; returns (status, body), status 0 if it raised."""
+        started = time.monotonic()
+        try:
+            status, body = await call
+        except (OSError, ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            status, body = 0, b''
+        self._latencies[endpoint].append(time.monotonic() - started)
+        self._statuses[endpoint][status] += 1
+        return status, body
+
+    def report(self):
+        """One dict per endpoint; status 0 counts transport errors."""
+        elapsed = (self.finished or time.monotonic()) - self.started
+        rows = []
+        for endpoint in sorted(self._latencies):
+            ordered = sorted(self._latencies[endpoint])
+            rows.append({
+                'endpoint': endpoint,
+                'requests': len(ordered),
+                'rps': round(len(ordered) / elapsed, 1) if elapsed > 0 else 0.0,
+                'p50_ms': round(percentile(ordered, 50) * 1000, 1),
+                'p95_ms': round(percentile(ordered, 95) * 1000, 1),
+                'p99_ms': round(percentile(ordered, 99) * 1000, 1),
+                'statuses': dict(sorted(self._statuses[endpoint].items())),
+            })
+        return rows
+
+
+def _hinted_wait(body, default):
+    """Seconds until the server wants the next request (next/retry_after_ms)."""
+    try:
+        data = json.loads(body)
+        hint = data.get('next_report_ms') or data.get('retry_after_ms')
+    except (ValueError, AttributeError):
+        return default
+    return hint / 1000 if hint else default
+
+
+def _encode_fix(fix, packed):
+    if packed:
+        return pack_fixes([fix]), PACKED_CONTENT_TYPE
+    form = {key: value for key, value in fix.items() if value is not None}
+    return urlencode(form).encode(), 'application/x-www-form-urlencoded'
+
+
+# ---------------------------------------------------------------------------
+# Actors
+# ---------------------------------------------------------------------------
+
+async def _bus(transport, session, route, recorder, deadline, options, rng):
+    loop = asyncio.get_running_loop()
+    path = PATHS['ingest'][options['async_api']]
+    speed = options['speed_kmh'] * rng.uniform(0.8, 1.2)
+    distance = rng.uniform(0, route.length)
+    await asyncio.sleep(rng.uniform(0, options['fix_interval']))
+    last = loop.time()
+    while loop.time() < deadline:
+        now = loop.time()
+        distance += speed / 3.6 * (now - last)
+        last = now
+        lat, lon, heading = route.position(distance)
+        fix = {
+            'latitude': round(lat, 6), 'longitude': round(lon, 6), 'speed': round(speed, 1),
+            'heading': round(heading, 2), 'accuracy': 8.0, 'timestamp': time.time() * 1000,
+        }
+        body, content_type = _encode_fix(fix, options['packed'])
+        status, payload = await recorder.timed(
+            'ingest', transport.request(session, 'POST', path, body, content_type)
+        )
+        wait = options['fix_interval']
+        if options['follow_hints'] and status:
+            wait = _hinted_wait(payload, wait)
+        await asyncio.sleep(max(0.0, min(now + wait, deadline) - loop.time()))
+
+
+async def _student(transport, session, route_id, recorder, deadline, options, rng):
+    loop = asyncio.get_running_loop()
+    if rng.random() < options['viewport_share']:
+        endpoint = 'fleet'
+        lat, lon = _offset(*CENTRE, rng.uniform(0, SPREAD_M), rng.uniform(0, 360))
+        path = PATHS['fleet'][options['async_api']] + '?bbox=%.4f,%.4f,%.4f,%.4f' % (
+            lat - 0.05, lon - 0.05, lat + 0.05, lon + 0.05
+        )
+    else:
+        endpoint = 'location'
+        path = PATHS['location'][options['async_api']].format(route=route_id)
+    await asyncio.sleep(rng.uniform(0, options['poll_interval']))
+    while loop.time() < deadline:
+        started = loop.time()
+        status, payload = await recorder.timed(endpoint, transport.request(session, 'GET', path))
+        wait = options['poll_interval']
+        if options['follow_hints'] and status:
+            wait = max(wait, _hinted_wait(payload, wait))
+        await asyncio.sleep(max(0.0, min(started + wait, deadline) - loop.time()))
+
+
+async def run_fleet(transport, fleet, duration, buses=None, **options):
+    """
+    Drive ``buses`` of the fleet's routes and poll as its students for ``duration`` seconds.
+
+    Options: fix_interval, poll_interval, speed_kmh, viewport_share,
+    packed, follow_hints, async_api, seed.
+    """
+    options = dict({
+        'fix_interval': 5.0, 'poll_interval': 5.0, 'speed_kmh': 30.0, 'viewport_share': 0.2,
+        'packed': False, 'follow_hints': False, 'async_api': False, 'seed': 0,
+    }, **options)
+    rng = random.Random(options['seed'])
+    routes = fleet.routes[:buses] if buses is not None else fleet.routes
+
+    # Logging in touches the database: do it before the clock starts
+    bus_sessions = await sync_to_async(lambda: [transport.session(r.driver_user) for r in routes])()
+    student_sessions = await sync_to_async(lambda: [transport.session(u) for u, _ in fleet.students])()
+
+    recorder = Recorder()
+    deadline = asyncio.get_running_loop().time() + duration
+    await asyncio.gather(
+        *(
+            _bus(transport, session, route, recorder, deadline, options, random.Random(rng.random()))
+            for session, route in zip(bus_sessions, routes)
+        ),
+        *(
+            _student(transport, session, route_id, recorder, deadline, options, random.Random(rng.random()))
+            for session, (_, route_id) in zip(student_sessions, fleet.students)
+        ),
+    )
+    recorder.finished = time.monotonic()
+    return recorder
+
+
+# ---------------------------------------------------------------------------
+# Replay
+# ---------------------------------------------------------------------------
+
+def _log_chunk(since, until, route_ids, after):
+    from django.db.models import Q
+    from .models import GPSLog
+
+    logs = GPSLog.objects.filter(timestamp__gte=since, timestamp__lt=until)
+    if route_ids:
+        logs = logs.filter(route_id__in=route_ids)
+    if after is not None:
+        logs = logs.filter(
+            Q(timestamp__gt=after[0]) | Q(timestamp=after[0], id__gt=after[1])
+        )
+    return list(logs.order_by('timestamp', 'id').values_list(
+        'id', 'driver_id', 'latitude', 'longitude', 'accuracy', 'speed', 'heading', 'timestamp'
+    )[:REPLAY_CHUNK])
+
+
+def _driver_session(transport, driver_id):
+    from users.models import Driver
+
+    driver = Driver.objects.select_related('user').filter(pk=driver_id).first()
+    return transport.session(driver.user) if driver is not None else None
+
+
+async def replay_logs(transport, since, until, speedup=10.0, route_ids=None,
+                      packed=False, async_api=False, concurrency=200):
+    """Post the GPSLog rows in [since, until) again, ``speedup`` times faster."""
+    loop = asyncio.get_running_loop()
+    path = PATHS['ingest'][async_api]
+    recorder = Recorder()
+    sessions = {}
+    slots = asyncio.Semaphore(concurrency)
+    pending = set()
+
+    async def send(session, fix):
+        try:
+            body, content_type = _encode_fix(fix, packed)
+            await recorder.timed('ingest', transport.request(session, 'POST', path, body, content_type))
+        finally:
+            slots.release()
+
+    first = after = None
+    started = loop.time()
+    replayed_at = time.time()
+    while True:
+        chunk = await sync_to_async(_log_chunk)(since, until, route_ids, after)
+        if not chunk:
+            break
+        for log_id, driver_id, lat, lon, accuracy, speed, heading, timestamp in chunk:
+            if driver_id not in sessions:
+                sessions[driver_id] = await sync_to_async(_driver_session)(transport, driver_id)
+            session = sessions[driver_id]
+            if session is None:
+                continue
+            first = first or timestamp
+            offset = (timestamp - first).total_seconds()
+            await asyncio.sleep(max(0.0, started + offset / speedup - loop.time()))
+            fix = {
+                'latitude': lat, 'longitude': lon, 'accuracy': accuracy, 'speed': speed,
+                'heading': heading, 'timestamp': (replayed_at + offset) * 1000,
+            }
+            await slots.acquire()
+            task = asyncio.ensure_future(send(session, fix))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        after = (chunk[-1][7], chunk[-1][0])
+
+    if pending:
+        await asyncio.gather(*pending)
+    recorder.finished = time.monotonic()
+    return recorder
@@ -0,0 +1,116 @@
+"""
+STALE-BUS SWEEPER.
+
+Keeps BusTracker.is_active honest: a tracker whose phone has stopped
+reporting for STALE_AFTER_SECONDS is flipped to inactive: one locking
+SELECT (served by the last_updated index) and one set-based UPDATE. The next accepted fix flips it
+back on in BusTracker.update_location().
+
+Buses on routes that have a timetable but are not scheduled to run right
+now (transport.timetable) are swept sooner, after OFF_SCHEDULE_STALE_AFTER
+seconds: a phone left reporting from the depot should not show a bus as
+live for five minutes after its trip ended. That threshold is a few
+missed reports at the slowest pace tracking.pacing asks for, so a parked
+bus reporting on time is never swept and revived on every ping.
+
+Each deactivation is appended to the event log as 'bus_stale'
+(tracking.events).
+
+Run it periodically with ``manage.py sweep_stale_buses --loop``, from cron,
+or rely on maybe_sweep(), which read endpoints call opportunistically.
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+
+from .pacing import MAX_INTERVAL_SECONDS
+
+
+STALE_AFTER_SECONDS = getattr(settings, 'TRACKING_STALE_AFTER_SECONDS', 300)
+SWEEP_INTERVAL_SECONDS = getattr(settings, 'TRACKING_SWEEP_INTERVAL_SECONDS', 30)
+OFF_SCHEDULE_STALE_AFTER = getattr(
+    settings, 'TRACKING_OFF_SCHEDULE_STALE_AFTER', 3 * MAX_INTERVAL_SECONDS
+)
+SCHEDULE_GRACE_SECONDS = 30 * 60   # early starts and late arrivals still count as running
+
+_last_sweep = 0.0
+_sweep_lock = threading.Lock()
+
+
+def _deactivate(trackers, now):
+    """Flip ``trackers`` to inactive and log a 'bus_stale' event for each."""
+    from django.db import transaction
+    from .events import append, event
+
+    with transaction.atomic():
+        stale = list(trackers.select_for_update().values_list(
+            'pk', 'route_id', 'driver_id', 'latitude', 'longitude'
+        ))
+        if not stale:
+            return 0
+        trackers.filter(pk__in=[row[0] for row in stale]).update(is_active=False)
+        append([
+            event('bus_stale', route_id, driver_id=driver_id, lat=lat, lon=lon, at=now)
+            for _, route_id, driver_id, lat, lon in stale
+        ])
+    return len(stale)
+
+
+def sweep_stale_trackers(stale_after=STALE_AFTER_SECONDS, now=None):
+    """
+    Deactivate every active tracker not updated within ``stale_after`` seconds
+    (OFF_SCHEDULE_STALE_AFTER for routes outside their timetable).
+
+    Returns:
+        Number of trackers deactivated
+    """
+    from django.utils import timezone
+    from transport.timetable import get_timetable
+    from .models import BusTracker
+
+    now = now or timezone.now()
+    deactivated = _deactivate(BusTracker.objects.filter(
+        is_active=True,
+        last_updated__lt=now - timedelta(seconds=stale_after),
+    ), now)
+
+    timetable = get_timetable()
+    running = set(timetable.active_routes(now, grace=SCHEDULE_GRACE_SECONDS))
+    off_schedule = [
+        route_id for route_id in timetable.scheduled_routes() if route_id not in running
+    ]
+    if off_schedule and OFF_SCHEDULE_STALE_AFTER < stale_after:
+        deactivated += _deactivate(BusTracker.objects.filter(
+            is_active=True,
+            route_id__in=off_schedule,
+            last_updated__lt=now - timedelta(seconds=OFF_SCHEDULE_STALE_AFTER),
+        ), now)
+    return deactivated
+
+
+def sweep_due(interval=SWEEP_INTERVAL_SECONDS):
+    """Whether maybe_sweep() would sweep now; lets async views skip the thread hop."""
+    return time.monotonic() - _last_sweep >= interval
+
+
+def maybe_sweep(interval=SWEEP_INTERVAL_SECONDS):
+    """
+    Run a sweep if this process has not run one in the last ``interval`` seconds.
+
+    Cheap enough to call from request handlers: the common path is one
+    monotonic clock read.
+    """
+    global _last_sweep
+
+    now = time.monotonic()
+    if now - _last_sweep < interval:
+        return 0
+    if not _sweep_lock.acquire(blocking=False):
+        return 0
+    try:
+        _last_sweep = now
+        return sweep_stale_trackers()
+    finally:
+        _sweep_lock.release()
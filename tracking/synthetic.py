@@ -0,0 +1,399 @@
+"""
+SYNTHETIC DATA for scale testing admin pages, history queries and fee reports.
+
+    data = SyntheticData(seed=42, students=10_000, routes=200, stops=5_000,
+                         gps_logs=50_000_000, fee_records=100_000, fee_payments=100_000)
+    data.generate(progress=print)
+    clear_synthetic()
+
+Used by ``manage.py generate_synthetic_data``.
+
+Design:
+- Each phase yields unsaved model instances lazily and writes them CHUNK
+  at a time: one bulk_create per chunk, in its own transaction. Memory
+  stays flat from 1k rows to 50M. Only small lookups are kept: route
+  geometry, stop ids per route and student ids.
+- Reproducible. Each phase draws from its own random.Random(seed + phase),
+  so the same seed gives the same rows, whatever the chunk size.
+- Users get make_password(None), an unusable password, so no hashing.
+  bulk_create sends no post_save, so the Profile and UserRole rows the
+  signals would have made are created alongside.
+- GPSLog, the 50M-row table, skips model instances: rows are plain
+  tuples written with cursor.executemany, which removes most of the
+  per-row cost of bulk_create.
+- History stays historical. FeeRecord.created_at and FeePayment.paid_on
+  are auto_now_add. Their auto flags are switched off while generating
+  (GPSLog's raw insert sets created_at itself), so rows spread over
+  ``days`` instead of all reading "now".
+- Rows are marked: routes are named "SYN <n>" and users "syn-...".
+  clear_synthetic() deletes exactly those, and cascades remove the rest.
+"""
+import random
+from contextlib import contextmanager
+from datetime import datetime, time as dt_time, timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .simulator import CENTRE, SPREAD_M, STOP_SPACING_M, SimRoute, _offset
+
+
+ROUTE_PREFIX = 'SYN '
+USER_PREFIX = 'syn-'
+CHUNK = 5000
+FEE_AMOUNTS = [Decimal('15000.00'), Decimal('18000.00'), Decimal('20000.00')]
+PAYMENT_METHODS = ['cash', 'online', 'cheque', 'other']
+TRIPS = [(dt_time(7, 0), False), (dt_time(16, 0), True)]   # (start, reversed)
+TRIP_MINUTES = 120
+GPS_FIELDS = [
+    'route', 'driver', 'latitude', 'longitude', 'accuracy', 'speed', 'heading',
+    'timestamp', 'created_at',
+]
+
+
+@contextmanager
+def _historical_timestamps(*fields):
+    """Let bulk_create keep the values given for auto_now/auto_now_add fields."""
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _write(model, rows, chunk, progress=None):
+    """bulk_create an iterator of instances ``chunk`` at a time; returns the count."""
+    total = 0
+    while True:
+        batch = list(islice(rows, chunk))
+        if not batch:
+            return total
+        with transaction.atomic():
+            model.objects.bulk_create(batch)
+        total += len(batch)
+        if progress:
+            progress(model.__name__, total)
+
+
+def _write_rows(model, fields, rows, chunk, progress=None):
+    """executemany an iterator of value tuples for ``fields``; returns the count."""
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(model._meta.db_table),
+        ', '.join(quote(model._meta.get_field(name).column) for name in fields),
+        ', '.join(['%s'] * len(fields)),
+    )
+    total = 0
+    while True:
+        batch = list(islice(rows, chunk))
+        if not batch:
+            return total
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, batch)
+        total += len(batch)
+        if progress:
+            progress(model.__name__, total)
+
+
+def _split(total, parts):
+    """``total`` spread over ``parts`` as evenly as possible."""
+    base, extra = divmod(total, parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def clear_synthetic():
+    """Delete synthetic routes and users with everything hanging off them."""
+    from django.contrib.auth.models import User
+    from payments.models import FeePayment
+    from transport.models import Route
+    from transport.stats import invalidate_route_summary
+    from transport.topology import invalidate_topology
+    from .models import GPSLog
+
+    routes = Route.objects.filter(name__startswith=ROUTE_PREFIX)
+    deleted = routes.count()
+    GPSLog.objects.filter(route__in=routes).delete()
+    # processed_by is PROTECT: payments go before the synthetic admin
+    FeePayment.objects.filter(processed_by__username__startswith=USER_PREFIX).delete()
+    User.objects.filter(username__startswith=USER_PREFIX).delete()
+    routes.delete()
+    invalidate_topology()
+    invalidate_route_summary()
+    return deleted
+
+
+def synthetic_exists():
+    from transport.models import Route
+
+    return Route.objects.filter(name__startswith=ROUTE_PREFIX).exists()
+
+
+class SyntheticData:
+    """Consistent users/transport/payments/tracking rows at a chosen scale."""
+
+    def __init__(self, seed=0, students=10_000, routes=200, stops=5_000, gps_logs=50_000_000,
+                 fee_records=100_000, fee_payments=100_000, days=30, chunk=CHUNK):
+        if routes < 1 or stops < 2 * routes:
+            raise ValueError("Need at least one route and two stops per route")
+        self.seed = seed
+        self.students = students
+        self.routes = routes
+        self.stops = stops
+        self.gps_logs = gps_logs
+        self.fee_records = fee_records
+        self.fee_payments = fee_payments
+        self.days = days
+        self.chunk = chunk
+        self.today = timezone.localdate()
+        self._make_password = None
+
+    def _rng(self, phase):
+        return random.Random(self.seed * 100 + phase)
+
+    def _user(self, username):
+        from django.contrib.auth.hashers import make_password
+        from django.contrib.auth.models import User
+
+        if self._make_password is None:
+            self._make_password = make_password(None)
+        return User(username=username, password=self._make_password)
+
+    def generate(self, progress=None):
+        """Run every phase; returns {model name: rows created}."""
+        from transport.stats import invalidate_route_summary
+        from transport.topology import invalidate_topology
+
+        counts = {}
+        routes = self._routes(counts, progress)
+        drivers, admin = self._people(routes, counts, progress)
+        self._fees(admin, counts, progress)
+        self._gps_logs(routes, drivers, counts, progress)
+        invalidate_topology()
+        invalidate_route_summary()
+        return counts
+
+    # -- transport ----------------------------------------------------------
+
+    def _routes(self, counts, progress):
+        from transport.models import Route, RouteSchedule, Stop
+
+        rng = self._rng(1)
+        with transaction.atomic():
+            route_rows = Route.objects.bulk_create(
+                Route(
+                    name=f'{ROUTE_PREFIX}{n}', bus_number=f'SYN{n:04d}',
+                    start_location=f'Area {n}', end_location='Campus',
+                )
+                for n in range(1, self.routes + 1)
+            )
+        counts['Route'] = len(route_rows)
+
+        geometry = {}
+        per_route = _split(self.stops, self.routes)
+
+        def stops():
+            for route, count in zip(route_rows, per_route):
+                lat, lon = _offset(*CENTRE, rng.uniform(0, SPREAD_M), rng.uniform(0, 360))
+                bearing = rng.uniform(0, 360)
+                points = []
+                for order in range(count):
+                    points.append((lat, lon))
+                    minutes = order * TRIP_MINUTES // count
+                    yield Stop(
+                        route=route, name=f'Syn stop {route.pk}-{order}', order=order,
+                        latitude=round(lat, 6), longitude=round(lon, 6),
+                        arrival_time=dt_time(7 + minutes // 60, minutes % 60),
+                    )
+                    bearing += rng.uniform(-30, 30)
+                    lat, lon = _offset(lat, lon, STOP_SPACING_M * rng.uniform(0.6, 1.4), bearing)
+                geometry[route.pk] = SimRoute(route.pk, None, points)
+
+        counts['Stop'] = _write(Stop, stops(), self.chunk, progress)
+        counts['RouteSchedule'] = _write(RouteSchedule, (
+            RouteSchedule(
+                route=route, day_of_week=day,
+                departure_time=dt_time(7, 0), arrival_time=dt_time(9, 0),
+            )
+            for route in route_rows for day in range(6)
+        ), self.chunk, progress)
+        return geometry
+
+    # -- users --------------------------------------------------------------
+
+    def _people(self, routes, counts, progress):
+        from django.contrib.auth.models import User
+        from busapp.models import Profile
+        from transport.models import Stop
+        from users.models import Driver, Student, UserRole
+
+        rng = self._rng(2)
+        route_ids = list(routes)
+        stop_ids = {}
+        for stop_id, route_id in Stop.objects.filter(route_id__in=route_ids).values_list('id', 'route_id'):
+            stop_ids.setdefault(route_id, []).append(stop_id)
+
+        def roles(users, role):
+            Profile.objects.bulk_create(Profile(user=user, role=role) for user in users)
+            UserRole.objects.bulk_create(UserRole(user=user, role=role) for user in users)
+
+        with transaction.atomic():
+            admin = self._user(f'{USER_PREFIX}admin')
+            admin.is_staff = True
+            User.objects.bulk_create([admin])
+            roles([admin], 'admin')
+            driver_users = User.objects.bulk_create(
+                self._user(f'{USER_PREFIX}driver-{n}') for n in range(len(route_ids))
+            )
+            roles(driver_users, 'driver')
+            drivers = Driver.objects.bulk_create(
+                Driver(
+                    user=user, license_number=f'SYN-D{n:05d}', assigned_route_id=route_id,
+                    phone=f'9{rng.randrange(10 ** 9):09d}', is_verified=True,
+                )
+                for n, (user, route_id) in enumerate(zip(driver_users, route_ids))
+            )
+        counts['Driver'] = len(drivers)
+
+        created = 0
+        for start in range(0, self.students, self.chunk):
+            with transaction.atomic():
+                users = User.objects.bulk_create(
+                    self._user(f'{USER_PREFIX}student-{n}')
+                    for n in range(start, min(start + self.chunk, self.students))
+                )
+                roles(users, 'student')
+                rows = []
+                for n, user in enumerate(users, start):
+                    route_id = rng.choice(route_ids)
+                    rows.append(Student(
+                        user=user, hall_ticket=f'SYN{n:07d}',
+                        active_route_id=route_id, boarding_stop_id=rng.choice(stop_ids[route_id]),
+                        phone=f'8{rng.randrange(10 ** 9):09d}', is_verified=rng.random() < 0.9,
+                    ))
+                Student.objects.bulk_create(rows)
+            created += len(users)
+            if progress:
+                progress('Student', created)
+        counts['Student'] = created
+        return {driver.assigned_route_id: driver.pk for driver in drivers}, admin
+
+    # -- payments -----------------------------------------------------------
+
+    def _fees(self, admin, counts, progress):
+        from payments.models import FeePayment, FeeRecord
+        from users.models import Student
+
+        student_ids = list(
+            Student.objects.filter(hall_ticket__startswith='SYN').order_by('pk').values_list('pk', flat=True)
+        )
+        if not student_ids:
+            counts['FeeRecord'] = counts['FeePayment'] = 0
+            return
+
+        rng = self._rng(3)
+        now = timezone.now()
+
+        def records():
+            for n in range(self.fee_records):
+                due = self.today + timedelta(days=rng.randint(-self.days * 6, 60))
+                created = timezone.make_aware(datetime.combine(due - timedelta(days=30), dt_time(9)))
+                record = FeeRecord(
+                    student_id=student_ids[n % len(student_ids)], amount=rng.choice(FEE_AMOUNTS),
+                    due_date=due, created_at=min(created, now),
+                )
+                if due < self.today:
+                    roll = rng.random()
+                    if roll < 0.75:
+                        record.status = 'paid'
+                        record.payment_method = rng.choice(PAYMENT_METHODS)
+                        record.paid_on = min(now, timezone.make_aware(datetime.combine(
+                            due - timedelta(days=rng.randint(0, 20)), dt_time(rng.randint(9, 16), rng.randint(0, 59))
+                        )))
+                    elif roll < 0.95:
+                        record.status = 'overdue'
+                    else:
+                        record.status = 'cancelled'
+                yield record
+
+        with _historical_timestamps(FeeRecord._meta.get_field('created_at')):
+            counts['FeeRecord'] = _write(FeeRecord, records(), self.chunk, progress)
+
+        paid = FeeRecord.objects.filter(student__hall_ticket__startswith='SYN', status='paid')
+        paid_count = paid.count()
+        if not paid_count or not self.fee_payments:
+            counts['FeePayment'] = 0
+            return
+        shares = iter(_split(self.fee_payments, paid_count))
+
+        def payments():
+            after = 0
+            while True:
+                chunk = list(paid.filter(pk__gt=after).order_by('pk').values_list(
+                    'pk', 'amount', 'paid_on', 'payment_method'
+                )[:self.chunk])
+                if not chunk:
+                    return
+                for record_id, amount, paid_on, method in chunk:
+                    parts = next(shares, 0)
+                    if not parts:
+                        continue
+                    part = (amount / parts).quantize(Decimal('0.01'))
+                    for j in range(parts):
+                        yield FeePayment(
+                            fee_record_id=record_id,
+                            amount_paid=part if j < parts - 1 else amount - part * (parts - 1),
+                            payment_method=method,
+                            reference_id=f'TXN{record_id:08d}{j:02d}' if method == 'online' else '',
+                            paid_on=paid_on - timedelta(days=parts - 1 - j),
+                            receipt_number=f'SYN-{record_id}-{j}',
+                            processed_by_id=admin.pk,
+                        )
+                after = chunk[-1][0]
+
+        with _historical_timestamps(FeePayment._meta.get_field('paid_on')):
+            counts['FeePayment'] = _write(FeePayment, payments(), self.chunk, progress)
+
+    # -- tracking -----------------------------------------------------------
+
+    def _gps_logs(self, routes, drivers, counts, progress):
+        from .models import GPSLog
+
+        rng = self._rng(4)
+        route_ids = list(routes)
+        per_day = _split(self.gps_logs, self.days)
+        first_day = self.today - timedelta(days=self.days)
+        adapt = connection.ops.adapt_datetimefield_value
+
+        def logs():
+            for offset, day_total in enumerate(per_day):
+                day = first_day + timedelta(days=offset)
+                for route_id, route_total in zip(route_ids, _split(day_total, len(route_ids))):
+                    route, driver_id = routes[route_id], drivers[route_id]
+                    for (start, reverse), fixes in zip(TRIPS, _split(route_total, len(TRIPS))):
+                        if not fixes:
+                            continue
+                        began = timezone.make_aware(datetime.combine(day, start))
+                        step = TRIP_MINUTES * 60 / fixes
+                        speed_kmh = route.length / (TRIP_MINUTES * 60) * 3.6
+                        for i in range(fixes):
+                            covered = route.length * i / fixes
+                            lat, lon, heading = route.position(
+                                route.length - covered - 1e-6 if reverse else covered
+                            )
+                            at = began + timedelta(seconds=i * step)
+                            yield (
+                                route_id, driver_id,
+                                round(lat + rng.gauss(0, 0.00003), 6),
+                                round(lon + rng.gauss(0, 0.00003), 6),
+                                round(rng.uniform(3, 25), 1),
+                                round(max(0.0, rng.gauss(speed_kmh, 5)), 1),
+                                round((heading + (180 if reverse else 0)) % 360, 1),
+                                adapt(at), adapt(at + timedelta(seconds=rng.uniform(0.2, 2))),
+                            )
+
+        counts['GPSLog'] = _write_rows(GPSLog, GPS_FIELDS, logs(), self.chunk, progress)
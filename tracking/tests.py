@@ -1,3 +1,1065 @@
-from django.test import TestCase
+import io
+import os
+import struct
+import tempfile
+import threading
+from datetime import datetime, time, timedelta
+from unittest.mock import patch
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import CommandError, call_command
+from django.db import connection, models
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from transport.models import Route, RouteSchedule, Stop
+from transport.topology import invalidate_topology
+from users.models import Driver, Student
+from .adherence import compute_adherence, detect_arrivals, on_time_performance
+from .admin_tools import EstimatedCountPaginator
+from . import events
+from . import alerts
+from .alerts import alert_index
+from .fleet import FleetIndex, fleet_index
+from .gtfs_rt import IN_TRANSIT_TO, STOPPED_AT, FeedBuffer, _varint, encode_vehicle_positions
+from . import heatmap
+from .ingest import apply_batch, housekeeping
+from .ingest_queue import IngestQueue
+from .pacing import (
+    MAX_INTERVAL_SECONDS,
+    MIN_INTERVAL_SECONDS,
+    MOVING_INTERVAL_SECONDS,
+    UNWATCHED_INTERVAL_SECONDS,
+    RouteDemand,
+    expected_interval,
+    next_report_interval,
+)
+from .polling import MIN_POLL_SECONDS, NOT_RUNNING_RETRY_SECONDS, PollGovernor, retry_after_seconds
+from .ratelimit import IngestLimiter, MemoryBucketStore, SharedBucketStore
+from . import scorecards
+from . import segments
+from .segments import RunningStat, SegmentAggregator, StopVisitTracker, sketch_quantile
+from .simulator import build_fleet, clear_fleet
+from .sweeper import OFF_SCHEDULE_STALE_AFTER, sweep_stale_trackers
+from .synthetic import SyntheticData, clear_synthetic
+from .models import AggregationWatermark, AlertOutbox, BusTracker, DriverScorecard, GPSLog, LocationError, LocationEvent, SegmentStat, StopAlert, StopArrival
+from .validation import MAX_CONSECUTIVE_JUMPS, ErrorRecorder, FixValidator, fix_validator, plausible_device_time
+from .wire import FIX_RECORD, MAX_BATCH, pack_fixes, unpack_fixes
+
+
+class TrackingAdminQueryTests(TestCase):
+    """Changelist query counts must not grow with the number of rows."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        cls.now = timezone.now()
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def make_rows(self, routes, logs_per_route):
+        start = Route.objects.count()
+        for i in range(start, start + routes):
+            route = Route.objects.create(
+                name=f'Route {i}', bus_number=f'BUS{i:03d}',
+                start_location='A', end_location='B',
+            )
+            user = User.objects.create_user(f'driver{i}')
+            driver = Driver.objects.create(
+                user=user, license_number=f'LIC{i:03d}', assigned_route=route
+            )
+            tracker = BusTracker.objects.create(
+                route=route, driver=driver, latitude=17.4, longitude=78.4
+            )
+            LocationError.objects.create(tracker=tracker, error_type='accuracy_low')
+            GPSLog.objects.bulk_create(
+                GPSLog(
+                    route=route, driver=driver, latitude=17.4, longitude=78.4,
+                    timestamp=self.now - timedelta(seconds=n),
+                )
+                for n in range(logs_per_route)
+            )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assert_constant_queries(self, url):
+        self.make_rows(routes=2, logs_per_route=5)
+        small = self.count_queries(url)
+        self.make_rows(routes=8, logs_per_route=30)
+        large = self.count_queries(url)
+        self.assertEqual(small, large)
+        return large
+
+    def test_gpslog_changelist(self):
+        # session, user, pk-range estimate, bounded count, page
+        self.assertEqual(self.assert_constant_queries(reverse('admin:tracking_gpslog_changelist')), 5)
+
+    def test_bustracker_changelist(self):
+        self.assert_constant_queries(reverse('admin:tracking_bustracker_changelist'))
+
+    def test_locationerror_changelist(self):
+        self.assertEqual(
+            self.assert_constant_queries(reverse('admin:tracking_locationerror_changelist')), 5
+        )
+
+    def test_gpslog_filtered_by_route_loads_one_option(self):
+        self.make_rows(routes=5, logs_per_route=3)
+        route = Route.objects.first()
+        url = reverse('admin:tracking_gpslog_changelist')
+        response = self.client.get(url, {'route__id__exact': route.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 3)
+        spec = next(
+            s for s in response.context['cl'].filter_specs
+            if getattr(s, 'field', None) and s.field.name == 'route'
+        )
+        self.assertEqual(len(spec.lookup_choices), 1)
+
+    def test_keyset_navigation(self):
+        self.make_rows(routes=1, logs_per_route=250)
+        url = reverse('admin:tracking_gpslog_changelist')
+        seen = []
+        response = self.client.get(url)
+        while True:
+            seen.extend(row.pk for row in response.context['cl'].result_list)
+            older = response.context.get('keyset_older_url')
+            if not older:
+                break
+            response = self.client.get(url + older)
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(seen), 250)
+        self.assertEqual(len(set(seen)), 250)
+
+    def test_estimated_count_paginator(self):
+        self.make_rows(routes=1, logs_per_route=20)
+        paginator = EstimatedCountPaginator(GPSLog.objects.all(), 10)
+        paginator.count_limit = 5
+        self.assertEqual(paginator.count, 20)
+        filtered = EstimatedCountPaginator(GPSLog.objects.filter(speed__isnull=True), 10)
+        filtered.count_limit = 5
+        self.assertEqual(filtered.count, 5)
+
+
+class FixValidatorTests(SimpleTestCase):
+    """Fixes are judged against the previous accepted fix of their route."""
+
+    def test_rejects_bad_coordinates(self):
+        validator = FixValidator()
+        self.assertEqual(validator.check(1, 0.0, 0.0).error_type, 'invalid_coords')
+        self.assertEqual(validator.check(1, 91.0, 78.4).error_type, 'invalid_coords')
+        self.assertEqual(validator.check(1, float('nan'), 78.4).error_type, 'invalid_coords')
+        self.assertEqual(validator.check(1, 17.4, 78.4, accuracy=800).error_type, 'accuracy_low')
+
+    def test_jump_rejected_until_it_persists(self):
+        validator = FixValidator(max_speed_kmh=120)
+        self.assertTrue(validator.check(1, 17.4, 78.4, timestamp=1000).accepted)
+        # ~11 km in 10 s: rejected, until the new position keeps repeating
+        for n in range(1, MAX_CONSECUTIVE_JUMPS):
+            result = validator.check(1, 17.5, 78.4, timestamp=1000 + 10 * n)
+            self.assertEqual((result.accepted, result.error_type), (False, 'position_jump'))
+        self.assertTrue(validator.check(1, 17.5, 78.4, timestamp=1000 + 10 * MAX_CONSECUTIVE_JUMPS).accepted)
+        self.assertTrue(validator.check(2, 17.4, 78.4, timestamp=1000).accepted)
+
+    def test_impossible_speed_is_flagged_not_rejected(self):
+        result = FixValidator().check(1, 17.4, 78.4, speed=300)
+        self.assertEqual((result.accepted, result.error_type, result.speed), (True, 'speed_invalid', None))
+
+    def test_device_time_bounds(self):
+        now_ms = timezone.now().timestamp() * 1000
+        self.assertTrue(plausible_device_time(now_ms))
+        self.assertTrue(plausible_device_time(now_ms + 60_000))
+        self.assertFalse(plausible_device_time(now_ms + 3_600_000))
+        self.assertFalse(plausible_device_time(1e20))
+        self.assertFalse(plausible_device_time(float('inf')))
+        self.assertFalse(plausible_device_time(float('nan')))
+        self.assertFalse(plausible_device_time(1000.0))   # unset clock, 1970
+
+
+class ErrorRecorderTests(TestCase):
+    """Errors are merged per route and kept even before the route has a tracker."""
+
+    def test_errors_before_first_tracker_are_kept(self):
+        route = Route.objects.create(name='Route E', bus_number='BUSE', start_location='A', end_location='B')
+        recorder = ErrorRecorder(flush_interval=60, flush_size=100)
+        recorder.record(route.pk, 'invalid_coords', 'Null island (0, 0) fix')
+        recorder.record(route.pk, 'invalid_coords', 'Null island (0, 0) fix')
+        recorder.record(route.pk + 1000, 'accuracy_low')   # no such route: dropped
+        self.assertEqual(recorder.flush_due(), 0)
+        self.assertEqual(recorder.flush(), 1)
+        error = LocationError.objects.get()
+        self.assertEqual((error.route_id, error.tracker_id, error.occurrence_count), (route.pk, None, 2))
+
+        driver = Driver.objects.create(
+            user=User.objects.create_user('driver-e'), license_number='LICE', assigned_route=route
+        )
+        tracker = BusTracker.objects.create(route=route, driver=driver, latitude=17.4, longitude=78.4)
+        recorder.record(route.pk, 'invalid_coords')
+        recorder.flush_interval = 0
+        self.assertEqual(recorder.flush_due(), 1)   # idle writers flush without a new error
+        error.refresh_from_db()
+        self.assertEqual((error.tracker_id, error.occurrence_count), (tracker.pk, 3))
+
+
+class StaleSweeperTests(TestCase):
+    """Off-schedule buses are swept sooner, but never while reporting at the slowest pace."""
+
+    def test_off_schedule_threshold(self):
+        route = Route.objects.create(name='Route S', bus_number='BUSS', start_location='A', end_location='B')
+        RouteSchedule.objects.create(
+            route=route, day_of_week=0, departure_time=time(7, 0), arrival_time=time(9, 0)
+        )
+        driver = Driver.objects.create(
+            user=User.objects.create_user('driver-s'), license_number='LICS', assigned_route=route
+        )
+        BusTracker.objects.create(route=route, driver=driver, latitude=17.4, longitude=78.4, is_active=True)
+        invalidate_topology()
+        now = timezone.make_aware(datetime(2026, 10, 21, 13, 0))   # a Wednesday afternoon
+
+        BusTracker.objects.update(last_updated=now - timedelta(seconds=MAX_INTERVAL_SECONDS + 5))
+        self.assertEqual(sweep_stale_trackers(now=now), 0)
+
+        BusTracker.objects.update(last_updated=now - timedelta(seconds=OFF_SCHEDULE_STALE_AFTER + 5))
+        self.assertEqual(sweep_stale_trackers(now=now), 1)
+        self.assertFalse(BusTracker.objects.get().is_active)
+        self.assertTrue(LocationEvent.objects.filter(kind='bus_stale', route=route).exists())
+
+
+class PacingTests(TestCase):
+    """Report intervals follow demand, motion and distance to the next stop."""
+
+    def test_intervals(self):
+        route = Route.objects.create(name='Route P', bus_number='BUSP', start_location='A', end_location='B')
+        Stop.objects.create(
+            route=route, name='Gate', order=0, latitude=17.40, longitude=78.40, arrival_time=time(8, 0)
+        )
+        invalidate_topology()
+        demand = RouteDemand()
+        far = (17.45, 78.40)   # ~5.5 km from the stop
+
+        with patch('tracking.pacing.route_demand', demand):
+            self.assertEqual(next_report_interval(route.pk, *far, speed=0), MAX_INTERVAL_SECONDS)
+            self.assertEqual(next_report_interval(route.pk, *far, speed=40), UNWATCHED_INTERVAL_SECONDS)
+
+            demand.touch(route.pk, 'student-1')
+            self.assertEqual(next_report_interval(route.pk, *far, speed=0), MAX_INTERVAL_SECONDS / 2)
+            self.assertEqual(next_report_interval(route.pk, *far, speed=40), MOVING_INTERVAL_SECONDS)
+            # 556 m out at 60 km/h: four reports before the bus can arrive
+            self.assertAlmostEqual(next_report_interval(route.pk, 17.405, 78.40, speed=60), 8.34, places=1)
+            self.assertEqual(next_report_interval(route.pk, 17.402, 78.40, speed=40), MIN_INTERVAL_SECONDS)
+        self.assertEqual(expected_interval(route.pk), MIN_INTERVAL_SECONDS)
+
+    def test_only_the_stop_ahead_counts(self):
+        route = Route.objects.create(name='Route Q', bus_number='BUSQ', start_location='A', end_location='B')
+        for i in range(2):
+            Stop.objects.create(route=route, name=f'Q{i}', order=i, latitude=17.40 + i * 0.05, longitude=78.40)
+        invalidate_topology()
+        demand = RouteDemand()
+        demand.touch(route.pk, 'student-1')
+
+        with patch('tracking.pacing.route_demand', demand):
+            # ~220 m before the first stop, then ~220 m past it heading on
+            self.assertEqual(next_report_interval(route.pk, 17.398, 78.40, speed=30), MIN_INTERVAL_SECONDS)
+            self.assertEqual(next_report_interval(route.pk, 17.402, 78.40, speed=30), MOVING_INTERVAL_SECONDS)
+            # closing in on the second stop
+            self.assertEqual(next_report_interval(route.pk, 17.448, 78.40, speed=30), MIN_INTERVAL_SECONDS)
+
+    def test_demand_window(self):
+        demand = RouteDemand(window=60)
+        self.assertIsNone(demand.touch(1, 'a'))
+        self.assertIsNotNone(demand.touch(1, 'a'))
+        demand.touch(1, 'b')
+        demand.touch(2, 'a')
+        self.assertEqual((demand.count(1), demand.count(2), demand.count(3)), (2, 1, 0))
+        demand.window = 0
+        self.assertEqual(demand.count(1), 0)
+
+
+class PollGovernorTests(SimpleTestCase):
+    """Fast pollers back off exponentially; hints follow the driver cadence."""
+
+    def test_backoff_doubles_and_resets(self):
+        with patch('tracking.polling.route_demand', RouteDemand()):
+            governor = PollGovernor(min_poll=2, max_backoff=10)
+            self.assertEqual(governor.admit(1, 'a'), (True, 0))
+            self.assertEqual(governor.admit(1, 'a'), (False, 4))
+            self.assertEqual(governor.admit(1, 'a'), (False, 8))
+            self.assertEqual(governor.admit(1, 'a'), (False, 10))
+            self.assertEqual(governor.admit(1, 'b'), (True, 0))
+            self.assertEqual(governor.admit(2, 'a'), (True, 0))
+
+            governor.min_poll = 0   # a patient client is admitted and forgiven
+            self.assertEqual(governor.admit(1, 'a'), (True, 0))
+            governor.min_poll = 2
+            self.assertEqual(governor.admit(1, 'a'), (False, 4))
+
+    def test_retry_hint(self):
+        now = timezone.now()
+        moving = lambda age: {'speed': 30.0, 'last_updated': now - timedelta(seconds=age)}
+        with patch.dict('tracking.pacing._cadence', {7: 20}):
+            self.assertEqual(retry_after_seconds(7, None, now), NOT_RUNNING_RETRY_SECONDS)
+            self.assertEqual(retry_after_seconds(7, {'speed': 0.0, 'last_updated': now}, now), 20)
+            self.assertEqual(retry_after_seconds(7, moving(5), now), 15)
+            self.assertEqual(retry_after_seconds(7, moving(30), now), MIN_POLL_SECONDS)
+
+
+class ScriptedBucketStore:
+    """Bucket store answering take() from a list of waits."""
+
+    def __init__(self, waits):
+        self.waits = list(waits)
+
+    def take(self, key, rate, burst):
+        return self.waits.pop(0)
+
+
+class IngestLimiterTests(SimpleTestCase):
+    """Token buckets admit BURST fixes, then coalesce to the newest one."""
+
+    def test_memory_bucket(self):
+        store = MemoryBucketStore()
+        self.assertEqual([store.take(1, 0.5, 3) for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(store.take(1, 0.5, 3), 2.0, places=2)
+        self.assertEqual(store.take(2, 0.5, 3), 0.0)
+
+    def test_shared_bucket_is_shared_between_stores(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        first, second = SharedBucketStore(path, slots=64), SharedBucketStore(path, slots=64)
+        self.assertEqual(first.take(7, 0.5, 2), 0.0)
+        self.assertEqual(second.take(7, 0.5, 2), 0.0)
+        self.assertAlmostEqual(first.take(7, 0.5, 2), 2.0, places=2)
+        self.assertEqual(second.take(8, 0.5, 2), 0.0)
+
+    def test_shared_bucket_lets_through_when_full(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        store = SharedBucketStore(path, slots=2)
+        for key in (1, 2, 3):
+            store.take(key, 0.001, 1)
+        self.assertEqual([store.take(key, 0.001, 1) for key in (1, 2, 3)].count(0.0), 1)
+
+    def test_coalesce_release_and_expiry(self):
+        limiter = IngestLimiter(ScriptedBucketStore([0.0, 1.5, 2.5, 0.0]), rate=1, burst=1)
+        self.assertEqual(limiter.admit(1, 10, {"latitude": 17.1}), 0.0)
+        self.assertEqual(limiter.admit(1, 10, {"latitude": 17.2}), 1.5)
+        self.assertEqual(limiter.admit(1, 10, {"latitude": 17.3}), 2.5)   # replaces 17.2
+        self.assertEqual(limiter.release_due(), [(1, 10, {"latitude": 17.3})])
+        self.assertEqual(limiter.release_due(), [])
+
+        limiter.store = ScriptedBucketStore([1.0])
+        limiter.admit(2, 20, {"latitude": 17.4})
+        with patch('tracking.ratelimit.STASH_TTL', -1):
+            self.assertEqual(limiter.release_due(), [])
+        self.assertEqual(
+            limiter.metrics(),
+            {'admitted': 1, 'coalesced': 3, 'released': 1, 'superseded': 1, 'expired': 1, 'pending': 0},
+        )
+
+    def test_idle_writers_apply_parked_fixes(self):
+        limiter = IngestLimiter(ScriptedBucketStore([1.0, 0.0]), rate=1, burst=1)
+        limiter.admit(1, 10, {"latitude": 17.5})   # the last ping of a trip
+        with patch('tracking.ratelimit.ingest_limiter', limiter), \
+                patch('tracking.ingest.apply_fix') as apply_fix, \
+                patch('tracking.ingest.error_recorder') as recorder, \
+                patch('tracking.segments.segment_aggregator') as aggregator:
+            housekeeping()
+        recorder.flush_due.assert_called_once_with()
+        aggregator.flush_due.assert_called_once_with()
+        apply_fix.assert_called_once_with(1, 10, {"latitude": 17.5})
+
+
+class AdherenceTests(TestCase):
+    """Stops are matched in order against the day's trajectory and scored."""
+
+    def test_detect_arrivals_in_order(self):
+        stop_lats, stop_lons = [17.40, 17.41, 17.42], [78.40] * 3
+        # out to the third stop and back past the second: the return leg is ignored
+        lats = np.array([17.39, 17.40, 17.405, 17.41, 17.42, 17.41])
+        lons = np.full(lats.shape, 78.40)
+        self.assertEqual(detect_arrivals(lats, lons, stop_lats, stop_lons).tolist(), [1, 3, 4])
+        self.assertEqual(detect_arrivals(lats[:3], lons[:3], stop_lats, stop_lons).tolist(), [1, -1, -1])
+
+    def test_compute_and_report(self):
+        route = Route.objects.create(name='Route A', bus_number='BUSA', start_location='A', end_location='B')
+        for i in range(3):
+            Stop.objects.create(
+                route=route, name=f'Stop {i}', order=i,
+                latitude=17.40 + i * 0.01, longitude=78.40, arrival_time=time(8, i * 5),
+            )
+        driver = Driver.objects.create(
+            user=User.objects.create_user('driver-a'), license_number='LICA', assigned_route=route
+        )
+        invalidate_topology()
+        day = timezone.localdate() - timedelta(days=1)
+        at = lambda hour, minute: timezone.make_aware(datetime.combine(day, time(hour, minute)))
+        GPSLog.objects.bulk_create([
+            GPSLog(route=route, driver=driver, latitude=17.40, longitude=78.40, timestamp=at(8, 1)),
+            GPSLog(route=route, driver=driver, latitude=17.41, longitude=78.40, timestamp=at(8, 12)),
+        ])
+
+        self.assertEqual(compute_adherence(day, day), 3)
+        self.assertEqual(compute_adherence(day, day), 3)   # reruns replace their rows
+        lateness = list(StopArrival.objects.order_by('stop__order').values_list('lateness_seconds', flat=True))
+        self.assertEqual(lateness, [60, 420, None])
+
+        report = on_time_performance(day, day)
+        self.assertEqual(
+            {key: report[0][key] for key in ('stops', 'served', 'on_time', 'on_time_pct', 'avg_lateness_seconds')},
+            {'stops': 3, 'served': 2, 'on_time': 1, 'on_time_pct': 33.3, 'avg_lateness_seconds': 240},
+        )
+        self.assertEqual(on_time_performance(day, day, by='driver')[0]['name'], 'driver-a')
+
+    def test_loop_and_second_trip(self):
+        # Depot -> Market -> Depot: the return to the depot is its own Stop
+        route = Route.objects.create(name='Route L', bus_number='BUSL', start_location='A', end_location='A')
+        for order, (lat, minute) in enumerate(((17.40, 0), (17.41, 10), (17.40, 20))):
+            Stop.objects.create(
+                route=route, name=f'L{order}', order=order, latitude=lat, longitude=78.40,
+                arrival_time=time(8, minute),
+            )
+        driver = Driver.objects.create(
+            user=User.objects.create_user('driver-l'), license_number='LICL', assigned_route=route
+        )
+        invalidate_topology()
+        day = timezone.localdate() - timedelta(days=1)
+        at = lambda hour, minute: timezone.make_aware(datetime.combine(day, time(hour, minute)))
+        trip = ((17.40, 0), (17.41, 11), (17.40, 22))
+        GPSLog.objects.bulk_create(
+            GPSLog(route=route, driver=driver, latitude=lat, longitude=78.40, timestamp=at(hour, minute))
+            for hour in (8, 17)   # morning trip, then an unplanned evening run
+            for lat, minute in trip
+        )
+
+        self.assertEqual(compute_adherence(day, day, route_ids={route.id}), 3)
+        lateness = list(
+            StopArrival.objects.filter(route=route).order_by('stop__order').values_list('lateness_seconds', flat=True)
+        )
+        self.assertEqual(lateness, [0, 60, 120])   # evening passes do not replace the morning ones
+
+
+class ScorecardTests(TestCase):
+    """Driver-day metrics skip gaps; nightly runs only score new days."""
+
+    def test_day_metrics_skip_gaps(self):
+        ts = np.array([0.0, 10.0, 20.0, 620.0, 630.0])
+        lats = np.array([17.400, 17.401, 17.402, 17.500, 17.501])
+        lons = np.full(ts.shape, 78.40)
+        speeds = np.full(ts.shape, np.nan)
+        metrics = scorecards.day_metrics(ts, lats, lons, speeds, np.full(ts.shape, 50.0))
+        self.assertEqual(metrics['fix_count'], 5)
+        self.assertEqual(metrics['driving_seconds'], 30)
+        # three ~111 m hops; the 11 km jump over the 10 minute gap is not driving
+        self.assertAlmostEqual(metrics['distance_km'], 0.333, places=2)
+        self.assertEqual(metrics['speeding_episodes'], 0)
+
+    def test_day_score(self):
+        metrics = {
+            'speeding_episodes': 2, 'harsh_accelerations': 1, 'harsh_brakings': 0,
+            'idle_seconds': scorecards.IDLE_ALLOWANCE_SECONDS + 600,
+        }
+        expected = 100 - 2 * scorecards.SPEEDING_PENALTY - scorecards.HARSH_EVENT_PENALTY - 2
+        self.assertEqual(scorecards.day_score(metrics), expected)
+        self.assertEqual(scorecards.day_score(dict(metrics, speeding_episodes=100)), 0)
+
+    def test_pending_days_resume_after_watermark(self):
+        route = Route.objects.create(name='Route S', bus_number='BUSS', start_location='A', end_location='B')
+        driver = Driver.objects.create(
+            user=User.objects.create_user('driver-s'), license_number='LICS', assigned_route=route
+        )
+        invalidate_topology()
+        today = timezone.localdate()
+
+        def drive(day):
+            start = timezone.make_aware(datetime.combine(day, time(8, 0)))
+            GPSLog.objects.bulk_create(
+                GPSLog(route=route, driver=driver, latitude=17.40 + i * 0.001, longitude=78.40,
+                       timestamp=start + timedelta(seconds=10 * i))
+                for i in range(5)
+            )
+
+        drive(today - timedelta(days=3))
+        drive(today - timedelta(days=1))
+        self.assertEqual(scorecards.score_pending_days(), 2)
+        self.assertEqual(
+            AggregationWatermark.objects.get(name=scorecards.WATERMARK_NAME).last_date,
+            today - timedelta(days=1),
+        )
+        self.assertEqual(scorecards.score_pending_days(), 0)
+
+        # a driver-limited run rescores nothing it already has and leaves the watermark
+        later = today + timedelta(days=1)
+        drive(today)
+        self.assertEqual(scorecards.score_pending_days(until=today, driver_ids=[driver.id]), 1)
+        self.assertEqual(
+            AggregationWatermark.objects.get(name=scorecards.WATERMARK_NAME).last_date,
+            today - timedelta(days=1),
+        )
+        self.assertEqual(scorecards.score_pending_days(until=later), 0)
+        self.assertEqual(DriverScorecard.objects.filter(driver=driver).count(), 3)
+
+
+class SegmentStatsTests(TestCase):
+    """Running statistics merge exactly; buffered visits reach SegmentStat."""
+
+    def test_running_stat_matches_numpy(self):
+        values = np.random.default_rng(3).gamma(4.0, 30.0, 500)
+        whole, left, right = RunningStat(), RunningStat(), RunningStat()
+        for i, value in enumerate(values):
+            whole.add(value)
+            (left if i < 200 else right).add(value)
+        left.merge(right)
+        for stat in (whole, left):
+            self.assertEqual(stat.count, 500)
+            self.assertAlmostEqual(stat.mean, values.mean(), places=6)
+            self.assertAlmostEqual(stat.variance, values.var(ddof=1), places=4)
+            self.assertEqual((stat.min, stat.max), (values.min(), values.max()))
+        self.assertEqual(left.sketch, whole.sketch)
+
+    def test_sketch_quantile(self):
+        stat = RunningStat()
+        for seconds in range(1, 1001):
+            stat.add(seconds)
+        self.assertLess(abs(sketch_quantile(stat.sketch, 0.5) / 500 - 1), 0.08)
+        self.assertLess(abs(sketch_quantile(stat.sketch, 0.9) / 900 - 1), 0.08)
+        self.assertIsNone(sketch_quantile([0] * 4, 0.5))
+
+    def test_visits_flushed_when_due(self):
+        route = Route.objects.create(name='Route V', bus_number='BUSV', start_location='A', end_location='B')
+        stops = [
+            Stop.objects.create(route=route, name=f'Stop {i}', order=i, latitude=17.40 + i * 0.01, longitude=78.40)
+            for i in range(2)
+        ]
+        invalidate_topology()
+        aggregator = SegmentAggregator(flush_interval=60, flush_size=100)
+        visits = StopVisitTracker(aggregator)
+        start = timezone.now()
+        at = lambda seconds: start + timedelta(seconds=seconds)
+        self.assertEqual(visits.feed(route.pk, 17.40, 78.40, at(0)), 0)
+        self.assertIsNone(visits.feed(route.pk, 17.40, 78.40, at(30)))
+        self.assertIsNone(visits.feed(route.pk, 17.405, 78.40, at(60)))
+        self.assertEqual(visits.feed(route.pk, 17.41, 78.40, at(300)), 1)
+
+        self.assertEqual(aggregator.flush_due(), 0)
+        self.assertFalse(SegmentStat.objects.exists())
+        aggregator.flush_interval = 0
+        self.assertEqual(aggregator.flush_due(), 2)   # idle writers flush without a new visit
+        rows = {row.kind: row for row in SegmentStat.objects.filter(stop=stops[0])}
+        self.assertEqual((rows['dwell'].count, rows['dwell'].mean), (1, 30))
+        self.assertEqual((rows['travel'].count, rows['travel'].mean), (1, 270))
+        self.assertEqual(aggregator.flush_due(), 0)
+
+    def test_batch_feeder_only_in_batch_mode(self):
+        route = Route.objects.create(name='Route V', bus_number='BUSV', start_location='A', end_location='B')
+        for i in range(2):
+            Stop.objects.create(route=route, name=f'Stop {i}', order=i, latitude=17.40 + i * 0.01, longitude=78.40)
+        driver = Driver.objects.create(
+            user=User.objects.create_user('driver-v'), license_number='LICV', assigned_route=route
+        )
+        invalidate_topology()
+        start = timezone.make_aware(datetime.combine(timezone.localdate() - timedelta(days=1), time(8, 0)))
+        GPSLog.objects.bulk_create(
+            GPSLog(route=route, driver=driver, latitude=lat, longitude=78.40, timestamp=start + timedelta(seconds=s))
+            for lat, s in ((17.40, 0), (17.40, 30), (17.405, 60), (17.41, 300))
+        )
+        SegmentStat.objects.create(route=route, stop=route.stops.get(order=0), kind='dwell', bucket=16,
+                                   count=1, mean=30, m2=0)   # what the live feeder already recorded
+
+        with self.assertRaises(CommandError):
+            call_command('aggregate_segments', stdout=io.StringIO())
+        self.assertIsNone(segments.aggregate_new_days())
+        self.assertEqual(list(SegmentStat.objects.values_list('kind', 'count')), [('dwell', 1)])
+        self.assertFalse(AggregationWatermark.objects.exists())
+
+        with patch('tracking.segments.SOURCE', 'batch'):
+            call_command('aggregate_segments', stdout=io.StringIO())
+        first_stop = SegmentStat.objects.filter(stop__order=0)
+        self.assertEqual(sorted(first_stop.values_list('kind', 'count')), [('dwell', 2), ('travel', 1)])
+
+
+class HeatmapTests(TestCase):
+    """Grid aggregation per cell and the merged bbox read."""
+
+    def test_aggregate_points(self):
+        # route 1 sits in cell A for two minutes then moves north into B; route 2 only in A
+        ts = np.array([0.0, 60.0, 120.0, 180.0, 0.0, 100.0])
+        lats = np.array([17.4001, 17.4001, 17.4051, 17.4051, 17.4001, 17.4001])
+        lons = np.full(ts.shape, 78.4001)
+        speeds = np.array([10.0, 20.0, np.nan, 30.0, np.nan, np.nan])
+        route_ids = np.array([1, 1, 1, 1, 2, 2])
+        cells = heatmap.aggregate_points(ts, lats, lons, speeds, route_ids, level=0)
+
+        self.assertEqual(cells['cell_x'].tolist(), [int((78.4001 + 180) / heatmap.BASE_CELL_DEG)] * 2)
+        self.assertEqual(cells['count'].tolist(), [4, 2])
+        self.assertEqual(cells['speed_samples'].tolist(), [2, 1])
+        self.assertEqual(cells['mean_speed'].tolist(), [15.0, 30.0])
+        # only route 1's pass through A is closed by a later fix of the same route
+        self.assertEqual(cells['dwell_p90'][0], 120.0)
+        self.assertTrue(np.isnan(cells['dwell_p90'][1]))
+
+        coarse = heatmap.aggregate_points(ts, lats, lons, speeds, route_ids, level=3)
+        self.assertEqual(coarse['count'].tolist(), [6])
+
+    def test_level_for_view(self):
+        self.assertEqual(heatmap.level_for_view(17.40, 78.40, 17.42, 78.42), 0)
+        self.assertEqual(heatmap.level_for_view(17.0, 78.0, 18.0, 79.0), 3)   # 0.016 degree cells
+        self.assertEqual(heatmap.level_for_view(0.0, 0.0, 60.0, 60.0), heatmap.LEVELS - 1)
+
+    def test_build_and_read(self):
+        route = Route.objects.create(name='Route H', bus_number='BUSH', start_location='A', end_location='B')
+        driver = Driver.objects.create(
+            user=User.objects.create_user('driver-h'), license_number='LICH', assigned_route=route
+        )
+        yesterday = timezone.localdate() - timedelta(days=1)
+        for days_ago, speed in ((2, 10.0), (1, 30.0)):
+            start = timezone.make_aware(datetime.combine(yesterday - timedelta(days=days_ago - 1), time(8, 0)))
+            GPSLog.objects.bulk_create([
+                GPSLog(route=route, driver=driver, latitude=17.4001, longitude=78.4001, speed=speed, timestamp=start),
+                GPSLog(route=route, driver=driver, latitude=17.4001, longitude=78.4001,
+                       timestamp=start + timedelta(seconds=60)),
+            ])
+
+        self.assertEqual(heatmap.build_new_days()[2], 2 * heatmap.LEVELS)
+        self.assertIsNone(heatmap.build_new_days())
+        level, cells = heatmap.heatmap_cells(
+            (17.39, 78.39, 17.41, 78.41), yesterday - timedelta(days=1), yesterday, level=0
+        )
+        self.assertEqual(level, 0)
+        self.assertEqual(len(cells), 1)
+        self.assertEqual(cells[0][2:], [4, 20.0, None])
+        _, cells = heatmap.heatmap_cells((17.39, 78.39, 17.41, 78.41), yesterday, yesterday, level=0)
+        self.assertEqual(cells[0][2:4], [2, 30.0])
+        self.assertEqual(heatmap.heatmap_cells((18.0, 79.0, 18.1, 79.1), yesterday, yesterday, level=0)[1], [])
+
+
+class FleetIndexTests(TestCase):
+    """Viewport queries return exactly the buses inside the box."""
+
+    def test_bbox_query(self):
+        index = FleetIndex(refresh_seconds=3600)
+        self.assertEqual(index.query(), [])   # loads the (empty) tracker table
+        index.update(1, 17.40, 78.40, updated=100)
+        index.update(2, 17.45, 78.52, updated=100)
+        index.update(3, 12.97, 77.59, updated=100)
+        ids = lambda *args, **kwargs: [entry[0] for entry in index.query(*args, **kwargs)]
+
+        self.assertEqual(ids(), [1, 2, 3])
+        self.assertEqual(ids((17.3, 78.3, 17.5, 78.6)), [1, 2])
+        self.assertEqual(ids((17.3, 78.3, 17.5, 78.45)), [1])
+        self.assertEqual(ids((17.3, 78.3, 17.5, 78.6), route_ids={2, 3}), [2])
+        self.assertEqual(ids((-90, -180, 90, 180)), [1, 2, 3])   # wide view scans the buses
+
+        index.update(1, 12.98, 77.60, updated=101)   # moved cells
+        self.assertEqual(ids((17.3, 78.3, 17.5, 78.45)), [])
+        self.assertEqual(ids((12.9, 77.5, 13.0, 77.7)), [1, 3])
+        index.remove(3)
+        self.assertEqual(ids((12.9, 77.5, 13.0, 77.7)), [1])
+
+
+def decode_protobuf(data):
+    """{field number: [values]} of one protobuf message (varint, fixed32 float, bytes)."""
+    fields, pos = {}, 0
+
+    def varint():
+        nonlocal pos
+        value = shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            value |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                return value
+
+    while pos < len(data):
+        key = varint()
+        field, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value = varint()
+        elif wire_type == 5:
+            value = struct.unpack('<f', data[pos:pos + 4])[0]
+            pos += 4
+        elif wire_type == 2:
+            size = varint()
+            value = data[pos:pos + size]
+            pos += size
+        else:
+            raise ValueError(wire_type)
+        fields.setdefault(field, []).append(value)
+    return fields
+
+
+class VehiclePositionsTests(TestCase):
+    """The hand-written protobuf decodes to the gtfs-realtime.proto fields."""
+
+    def test_varint(self):
+        self.assertEqual(_varint(1), b'\x01')
+        self.assertEqual(_varint(300), b'\xac\x02')
+        self.assertEqual(_varint(2 ** 35), b'\x80\x80\x80\x80\x80\x01')
+
+    def test_feed_message(self):
+        route = Route.objects.create(name='Route G', bus_number='BUSG', start_location='A', end_location='B')
+        stops = [
+            Stop.objects.create(route=route, name=f'Stop {i}', order=i, latitude=17.40 + i * 0.01, longitude=78.40)
+            for i in range(3)
+        ]
+        invalidate_topology()
+        from transport.topology import get_topology
+
+        routes = get_topology().routes
+        buses = [(route.id, 17.41, 78.40, 90.0, 36.0, 1700000000.5), (route.id + 99, 17.4, 78.4, None, None, 0)]
+        message = decode_protobuf(encode_vehicle_positions(buses, routes, 1700000001))
+
+        header = decode_protobuf(message[1][0])
+        self.assertEqual((header[1], header[2], header[3]), ([b'2.0'], [0], [1700000001]))
+        self.assertEqual(len(message[2]), 1)   # unknown route left out
+
+        entity = decode_protobuf(message[2][0])
+        self.assertEqual(entity[1], [f'bus-R{route.id}'.encode()])
+        vehicle = decode_protobuf(entity[4][0])
+        self.assertEqual(decode_protobuf(vehicle[1][0])[5], [f'R{route.id}'.encode()])
+        position = decode_protobuf(vehicle[2][0])
+        self.assertAlmostEqual(position[1][0], 17.41, places=5)
+        self.assertAlmostEqual(position[2][0], 78.40, places=4)
+        self.assertEqual(position[3], [90.0])
+        self.assertAlmostEqual(position[5][0], 10.0, places=5)   # m/s
+        # at the middle stop
+        self.assertEqual((vehicle[3], vehicle[4], vehicle[7]), ([2], [STOPPED_AT], [f'S{stops[1].id}'.encode()]))
+        self.assertEqual(vehicle[5], [1700000000])
+        self.assertEqual(decode_protobuf(vehicle[8][0])[2], [b'BUSG'])
+
+        # half way to the last stop
+        message = decode_protobuf(encode_vehicle_positions([(route.id, 17.415, 78.40, None, None, 0)], routes, 0))
+        vehicle = decode_protobuf(decode_protobuf(message[2][0])[4][0])
+        self.assertEqual((vehicle[3], vehicle[4], vehicle[7]), ([3], [IN_TRANSIT_TO], [f'S{stops[2].id}'.encode()]))
+
+    def test_buffer_shared_within_tick(self):
+        buffer = FeedBuffer(tick=3600)
+        with patch('tracking.gtfs_rt.fleet_index') as index:
+            index.query.return_value = []
+            payload, etag = buffer.get()
+            self.assertEqual(buffer.get(), (payload, etag))
+            buffer.tick = 0
+            self.assertEqual(buffer.get(), (payload, etag))   # same inputs keep the buffer
+        self.assertEqual(index.query.call_count, 2)
+        self.assertEqual(set(decode_protobuf(payload)), {1})
+
+
+class StopAlertTests(TestCase):
+    """Alert evaluation only touches alerts in reach and fires once a day."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.route = Route.objects.create(
+            name='Route 1', bus_number='BUS001', start_location='A', end_location='B'
+        )
+        cls.stops = [
+            Stop.objects.create(
+                route=cls.route, name=f'Stop {i}', order=i,
+                latitude=17.40 + i * 0.01, longitude=78.40, arrival_time=time(8, i * 5),
+            )
+            for i in range(6)
+        ]
+        for i in range(200):
+            student = Student.objects.create(
+                user=User.objects.create_user(f'student{i}'), hall_ticket=f'HT{i:03d}'
+            )
+            StopAlert.objects.create(student=student, stop=cls.stops[1 + i % 5], threshold_minutes=6)
+
+    def setUp(self):
+        invalidate_topology()
+        alert_index.invalidate()
+        alert_index.evaluate(0, 17.40, 78.40)   # warm the index
+
+    def test_fires_for_next_stop_only(self):
+        # 5 planned minutes from stop 0 to stop 1, 10 to stop 2
+        with self.assertNumQueries(1):
+            fired = alert_index.evaluate(self.route.id, 17.40, 78.40, 30)
+        self.assertEqual(fired, 40)
+        self.assertEqual(
+            set(AlertOutbox.objects.values_list('alert__stop', flat=True)), {self.stops[1].id}
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(alert_index.evaluate(self.route.id, 17.401, 78.40, 30), 0)
+
+    def test_index_invalidated_on_commit(self):
+        student = Student.objects.get(hall_ticket='HT000')
+        with self.captureOnCommitCallbacks() as callbacks:
+            StopAlert.objects.create(student=student, stop=self.stops[2], threshold_minutes=15)
+        self.assertEqual(callbacks, [alerts.invalidate_alert_index])
+
+    def test_message_without_bus_number(self):
+        route = Route.objects.create(name='Route N', start_location='A', end_location='B')
+        stops = [
+            Stop.objects.create(route=route, name=f'N{i}', order=i, latitude=18.40 + i * 0.01, longitude=78.40,
+                                arrival_time=time(9, i * 5))
+            for i in range(2)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            StopAlert.objects.create(student=Student.objects.get(hall_ticket='HT000'), stop=stops[1],
+                                     threshold_minutes=10)
+        invalidate_topology()
+        self.assertEqual(alert_index.evaluate(route.id, 18.40, 78.40, 30), 1)
+        self.assertTrue(AlertOutbox.objects.get(alert__stop=stops[1]).message.startswith('Bus Route N is about'))
+
+
+class AlertDeliveryTests(TestCase):
+    """Rows are claimed before sending and retried until MAX_ATTEMPTS."""
+
+    def setUp(self):
+        route = Route.objects.create(name='Route D', bus_number='BUSD', start_location='A', end_location='B')
+        stop = Stop.objects.create(route=route, name='Stop D', order=0, latitude=17.4, longitude=78.4)
+        self.entries = []
+        for i in range(2):
+            student = Student.objects.create(
+                user=User.objects.create_user(f'student-d{i}', f'd{i}@example.com'), hall_ticket=f'HTD{i}'
+            )
+            alert = StopAlert.objects.create(student=student, stop=stop, threshold_minutes=5)
+            self.entries.append(AlertOutbox.objects.create(
+                alert=alert, service_date=timezone.localdate(), message='Bus is near'
+            ))
+
+    def test_send_outside_claim(self):
+        seen = []
+
+        def sender(entry):
+            # the claim is already written when the sender runs
+            seen.append(AlertOutbox.objects.filter(status='sending').count())
+            if entry.id == self.entries[1].id:
+                raise ValueError('mail server down')
+
+        self.assertEqual(alerts.deliver_pending(sender=sender), (1, 1))
+        self.assertEqual(seen, [2, 2])
+        statuses = list(AlertOutbox.objects.order_by('id').values_list('status', 'attempts', 'last_error'))
+        self.assertEqual(statuses, [('sent', 1, ''), ('pending', 1, 'mail server down')])
+
+        def broken(entry):
+            raise ValueError('still down')
+
+        for _ in range(alerts.MAX_ATTEMPTS - 1):
+            alerts.deliver_pending(sender=broken)
+        self.assertEqual(
+            AlertOutbox.objects.get(id=self.entries[1].id).status, 'failed'
+        )
+        self.assertEqual(alerts.deliver_pending(sender=broken), (0, 0))
+
+    def test_abandoned_claims_are_retried(self):
+        claimed = timezone.now() - alerts.CLAIM_TIMEOUT / 2
+        AlertOutbox.objects.update(status='sending', claimed_at=claimed, attempts=1)
+        self.assertEqual(alerts.deliver_pending(sender=lambda entry: None), (0, 0))
+        AlertOutbox.objects.filter(id=self.entries[0].id).update(claimed_at=claimed - alerts.CLAIM_TIMEOUT)
+        self.assertEqual(alerts.deliver_pending(sender=lambda entry: None), (1, 0))
+        self.assertEqual(AlertOutbox.objects.get(id=self.entries[0].id).attempts, 2)
+
+    def test_default_sender_emails_student(self):
+        self.assertEqual(alerts.deliver_pending(), (2, 0))
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['d0@example.com', 'd1@example.com'])
+
+
+class EventConsumerTests(TestCase):
+    """Consumers resume from their cursor and never skip a failed batch."""
+
+    def setUp(self):
+        route = Route.objects.create(
+            name='Route 1', bus_number='BUS001', start_location='A', end_location='B'
+        )
+        past = timezone.now() - timedelta(minutes=1)
+        events.append([events.event('location', route.id, lat=17.4, lon=78.4) for _ in range(25)])
+        LocationEvent.objects.update(created_at=past)   # settled
+
+    def test_batches_resume_from_cursor(self):
+        seen = []
+        consumer = events.EventConsumer('test', batch_size=10)
+        self.assertEqual(consumer.process(lambda batch: seen.extend(e.id for e in batch), max_batches=2), 20)
+        self.assertEqual(consumer.process(lambda batch: seen.extend(e.id for e in batch)), 5)
+        self.assertEqual(seen, sorted(LocationEvent.objects.values_list('id', flat=True)))
+        self.assertEqual(consumer.position, seen[-1])
+
+    def test_failed_batch_is_read_again(self):
+        consumer = events.EventConsumer('test', batch_size=10)
+
+        def fail(batch):
+            raise RuntimeError
+        with self.assertRaises(RuntimeError):
+            consumer.process(fail)
+        self.assertEqual(consumer.position, 0)
+        self.assertEqual(consumer.process(lambda batch: None), 25)
+
+
+class WireFormatTests(SimpleTestCase):
+    """Packed records round-trip; anything malformed is refused as a whole."""
+
+    def fix(self, **fields):
+        base = {"latitude": 17.385044, "longitude": 78.486671, "speed": 32.5,
+                "heading": 271.25, "accuracy": 8.4, "timestamp": 1700000000123.0}
+        return dict(base, **fields)
+
+    def test_round_trip(self):
+        fixes = [self.fix(), self.fix(speed=None, heading=None, accuracy=None, timestamp=None)]
+        body = pack_fixes(fixes)
+        self.assertEqual(len(body), 2 * FIX_RECORD.size)
+        self.assertEqual(unpack_fixes(body), fixes)
+        self.assertEqual(unpack_fixes(memoryview(body)), fixes)
+
+    def test_malformed_bodies(self):
+        record = pack_fixes([self.fix()])
+        self.assertIsNone(unpack_fixes(b''))
+        self.assertIsNone(unpack_fixes(record[:-1]))
+        self.assertIsNone(unpack_fixes(record + b'\x00'))
+        self.assertEqual(len(unpack_fixes(record * MAX_BATCH)), MAX_BATCH)
+        self.assertIsNone(unpack_fixes(record * (MAX_BATCH + 1)))
+
+    def test_range_checks(self):
+        self.assertIsNone(unpack_fixes(FIX_RECORD.pack(90_000_001, 0, 0, 0, 0, 0)))
+        self.assertIsNone(unpack_fixes(FIX_RECORD.pack(0, -180_000_001, 0, 0, 0, 0)))
+        self.assertIsNone(unpack_fixes(pack_fixes([self.fix(timestamp=10 ** 17)])))
+        # one bad record refuses the whole batch
+        self.assertIsNone(unpack_fixes(pack_fixes([self.fix(), self.fix(latitude=95)])))
+        # out-of-range optional values saturate below the "unknown" marker
+        self.assertEqual(unpack_fixes(pack_fixes([self.fix(speed=1e6)]))[0]["speed"], 6553.4)
+
+
+class IngestBatchTests(TestCase):
+    """Only the newest fix of a batch goes live; the rest become history."""
+
+    def test_older_fixes_are_history_only(self):
+        route = Route.objects.create(name='Route W', bus_number='BUSW', start_location='A', end_location='B')
+        driver = Driver.objects.create(
+            user=User.objects.create_user('driver-w'), license_number='LICW', assigned_route=route
+        )
+        start = timezone.now().timestamp() - 60
+        fixes = [
+            {"latitude": 17.40 + i * 0.0002, "longitude": 78.40, "speed": 10.0, "heading": None,
+             "accuracy": 5.0, "timestamp": (start + i * 5) * 1000}
+            for i in range(5)
+        ]
+        fixes.insert(2, dict(fixes[1], latitude=0.0, longitude=0.0))   # rejected, not stored
+
+        with patch('tracking.ingest.alert_index') as alerts, patch('tracking.ingest.fleet_index') as fleet:
+            status, payload = apply_batch(driver.id, route.id, fixes)
+        self.assertEqual((status, payload["batch"]), (200, 6))
+        self.assertEqual(GPSLog.objects.filter(route=route).count(), 5)
+        self.assertEqual(alerts.evaluate.call_count, 1)
+        self.assertEqual(fleet.update.call_count, 1)
+        self.assertEqual(LocationEvent.objects.filter(route_id=route.id, kind='location').count(), 1)
+        tracker = BusTracker.objects.get(route=route)
+        self.assertEqual((tracker.latitude, tracker.longitude), (fixes[-1]["latitude"], 78.40))
+
+
+class IngestQueueTests(SimpleTestCase):
+    """A full queue sheds to live state; the newest shed fix is written later."""
+
+    def fix(self, lat, longitude=78.4):
+        return {"latitude": lat, "longitude": longitude, "speed": 20.0, "heading": None}
+
+    def test_shed_and_backlog(self):
+        started, gate, done = threading.Event(), threading.Event(), threading.Event()
+        written = []
+
+        def handler(driver_id, route_id, fixes):
+            started.set()
+            gate.wait(5)
+            written.append((route_id, fixes[-1]["latitude"]))
+            if len(written) == 3:
+                done.set()
+            return 200, {}
+
+        ingest = IngestQueue(size=1, writers=1, handler=handler, housekeeping=lambda: None)
+        first = ingest.submit(1, 901, [self.fix(17.1)])
+        self.assertTrue(started.wait(5))    # the writer holds the first batch
+        self.assertIsNotNone(ingest.submit(2, 902, [self.fix(17.2)]))   # fills the queue
+        self.assertIsNone(ingest.submit(3, 903, [self.fix(17.3)]))
+
+        self.assertTrue(ingest.shed(3, 903, self.fix(17.3)))
+        self.assertTrue(ingest.shed(3, 903, self.fix(17.3001)))
+        # shed fixes are validated before they go live
+        with patch('tracking.ingest_queue.error_recorder') as recorder:
+            self.assertFalse(ingest.shed(3, 903, self.fix(0.0, longitude=0.0)))
+            self.assertFalse(ingest.shed(3, 903, self.fix(17.5)))   # 22 km in a second
+        self.assertEqual(
+            [call.args[1] for call in recorder.record.call_args_list], ['invalid_coords', 'position_jump']
+        )
+        self.assertEqual(fleet_index.latest(903)[1], 17.3001)
+        self.assertGreaterEqual(ingest.retry_after(), 1)
+
+        gate.set()
+        self.assertEqual(first.result(timeout=5), (200, {}))
+        self.assertTrue(done.wait(5))
+        self.assertEqual(written, [(901, 17.1), (902, 17.2), (903, 17.3001)])
+
+        metrics = ingest.metrics()
+        self.assertEqual(
+            (metrics['enqueued'], metrics['applied'], metrics['shed'], metrics['shed_rejected'],
+             metrics['backlog_superseded']),
+            (2, 2, 2, 2, 1),
+        )
+        fleet_index.remove(903)
+        fix_validator.forget(903)
+
+
+class FleetSimulatorTests(TestCase):
+    """Simulated data is consistent, reproducible and removable."""
+
+    def test_build_and_clear(self):
+        fleet = build_fleet(routes=3, stops_per_route=4, students=10, seed=7)
+        self.assertEqual(Route.objects.filter(name__startswith='SIM ').count(), 3)
+        self.assertEqual(Stop.objects.filter(route__name__startswith='SIM ').count(), 12)
+        self.assertEqual(
+            Driver.objects.filter(assigned_route__name__startswith='SIM ').count(), 3
+        )
+        self.assertEqual(Student.objects.filter(boarding_stop__route=models.F('active_route')).count(), 10)
+
+        route = fleet.routes[0]
+        self.assertEqual(route.position(0)[:2], route.points[0])
+        lat, lon, _ = route.position(route.length + 1)    # wraps to the start
+        self.assertAlmostEqual(lat, route.points[0][0], places=3)
+
+        again = build_fleet(routes=3, stops_per_route=4, students=10, seed=7)
+        self.assertEqual(again.routes[0].points, route.points)
+
+        self.assertEqual(clear_fleet(), 3)
+        self.assertFalse(Driver.objects.filter(license_number__startswith='SIM-').exists())
+
+
+class SyntheticDataTests(TestCase):
+    """Generated rows match the requested counts, are seeded and removable."""
+
+    def generate(self, chunk):
+        return SyntheticData(
+            seed=5, students=12, routes=3, stops=9, gps_logs=120,
+            fee_records=20, fee_payments=25, days=2, chunk=chunk,
+        ).generate()
+
+    def test_generate_and_clear(self):
+        from payments.models import FeePayment, FeeRecord
+
+        counts = self.generate(chunk=7)
+        self.assertEqual(counts['GPSLog'], 120)
+        self.assertEqual(Student.objects.filter(hall_ticket__startswith='SYN').count(), 12)
+        self.assertEqual(FeeRecord.objects.count(), 20)
+        self.assertEqual(FeePayment.objects.count(), counts['FeePayment'])
+        self.assertFalse(User.objects.get(username='syn-student-0').has_usable_password())
+        self.assertEqual(User.objects.get(username='syn-student-0').profile.role, 'student')
+        # history is spread over past days, not stamped "now"
+        self.assertLess(GPSLog.objects.order_by('created_at').first().created_at,
+                        timezone.now() - timedelta(days=1))
+
+        logs = list(GPSLog.objects.order_by('pk').values_list('latitude', 'longitude', 'timestamp'))
+        self.assertEqual(clear_synthetic(), 3)
+        self.assertFalse(GPSLog.objects.exists())
+        self.assertFalse(User.objects.filter(username__startswith='syn-').exists())
+
+        self.generate(chunk=50)
+        self.assertEqual(
+            list(GPSLog.objects.order_by('pk').values_list('latitude', 'longitude', 'timestamp')), logs
+        )
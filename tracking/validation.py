@@ -0,0 +1,243 @@
+"""
+SERVER-SIDE GPS FIX VALIDATION.
+
+Every fix posted by a driver phone passes through here before it touches
+BusTracker or GPSLog.
+
+Design:
+- Each fix is checked against the previous *accepted* fix of the same route.
+  That state is one small tuple per route kept in process memory, so a
+  check is O(1) and never queries the database.
+- Bad fixes are either rejected (never reach live state) or flagged
+  (accepted, but the suspicious field is dropped).
+- Errors are buffered and written to LocationError in batches. Repeats of
+  the same problem on the same route collapse into one open row whose
+  occurrence_count is bumped, instead of one row per bad ping. Besides
+  record() itself, idle ingest writers call flush_due(), so a buffer is
+  never older than ERROR_FLUSH_INTERVAL once traffic stops.
+- Device times are untrusted: plausible_device_time() bounds them before
+  anything converts them to datetimes.
+"""
+import math
+import threading
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+
+
+MAX_ACCURACY_METERS = getattr(settings, 'TRACKING_MAX_ACCURACY_METERS', 500)
+MAX_SPEED_KMH = getattr(settings, 'TRACKING_MAX_SPEED_KMH', 120)
+
+# A position that keeps "jumping" for this many fixes in a row is accepted as
+# a fresh anchor: the previous fix was the outlier, not the new ones.
+MAX_CONSECUTIVE_JUMPS = 3
+
+ERROR_FLUSH_INTERVAL = 5.0   # seconds between LocationError writes
+ERROR_FLUSH_SIZE = 50        # pending (tracker, type) pairs that force a write
+
+# Device clocks may run a little ahead; further ahead, or before this
+# project's era (an unset clock), the value is garbage rather than time.
+MAX_CLOCK_AHEAD_SECONDS = getattr(settings, 'TRACKING_MAX_CLOCK_AHEAD_SECONDS', 300)
+EARLIEST_DEVICE_TIME = 946684800   # 2000-01-01 UTC
+
+EARTH_RADIUS_M = 6371000
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters between two lat/lon points."""
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    delta_lat = math.radians(lat2 - lat1)
+    delta_lon = math.radians(lon2 - lon1)
+
+    a = (
+        math.sin(delta_lat / 2) ** 2 +
+        math.cos(lat1_rad) * math.cos(lat2_rad) *
+        math.sin(delta_lon / 2) ** 2
+    )
+    return EARTH_RADIUS_M * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def plausible_device_time(timestamp_ms):
+    """True if epoch milliseconds ``timestamp_ms`` can be a real device time."""
+    if not math.isfinite(timestamp_ms):
+        return False
+    return EARLIEST_DEVICE_TIME <= timestamp_ms / 1000 <= time.time() + MAX_CLOCK_AHEAD_SECONDS
+
+
+@dataclass
+class FixResult:
+    """Outcome of validating one fix."""
+    accepted: bool
+    error_type: str = None
+    message: str = ''
+    speed: float = None
+
+
+class FixValidator:
+    """
+    Validates fixes against the previous accepted fix of each route.
+
+    State per route: (lat, lon, epoch_seconds, consecutive_jumps).
+    """
+
+    def __init__(self, max_accuracy=MAX_ACCURACY_METERS, max_speed_kmh=MAX_SPEED_KMH):
+        self.max_accuracy = max_accuracy
+        self.max_speed_kmh = max_speed_kmh
+        self._last = {}
+        self._lock = threading.Lock()
+
+    def check(self, route_id, lat, lon, accuracy=None, speed=None, timestamp=None):
+        """
+        Validate a fix and, if accepted, remember it as the route's anchor.
+
+        Args:
+            route_id: Route the fix belongs to
+            lat, lon: Coordinates in degrees
+            accuracy: Reported accuracy in meters (optional)
+            speed: Reported speed in km/h (optional)
+            timestamp: Device time as epoch seconds (defaults to now)
+
+        Returns:
+            FixResult. For flagged fixes ``accepted`` is True and
+            ``error_type`` is set; ``speed`` is the value safe to store.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+
+        if not (math.isfinite(lat) and math.isfinite(lon)):
+            return FixResult(False, 'invalid_coords', 'Non-numeric coordinates')
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            return FixResult(False, 'invalid_coords', f'Out of range: {lat}, {lon}')
+        if abs(lat) < 1e-6 and abs(lon) < 1e-6:
+            return FixResult(False, 'invalid_coords', 'Null island (0, 0) fix')
+        if accuracy is not None and accuracy > self.max_accuracy:
+            return FixResult(False, 'accuracy_low', f'Accuracy {accuracy:.0f} m')
+
+        with self._lock:
+            previous = self._last.get(route_id)
+            if previous is not None:
+                prev_lat, prev_lon, prev_ts, jumps = previous
+                elapsed = max(timestamp - prev_ts, 1.0)
+                implied_kmh = haversine_m(prev_lat, prev_lon, lat, lon) / elapsed * 3.6
+                if implied_kmh > self.max_speed_kmh and jumps + 1 < MAX_CONSECUTIVE_JUMPS:
+                    self._last[route_id] = (prev_lat, prev_lon, prev_ts, jumps + 1)
+                    return FixResult(
+                        False, 'position_jump',
+                        f'Implied speed {implied_kmh:.0f} km/h over {elapsed:.0f} s'
+                    )
+            self._last[route_id] = (lat, lon, timestamp, 0)
+
+        if speed is not None and not (0 <= speed <= self.max_speed_kmh):
+            return FixResult(True, 'speed_invalid', f'Reported speed {speed:.0f} km/h')
+        return FixResult(True, speed=speed)
+
+    def forget(self, route_id):
+        """Drop the anchor for a route (e.g. when a trip ends)."""
+        with self._lock:
+            self._last.pop(route_id, None)
+
+
+class ErrorRecorder:
+    """
+    Buffers validation errors and writes them to LocationError in batches.
+
+    Pending entries are keyed by (route_id, error_type). On flush, each key
+    either bumps the matching open LocationError or creates a new one.
+    """
+
+    def __init__(self, flush_interval=ERROR_FLUSH_INTERVAL, flush_size=ERROR_FLUSH_SIZE):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._pending = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, route_id, error_type, message=''):
+        """Queue one occurrence; flushes if the batch is big or old enough."""
+        from django.utils import timezone
+
+        with self._lock:
+            count, _, _ = self._pending.get((route_id, error_type), (0, '', None))
+            self._pending[(route_id, error_type)] = (count + 1, message, timezone.now())
+            due = (
+                len(self._pending) >= self.flush_size or
+                time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def flush_due(self):
+        """Flush if anything has waited flush_interval; for callers with no new error."""
+        if self._pending and time.monotonic() - self._last_flush >= self.flush_interval:
+            return self.flush()
+        return 0
+
+    def flush(self):
+        """Write all pending errors. Returns the number of rows touched."""
+        from django.db import transaction
+        from django.db.models import F
+        from transport.models import Route
+        from .models import BusTracker, LocationError
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        # Routes deleted since the error was seen have nowhere to keep it
+        route_ids = set(
+            Route.objects.filter(pk__in={route_id for route_id, _ in pending}).values_list('pk', flat=True)
+        )
+        # Errors are kept per route: a route whose first fix was rejected
+        # has no tracker yet, and its errors matter just as much
+        trackers = dict(
+            BusTracker.objects.filter(route_id__in=route_ids).values_list('route_id', 'id')
+        )
+
+        with transaction.atomic():
+            open_errors = {
+                (error.route_id, error.error_type): error
+                for error in LocationError.objects.filter(
+                    route_id__in=route_ids,
+                    error_type__in={error_type for _, error_type in pending},
+                    resolved_at__isnull=True,
+                )
+            }
+
+            to_update, to_create = [], []
+            for (route_id, error_type), (count, message, seen) in pending.items():
+                if route_id not in route_ids:
+                    continue
+                error = open_errors.get((route_id, error_type))
+                if error is not None:
+                    error.occurrence_count = F('occurrence_count') + count
+                    error.error_message = message
+                    error.last_seen = seen
+                    error.tracker_id = error.tracker_id or trackers.get(route_id)
+                    to_update.append(error)
+                else:
+                    to_create.append(LocationError(
+                        route_id=route_id,
+                        tracker_id=trackers.get(route_id),
+                        error_type=error_type,
+                        error_message=message,
+                        occurrence_count=count,
+                        last_seen=seen,
+                    ))
+
+            if to_update:
+                LocationError.objects.bulk_update(
+                    to_update, ['occurrence_count', 'error_message', 'last_seen', 'tracker']
+                )
+            if to_create:
+                LocationError.objects.bulk_create(to_create)
+
+        return len(to_update) + len(to_create)
+
+
+# Process-wide instances used by the ingest view
+fix_validator = FixValidator()
+error_recorder = ErrorRecorder()
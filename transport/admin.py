@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Route, Stop, RouteSchedule
+from .stats import with_route_stats
 
 
 class StopInline(admin.TabularInline):
@@ -25,13 +26,13 @@ class RouteAdmin(admin.ModelAdmin):
     
     fieldsets = (
         ('Route Info', {
-            'fields': ('name', 'bus_number'),
+            'fields': ('name', 'bus_number', 'gtfs_id'),
         }),
         ('Route Path', {
             'fields': ('start_location', 'end_location'),
         }),
         ('Status', {
-            'fields': ('is_active',),
+            'fields': ('is_active', 'speed_limit_kmh'),
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
@@ -39,17 +40,24 @@ class RouteAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        # One query for all three count columns (see transport.stats)
+        return with_route_stats(super().get_queryset(request))
+    
     def get_stop_count(self, obj):
-        return obj.stops.count()
+        return obj.stop_count
     get_stop_count.short_description = 'Stops'
+    get_stop_count.admin_order_field = 'stop_count'
     
     def get_driver_count(self, obj):
-        return obj.drivers.filter(is_active=True).count()
+        return obj.active_driver_count
     get_driver_count.short_description = 'Active Drivers'
+    get_driver_count.admin_order_field = 'active_driver_count'
     
     def get_student_count(self, obj):
-        return obj.students.count()
+        return obj.student_count
     get_student_count.short_description = 'Students'
+    get_student_count.admin_order_field = 'student_count'
 
 
 @admin.register(Stop)
@@ -62,7 +70,7 @@ class StopAdmin(admin.ModelAdmin):
     
     fieldsets = (
         ('Route & Sequence', {
-            'fields': ('route', 'order'),
+            'fields': ('route', 'order', 'gtfs_id'),
         }),
         ('Stop Details', {
             'fields': ('name', 'arrival_time'),
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class TransportConfig(AppConfig):
     name = 'transport'
+
+    def ready(self):
+        """Initialize signals when app is ready."""
+        import transport.signals  # Import to register signals
@@ -0,0 +1,152 @@
+"""
+HASHED STATIC JSON BUNDLE of route and stop geometry.
+
+Every student sees the same routes and stops, so the geometry is written
+once as a minified JSON file whose name carries its content hash:
+
+    STATIC_ROOT/bundles/routes.<md5[:12]>.json   (+ .gz, + .br if brotli is installed)
+
+WhiteNoise serves those files like any other static asset and, because the
+name matches WHITENOISE_IMMUTABLE_FILE_TEST, with far-future immutable
+cache headers. The page only embeds the URL, so after the first download
+the app server does no work for geometry at all.
+
+Bundles are (re)built:
+- by ``manage.py build_route_bundle`` (run it after collectstatic on deploy)
+- lazily by route_bundle_url() the first time a page asks after a
+  Route/Stop/RouteSchedule change (tracked by the topology version)
+Both prune to the KEEP_BUNDLES most recently written afterwards, so edits
+over a term do not pile up files.
+
+The same data always yields the same file name, so concurrent workers
+building the same bundle write identical files.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from django.conf import settings
+
+from .topology import get_topology
+
+
+BUNDLE_DIR = 'bundles'
+BUNDLE_PREFIX = 'routes'
+KEEP_BUNDLES = 5   # older bundles stay for pages rendered before a change
+
+_built = {}   # topology version -> bundle URL
+_build_lock = threading.Lock()
+
+
+def render_route_bundle(topology=None):
+    """Minified JSON bytes of all active routes that have stops."""
+    topology = topology or get_topology()
+    data = {
+        'routes': [
+            {
+                'id': route.id,
+                'name': route.name,
+                'bus_number': route.bus_number,
+                'stops': [
+                    [
+                        route.stop_names[i],
+                        route.stop_arrivals[i].strftime('%H:%M') if route.stop_arrivals[i] else '',
+                        route.stop_lats[i],
+                        route.stop_lons[i],
+                    ]
+                    for i in range(route.stop_count)
+                ],
+            }
+            for route in topology.active
+            if route.stop_count
+        ],
+    }
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def bundle_root():
+    return Path(settings.STATIC_ROOT) / BUNDLE_DIR
+
+
+def _write_atomic(path, content):
+    if path.exists():
+        # Same content again (e.g. an edit was undone): it is the newest now
+        os.utime(path)
+        return
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    tmp.write_bytes(content)
+    os.replace(tmp, path)
+
+
+def write_route_bundle(topology=None):
+    """
+    Write the bundle (and its precompressed variants) if it does not exist.
+
+    Returns:
+        Static-relative name, e.g. 'bundles/routes.3f2a9c0d1e4b.json'
+    """
+    content = render_route_bundle(topology)
+    digest = hashlib.md5(content, usedforsecurity=False).hexdigest()[:12]
+    filename = f'{BUNDLE_PREFIX}.{digest}.json'
+
+    root = bundle_root()
+    root.mkdir(parents=True, exist_ok=True)
+    path = root / filename
+    _write_atomic(path, content)
+    _write_atomic(path.with_name(filename + '.gz'), gzip.compress(content, 9, mtime=0))
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        _write_atomic(path.with_name(filename + '.br'), brotli.compress(content))
+
+    return f'{BUNDLE_DIR}/{filename}'
+
+
+def prune_route_bundles(keep=KEEP_BUNDLES):
+    """Delete all but the ``keep`` newest bundles. Returns files removed."""
+    root = bundle_root()
+    if not root.is_dir():
+        return 0
+    bundles = sorted(
+        root.glob(f'{BUNDLE_PREFIX}.*.json'),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )
+    removed = 0
+    for stale in bundles[keep:]:
+        for path in (stale, stale.with_name(stale.name + '.gz'), stale.with_name(stale.name + '.br')):
+            if path.exists():
+                path.unlink()
+                removed += 1
+    return removed
+
+
+def route_bundle_url():
+    """
+    URL of the bundle for the current topology, building it if needed.
+
+    Returns None if the bundle cannot be written (e.g. read-only STATIC_ROOT);
+    callers should then embed the data in the page instead.
+    """
+    topology = get_topology()
+    url = _built.get(topology.version)
+    if url is not None:
+        return url
+
+    with _build_lock:
+        url = _built.get(topology.version)
+        if url is None:
+            try:
+                name = write_route_bundle(topology)
+                prune_route_bundles()
+            except OSError:
+                return None
+            url = settings.STATIC_URL + name
+            _built.clear()
+            _built[topology.version] = url
+    return url
@@ -0,0 +1,532 @@
+"""
+GTFS STATIC import and export for routes, stops and schedules.
+
+    import_feed('feed.zip' or 'feed/')    # -> counts, raises GTFSError
+    export_feed('feed.zip')
+
+Mapping (our model is simpler than GTFS):
+- routes.txt      -> Route, matched on Route.gtfs_id, then on name
+- stops.txt +     -> the route's Stops, in the stop_sequence of its
+  stop_times.txt     longest trip, with that trip's arrival times
+- trips.txt +     -> RouteSchedule: for each weekday the route's earliest
+  calendar.txt       trip that day gives departure (first stop) and
+                     arrival (last stop). Later trips that day have no
+                     place in RouteSchedule and are counted as skipped.
+
+Import design:
+- CSV files are streamed row by row (zip members or a directory).
+  stop_times.txt, the big one, is read twice: first for per-trip
+  summaries, then again for the sequences of the chosen trips only.
+- Every file is validated (columns, ids, coordinates, times) before
+  anything is written; all problems come back together in GTFSError.
+- Writes happen in one transaction with bulk_create/bulk_update. Existing
+  stops are matched (gtfs_id, then name) and updated in place, so their
+  arrivals, alerts and statistics survive. Stops no longer in the feed
+  are deleted; schedules no longer in the feed are deactivated.
+- A trip that visits a stop_id more than once (loop routes) gets one Stop
+  per visit, all with that gtfs_id; a re-import matches the visits to
+  the existing Stops in order, so none of them is recreated.
+- bulk writes send no signals, so the topology and route summary caches
+  are invalidated explicitly.
+"""
+import csv
+import io
+import os
+import zipfile
+from datetime import time, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+ROUTE_TYPE_BUS = 3
+ORDER_SHIFT = 1000000   # parks reordered stops out of the way of unique (route, order)
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+REQUIRED_COLUMNS = {
+    'routes.txt': ('route_id',),
+    'stops.txt': ('stop_id', 'stop_lat', 'stop_lon'),
+    'trips.txt': ('route_id', 'service_id', 'trip_id'),
+    'stop_times.txt': ('trip_id', 'stop_id', 'stop_sequence'),
+    'calendar.txt': ('service_id',) + WEEKDAYS,
+}
+MAX_ERRORS = 50
+
+
+class GTFSError(ValueError):
+    """The feed failed validation; ``errors`` lists every problem found."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('; '.join(errors[:5]) + (' ...' if len(errors) > 5 else ''))
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+class FeedSource:
+    """Opens feed files from a .zip archive or a directory."""
+
+    def __init__(self, path):
+        self.path = path
+        self._zip = zipfile.ZipFile(path) if zipfile.is_zipfile(path) else None
+
+    def __contains__(self, name):
+        if self._zip is not None:
+            return name in self._zip.namelist()
+        return os.path.exists(os.path.join(self.path, name))
+
+    def rows(self, name, errors):
+        """Yield (line number, row dict) for ``name``; column problems go to ``errors``."""
+        if self._zip is not None:
+            raw = self._zip.open(name)
+        else:
+            raw = open(os.path.join(self.path, name), 'rb')
+        with io.TextIOWrapper(raw, encoding='utf-8-sig', newline='') as handle:
+            reader = csv.DictReader(handle)
+            missing = [c for c in REQUIRED_COLUMNS[name] if c not in (reader.fieldnames or ())]
+            if missing:
+                errors.append(f"{name}: missing column(s) {', '.join(missing)}")
+                return
+            for line, row in enumerate(reader, start=2):
+                yield line, {key: (value or '').strip() for key, value in row.items() if key}
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+
+
+def parse_time(value):
+    """GTFS H:MM:SS (hours may pass 24) -> seconds after midnight."""
+    hours, minutes, seconds = (int(part) for part in value.split(':'))
+    if not (0 <= minutes < 60 and 0 <= seconds < 60 and hours >= 0):
+        raise ValueError(value)
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def _clock(seconds):
+    seconds %= 24 * 3600
+    return time(seconds // 3600, seconds % 3600 // 60, seconds % 60)
+
+
+def _error(errors, message):
+    if len(errors) < MAX_ERRORS:
+        errors.append(message)
+
+
+def read_feed(path):
+    """
+    Validate a feed and reduce it to what our models hold.
+
+    Returns:
+        {'routes': {gtfs route id: {'name', 'bus_number', 'start', 'end',
+                    'stops': [(stop id, name, lat, lon, arrival time)],
+                    'days': {weekday: (departure, arrival)}}},
+         'skipped_trips': int}
+    """
+    source = FeedSource(path)
+    errors = []
+    try:
+        for name in REQUIRED_COLUMNS:
+            if name not in source:
+                errors.append(f"{name}: file missing")
+        if errors:
+            raise GTFSError(errors)
+
+        routes, names, bus_numbers = {}, set(), set()
+        for line, row in source.rows('routes.txt', errors):
+            if not row['route_id']:
+                _error(errors, f"routes.txt:{line}: empty route_id")
+                continue
+            name = row.get('route_long_name') or row.get('route_short_name') or row['route_id']
+            bus_number = row.get('route_short_name') or None
+            if name in names or (bus_number and bus_number in bus_numbers):
+                _error(errors, f"routes.txt:{line}: duplicate route name or short name {name!r}")
+                continue
+            names.add(name)
+            bus_numbers.add(bus_number)
+            routes[row['route_id']] = {'name': name, 'bus_number': bus_number}
+
+        stops = {}
+        for line, row in source.rows('stops.txt', errors):
+            try:
+                lat, lon = float(row['stop_lat']), float(row['stop_lon'])
+                if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                    raise ValueError
+            except ValueError:
+                _error(errors, f"stops.txt:{line}: bad coordinates for stop {row['stop_id']!r}")
+                continue
+            stops[row['stop_id']] = (row.get('stop_name') or row['stop_id'], lat, lon)
+
+        services = {}
+        for line, row in source.rows('calendar.txt', errors):
+            if any(row[day] not in ('0', '1') for day in WEEKDAYS):
+                _error(errors, f"calendar.txt:{line}: weekday flags must be 0 or 1")
+                continue
+            services[row['service_id']] = [i for i, day in enumerate(WEEKDAYS) if row[day] == '1']
+
+        trips = {}
+        for line, row in source.rows('trips.txt', errors):
+            if row['route_id'] not in routes:
+                _error(errors, f"trips.txt:{line}: unknown route_id {row['route_id']!r}")
+            elif row['service_id'] not in services:
+                _error(errors, f"trips.txt:{line}: unknown service_id {row['service_id']!r}")
+            else:
+                trips[row['trip_id']] = (row['route_id'], row['service_id'])
+
+        # Pass 1: count, first departure and last arrival per trip
+        summary = {}   # trip_id -> [count, first seq, departure, last seq, arrival]
+        for line, row in source.rows('stop_times.txt', errors):
+            if row['trip_id'] not in trips:
+                _error(errors, f"stop_times.txt:{line}: unknown trip_id {row['trip_id']!r}")
+                continue
+            if row['stop_id'] not in stops:
+                _error(errors, f"stop_times.txt:{line}: unknown stop_id {row['stop_id']!r}")
+                continue
+            try:
+                sequence = int(row['stop_sequence'])
+                arrival = parse_time(row['arrival_time']) if row.get('arrival_time') else None
+                departure = parse_time(row['departure_time']) if row.get('departure_time') else arrival
+            except ValueError:
+                _error(errors, f"stop_times.txt:{line}: bad stop_sequence or time")
+                continue
+            entry = summary.get(row['trip_id'])
+            if entry is None:
+                summary[row['trip_id']] = [1, sequence, departure, sequence, arrival]
+                continue
+            entry[0] += 1
+            if sequence < entry[1]:
+                entry[1], entry[2] = sequence, departure
+            if sequence > entry[3]:
+                entry[3], entry[4] = sequence, arrival
+        if errors:
+            raise GTFSError(errors)
+
+        # Longest trip per route defines its stops; earliest trip per day its schedule
+        pattern = {}
+        days = {route_id: {} for route_id in routes}
+        skipped = 0
+        for trip_id, (count, _, departure, _, arrival) in summary.items():
+            route_id, service_id = trips[trip_id]
+            best = pattern.get(route_id)
+            if best is None or (count, -(departure or 0)) > (best[1], -(best[2] or 0)):
+                pattern[route_id] = (trip_id, count, departure)
+            if departure is None or arrival is None:
+                _error(errors, f"stop_times.txt: trip {trip_id!r} has no first departure or last arrival time")
+                continue
+            for weekday in services[service_id]:
+                current = days[route_id].get(weekday)
+                if current is not None:
+                    skipped += 1
+                    if current[0] <= departure:
+                        continue
+                days[route_id][weekday] = (departure, arrival)
+        if errors:
+            raise GTFSError(errors)
+
+        # Pass 2: stop sequences of the pattern trips only
+        chosen = {trip_id: route_id for route_id, (trip_id, _, _) in pattern.items()}
+        sequences = {route_id: [] for route_id in pattern}
+        for _, row in source.rows('stop_times.txt', errors):
+            route_id = chosen.get(row['trip_id'])
+            if route_id is not None:
+                arrival = row.get('arrival_time') or row.get('departure_time')
+                sequences[route_id].append(
+                    (int(row['stop_sequence']), row['stop_id'], parse_time(arrival) if arrival else None)
+                )
+    finally:
+        source.close()
+
+    result = {}
+    for route_id, route in routes.items():
+        sequence = sorted(sequences.get(route_id, ()))
+        route_stops = [
+            (stop_id, *stops[stop_id], _clock(arrival) if arrival is not None else None)
+            for _, stop_id, arrival in sequence
+        ]
+        result[route_id] = dict(
+            route,
+            start=route_stops[0][1] if route_stops else '',
+            end=route_stops[-1][1] if route_stops else '',
+            stops=route_stops,
+            days={day: (_clock(dep), _clock(arr)) for day, (dep, arr) in days[route_id].items()},
+        )
+    return {'routes': result, 'skipped_trips': skipped}
+
+
+# ---------------------------------------------------------------------------
+# Import
+# ---------------------------------------------------------------------------
+
+def _sync_stops(route, feed_stops, existing):
+    """Match, update, create and delete ``route``'s stops to follow the feed."""
+    from .models import Stop
+
+    # A stop_id may repeat along a loop: each visit takes the next unclaimed Stop
+    by_gtfs, by_name = {}, {}
+    for stop in sorted(existing, key=lambda stop: stop.order):
+        if stop.gtfs_id:
+            by_gtfs.setdefault(stop.gtfs_id, []).append(stop)
+        by_name.setdefault(stop.name, []).append(stop)
+
+    claimed = set()
+
+    def unclaimed(candidates):
+        return next((stop for stop in candidates if stop.pk not in claimed), None)
+
+    changed, moved, created = [], [], []
+    for order, (gtfs_id, name, lat, lon, arrival) in enumerate(feed_stops, start=1):
+        stop = unclaimed(by_gtfs.get(gtfs_id, ())) or unclaimed(by_name.get(name, ()))
+        if stop is None:
+            created.append(Stop(
+                route=route, order=order, gtfs_id=gtfs_id, name=name,
+                latitude=lat, longitude=lon, arrival_time=arrival,
+            ))
+            continue
+        claimed.add(stop.pk)
+        if stop.order != order:
+            moved.append(stop)
+        values = (order, gtfs_id, name, lat, lon, arrival)
+        if (stop.order, stop.gtfs_id, stop.name, stop.latitude, stop.longitude, stop.arrival_time) != values:
+            stop.order, stop.gtfs_id, stop.name, stop.latitude, stop.longitude, stop.arrival_time = values
+            changed.append(stop)
+
+    removed = [stop.pk for stop in existing if stop.pk not in claimed]
+    return changed, moved, created, removed
+
+
+@transaction.atomic
+def import_feed(path, dry_run=False):
+    """
+    Import a GTFS feed (zip or directory).
+
+    Returns:
+        dict of counts: routes_created, routes_updated, stops_created,
+        stops_updated, stops_deleted, schedules_written, skipped_trips
+    """
+    from .models import Route, RouteSchedule, Stop
+    from .stats import invalidate_route_summary
+    from .topology import invalidate_topology
+
+    feed = read_feed(path)
+    feed_routes = feed['routes']
+    counts = dict.fromkeys(
+        ('routes_created', 'routes_updated', 'stops_created', 'stops_updated',
+         'stops_deleted', 'schedules_written'), 0
+    )
+    counts['skipped_trips'] = feed['skipped_trips']
+
+    # Routes
+    existing = list(Route.objects.filter(gtfs_id__in=feed_routes)) + list(
+        Route.objects.filter(gtfs_id__isnull=True, name__in=[r['name'] for r in feed_routes.values()])
+    )
+    by_gtfs = {route.gtfs_id: route for route in existing if route.gtfs_id}
+    by_name = {route.name: route for route in existing if not route.gtfs_id}
+    new_routes, updated_routes = [], []
+    for gtfs_id, data in feed_routes.items():
+        route = by_gtfs.get(gtfs_id) or by_name.pop(data['name'], None)
+        fields = dict(
+            gtfs_id=gtfs_id, name=data['name'], bus_number=data['bus_number'],
+            start_location=data['start'], end_location=data['end'],
+        )
+        if route is None:
+            new_routes.append(Route(**fields))
+        elif any(getattr(route, field) != value for field, value in fields.items()):
+            for field, value in fields.items():
+                setattr(route, field, value)
+            updated_routes.append(route)
+    now = timezone.now()
+    for route in updated_routes:
+        route.updated_at = now   # bulk_update skips auto_now
+    try:
+        Route.objects.bulk_create(new_routes)
+        Route.objects.bulk_update(
+            updated_routes,
+            ['gtfs_id', 'name', 'bus_number', 'start_location', 'end_location', 'updated_at'],
+            batch_size=500,
+        )
+    except IntegrityError as exc:
+        raise GTFSError([f"routes.txt: clashes with an existing route ({exc})"])
+    counts['routes_created'], counts['routes_updated'] = len(new_routes), len(updated_routes)
+    routes = {route.gtfs_id: route for route in Route.objects.filter(gtfs_id__in=feed_routes)}
+
+    # Stops
+    current = {}
+    for stop in Stop.objects.filter(route__in=routes.values()):
+        current.setdefault(stop.route_id, []).append(stop)
+    changed, moved, created, removed = [], [], [], []
+    for gtfs_id, route in routes.items():
+        route_changes = _sync_stops(route, feed_routes[gtfs_id]['stops'], current.get(route.pk, []))
+        for bucket, items in zip((changed, moved, created, removed), route_changes):
+            bucket += items
+    Stop.objects.filter(pk__in=removed).delete()
+    if moved:
+        # Free every final order first: unique (route, order) is checked per row
+        Stop.objects.filter(pk__in=[stop.pk for stop in moved]).update(order=F('order') + ORDER_SHIFT)
+    for stop in changed:
+        stop.updated_at = now
+    Stop.objects.bulk_update(
+        changed, ['order', 'gtfs_id', 'name', 'latitude', 'longitude', 'arrival_time', 'updated_at'],
+        batch_size=500,
+    )
+    Stop.objects.bulk_create(created, batch_size=500)
+    counts['stops_created'], counts['stops_updated'], counts['stops_deleted'] = (
+        len(created), len(changed), len(removed)
+    )
+
+    # Schedules
+    schedules = {
+        (s.route_id, s.day_of_week): s
+        for s in RouteSchedule.objects.filter(route__in=routes.values())
+    }
+    new_schedules, updated_schedules = [], []
+    for gtfs_id, route in routes.items():
+        feed_days = feed_routes[gtfs_id]['days']
+        for day in range(7):
+            schedule = schedules.get((route.pk, day))
+            if day not in feed_days:
+                if schedule is not None and schedule.is_active:
+                    schedule.is_active, schedule.updated_at = False, now
+                    updated_schedules.append(schedule)
+                continue
+            departure, arrival = feed_days[day]
+            if schedule is None:
+                new_schedules.append(RouteSchedule(
+                    route=route, day_of_week=day, departure_time=departure, arrival_time=arrival,
+                ))
+            elif (schedule.departure_time, schedule.arrival_time, schedule.is_active) != (departure, arrival, True):
+                schedule.departure_time, schedule.arrival_time = departure, arrival
+                schedule.is_active, schedule.updated_at = True, now
+                updated_schedules.append(schedule)
+    RouteSchedule.objects.bulk_create(new_schedules, batch_size=500)
+    RouteSchedule.objects.bulk_update(
+        updated_schedules, ['departure_time', 'arrival_time', 'is_active', 'updated_at'], batch_size=500
+    )
+    counts['schedules_written'] = len(new_schedules) + len(updated_schedules)
+
+    if dry_run:
+        transaction.set_rollback(True)
+    else:
+        transaction.on_commit(invalidate_topology)
+        transaction.on_commit(invalidate_route_summary)
+    return counts
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def route_feed_id(route):
+    return route.gtfs_id or f'R{route.pk}'
+
+
+def stop_feed_id(stop):
+    return stop.gtfs_id or f'S{stop.pk}'
+
+
+def _seconds(value):
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def _gtfs_time(seconds):
+    return '%02d:%02d:%02d' % (seconds // 3600, seconds % 3600 // 60, seconds % 60)
+
+
+def _csv(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(columns)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def feed_files():
+    """
+    Yield (file name, CSV text) for a feed of every route with stops.
+
+    Each active RouteSchedule becomes one trip on a single-weekday service
+    (D0 = Monday ... D6 = Sunday). Stop times keep the gaps between
+    Stop.arrival_time values, shifted so the first stop departs at the
+    schedule's departure time; stops without a time are left blank.
+    stops.txt lists each stop_id once, however many routes or visits
+    share it.
+    """
+    from .models import Route, RouteSchedule, Stop
+
+    routes = list(Route.objects.filter(stops__isnull=False).distinct().order_by('name'))
+    stops = {}
+    for stop in Stop.objects.filter(route__in=routes).order_by('route', 'order'):
+        stops.setdefault(stop.route_id, []).append(stop)
+    schedules = RouteSchedule.objects.filter(route__in=routes, is_active=True).order_by('route', 'day_of_week')
+
+    today = timezone.localdate()
+    yield 'agency.txt', _csv(
+        ('agency_id', 'agency_name', 'agency_url', 'agency_timezone'),
+        [(
+            'TKR',
+            getattr(settings, 'TRANSPORT_GTFS_AGENCY_NAME', 'TKR College Transport'),
+            getattr(settings, 'TRANSPORT_GTFS_AGENCY_URL', 'https://tkrcet.ac.in/'),
+            settings.TIME_ZONE,
+        )],
+    )
+    yield 'routes.txt', _csv(
+        ('route_id', 'agency_id', 'route_short_name', 'route_long_name', 'route_type'),
+        [(route_feed_id(r), 'TKR', r.bus_number or '', r.name, ROUTE_TYPE_BUS) for r in routes],
+    )
+    feed_stops = {}
+    for route in routes:
+        for stop in stops[route.pk]:
+            feed_stops.setdefault(stop_feed_id(stop), (stop.name, stop.latitude, stop.longitude))
+    yield 'stops.txt', _csv(
+        ('stop_id', 'stop_name', 'stop_lat', 'stop_lon'),
+        [(stop_id, *values) for stop_id, values in feed_stops.items()],
+    )
+    yield 'calendar.txt', _csv(
+        ('service_id',) + WEEKDAYS + ('start_date', 'end_date'),
+        [
+            (f'D{day}',) + tuple(int(i == day) for i in range(7)) + (
+                today.strftime('%Y%m%d'), (today + timedelta(days=365)).strftime('%Y%m%d'),
+            )
+            for day in range(7)
+        ],
+    )
+
+    feed_ids = {route.pk: route_feed_id(route) for route in routes}
+    trips, stop_times = [], []
+    for schedule in schedules:
+        route_stops = stops[schedule.route_id]
+        route_id = feed_ids[schedule.route_id]
+        trip_id = f'{route_id}-D{schedule.day_of_week}'
+        trips.append((route_id, f'D{schedule.day_of_week}', trip_id))
+
+        start = _seconds(schedule.departure_time)
+        first = route_stops[0].arrival_time
+        for position, stop in enumerate(route_stops):
+            if position == 0:
+                at = start
+            elif position == len(route_stops) - 1:
+                at = _seconds(schedule.arrival_time)
+                at += 24 * 3600 if at < start else 0
+            elif stop.arrival_time is not None and first is not None:
+                at = start + (_seconds(stop.arrival_time) - _seconds(first)) % (24 * 3600)
+            else:
+                at = None
+            text = _gtfs_time(at) if at is not None else ''
+            stop_times.append((trip_id, text, text, stop_feed_id(stop), position + 1))
+    yield 'trips.txt', _csv(('route_id', 'service_id', 'trip_id'), trips)
+    yield 'stop_times.txt', _csv(
+        ('trip_id', 'arrival_time', 'departure_time', 'stop_id', 'stop_sequence'), stop_times
+    )
+
+
+def export_feed(path):
+    """Write the feed as a zip archive to ``path``. Returns the file names written."""
+    names = []
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, text in feed_files():
+            archive.writestr(name, text)
+            names.append(name)
+    return names
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from transport.bundles import KEEP_BUNDLES, prune_route_bundles, write_route_bundle
+
+
+class Command(BaseCommand):
+    help = "Write the content-hashed route/stop JSON bundle into STATIC_ROOT."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep', type=int, default=KEEP_BUNDLES,
+            help='Number of most recent bundles to keep on disk'
+        )
+
+    def handle(self, *args, **options):
+        name = write_route_bundle()
+        removed = prune_route_bundles(keep=options['keep'])
+        self.stdout.write(f"Route bundle: {settings.STATIC_URL}{name}")
+        if removed or options['verbosity'] > 1:
+            self.stdout.write(f"{removed} old bundle file(s) removed.")
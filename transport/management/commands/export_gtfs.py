@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from transport.gtfs import export_feed
+
+
+class Command(BaseCommand):
+    help = "Export routes, stops and schedules as a GTFS static feed (.zip)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Output .zip file')
+
+    def handle(self, *args, **options):
+        names = export_feed(options['path'])
+        self.stdout.write(f"Wrote {options['path']}: {', '.join(names)}")
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from transport.gtfs import GTFSError, import_feed
+
+
+class Command(BaseCommand):
+    help = "Import routes, stops and schedules from a GTFS static feed (zip or directory)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='GTFS .zip file or directory of .txt files')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Validate and count changes, then roll back'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            counts = import_feed(options['path'], dry_run=options['dry_run'])
+        except GTFSError as exc:
+            for error in exc.errors:
+                self.stderr.write(error)
+            raise CommandError(f"Feed rejected: {len(exc.errors)} problem(s), nothing imported.")
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        for key, value in counts.items():
+            self.stdout.write(f"{key.replace('_', ' ')}: {value}")
+        verb = "Validated" if options['dry_run'] else "Imported"
+        self.stdout.write(f"{verb} in {time.monotonic() - started:.1f}s.")
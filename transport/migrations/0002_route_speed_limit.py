@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='route',
+            name='speed_limit_kmh',
+            field=models.PositiveSmallIntegerField(default=50, help_text='Speed above which driving counts as speeding (km/h)'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0002_route_speed_limit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='route',
+            name='gtfs_id',
+            field=models.CharField(blank=True, help_text='route_id in GTFS feeds (set by import; export falls back to R<pk>)', max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='stop',
+            name='gtfs_id',
+            field=models.CharField(blank=True, db_index=True, help_text='stop_id in GTFS feeds (set by import; export falls back to S<pk>)', max_length=64, null=True),
+        ),
+    ]
@@ -37,6 +37,17 @@ class Route(models.Model):
         db_index=True,
         help_text="Whether this route is currently operational"
     )
+    speed_limit_kmh = models.PositiveSmallIntegerField(
+        default=50,
+        help_text="Speed above which driving counts as speeding (km/h)"
+    )
+    gtfs_id = models.CharField(
+        max_length=64,
+        unique=True,
+        blank=True,
+        null=True,
+        help_text="route_id in GTFS feeds (set by import; export falls back to R<pk>)"
+    )
     
     created_at = models.DateTimeField(
         auto_now_add=True,
@@ -105,6 +116,13 @@ class Stop(models.Model):
     order = models.PositiveIntegerField(
         help_text="Sequence of stop in route (1, 2, 3...)"
     )
+    gtfs_id = models.CharField(
+        max_length=64,
+        blank=True,
+        null=True,
+        db_index=True,
+        help_text="stop_id in GTFS feeds (set by import; export falls back to S<pk>)"
+    )
     
     created_at = models.DateTimeField(
         auto_now_add=True,
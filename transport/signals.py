@@ -0,0 +1,44 @@
+"""
+Cache invalidation for route-derived data.
+
+Connected in TransportConfig.ready(). Senders from the users app are given
+as lazy "app_label.Model" strings so no model imports happen at startup.
+
+Invalidation waits for the transaction to commit. Dropping a cache from
+inside it would let a concurrent reader rebuild it from the pre-commit
+rows and keep that stale copy. Outside a transaction on_commit runs at once.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .stats import invalidate_route_summary
+from .topology import invalidate_topology
+
+
+ROUTE_STATS_SENDERS = ['transport.Route', 'transport.Stop', 'users.Driver', 'users.Student']
+TOPOLOGY_SENDERS = ['transport.Route', 'transport.Stop', 'transport.RouteSchedule']
+
+
+def route_stats_changed(sender, **kwargs):
+    transaction.on_commit(invalidate_route_summary)
+
+
+def topology_changed(sender, **kwargs):
+    transaction.on_commit(invalidate_topology)
+
+
+for sender in ROUTE_STATS_SENDERS:
+    for signal in (post_save, post_delete):
+        signal.connect(
+            route_stats_changed,
+            sender=sender,
+            dispatch_uid=f'route_stats_changed:{sender}:{signal is post_save}',
+        )
+
+for sender in TOPOLOGY_SENDERS:
+    for signal in (post_save, post_delete):
+        signal.connect(
+            topology_changed,
+            sender=sender,
+            dispatch_uid=f'topology_changed:{sender}:{signal is post_save}',
+        )
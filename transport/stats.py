@@ -0,0 +1,68 @@
+"""
+ROUTE STATISTICS.
+
+Per-route stop, active-driver and student counts computed in ONE query,
+shared by RouteAdmin and the routes-summary API.
+
+Each count is a correlated subquery rather than a JOIN + COUNT(DISTINCT):
+joining stops x drivers x students multiplies rows per route, while the
+subqueries each hit an indexed foreign key.
+
+The summary list is cached and dropped by transport.signals whenever a
+Route, Stop, Driver or Student changes.
+"""
+from django.core.cache import cache
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+SUMMARY_CACHE_KEY = 'transport:route_summary'
+SUMMARY_CACHE_TIMEOUT = 60 * 60
+
+
+def _count_of(model, fk_name, **filters):
+    """Correlated COUNT(*) of ``model`` rows pointing at the outer route."""
+    counted = (
+        model.objects
+        .filter(**{fk_name: OuterRef('pk')}, **filters)
+        .order_by()
+        .values(fk_name)
+        .annotate(n=Count('pk'))
+        .values('n')
+    )
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def with_route_stats(queryset=None):
+    """
+    Annotate routes with stop_count, active_driver_count and student_count.
+
+    Args:
+        queryset: Route queryset to annotate (defaults to all routes)
+    """
+    from users.models import Driver, Student
+    from .models import Route, Stop
+
+    if queryset is None:
+        queryset = Route.objects.all()
+    return queryset.annotate(
+        stop_count=_count_of(Stop, 'route'),
+        active_driver_count=_count_of(Driver, 'assigned_route', is_active=True),
+        student_count=_count_of(Student, 'active_route'),
+    )
+
+
+def route_summary():
+    """List of per-route stats dicts, cached until the next relevant change."""
+    summary = cache.get(SUMMARY_CACHE_KEY)
+    if summary is None:
+        summary = list(with_route_stats().values(
+            'id', 'name', 'bus_number', 'is_active',
+            'stop_count', 'active_driver_count', 'student_count',
+        ))
+        cache.set(SUMMARY_CACHE_KEY, summary, SUMMARY_CACHE_TIMEOUT)
+    return summary
+
+
+def invalidate_route_summary():
+    cache.delete(SUMMARY_CACHE_KEY)
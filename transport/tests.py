@@ -1,3 +1,315 @@
+import json
+import os
+import tempfile
+from datetime import datetime, time
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.utils import timezone
+
+from users.models import Driver, Student
+from .bundles import KEEP_BUNDLES, bundle_root, route_bundle_url
+from .gtfs import GTFSError, export_feed, feed_files, import_feed, read_feed
+from .models import Route, RouteSchedule, Stop
+from .stats import invalidate_route_summary, route_summary, with_route_stats
+from .timetable import get_timetable
+from .topology import get_topology, invalidate_topology
+
+
+class RouteStatsTests(TestCase):
+    """Per-route counts come from one query; the cached summary follows edits."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.route = Route.objects.create(
+            name='Route 1', bus_number='BUS001', start_location='A', end_location='B'
+        )
+        cls.empty = Route.objects.create(
+            name='Route 2', bus_number='BUS002', start_location='C', end_location='D'
+        )
+        stops = [
+            Stop.objects.create(
+                route=cls.route, name=f'Stop {i}', order=i,
+                latitude=17.40, longitude=78.40 + i * 0.01, arrival_time=time(8, i * 5),
+            )
+            for i in range(3)
+        ]
+        for i in range(2):
+            Driver.objects.create(
+                user=User.objects.create_user(f'driver{i}'), license_number=f'LIC{i:03d}',
+                assigned_route=cls.route, is_active=i == 0,
+            )
+        for i in range(4):
+            Student.objects.create(
+                user=User.objects.create_user(f'student{i}'), hall_ticket=f'HT{i:03d}',
+                active_route=cls.route, boarding_stop=stops[0],
+            )
+
+    def setUp(self):
+        invalidate_route_summary()
+
+    def test_counts_in_one_query(self):
+        with self.assertNumQueries(1):
+            counts = {
+                route.pk: (route.stop_count, route.active_driver_count, route.student_count)
+                for route in with_route_stats()
+            }
+        self.assertEqual(counts, {self.route.pk: (3, 1, 4), self.empty.pk: (0, 0, 0)})
+
+    def test_summary_follows_saves(self):
+        summary = {row['id']: row for row in route_summary()}
+        self.assertEqual(summary[self.empty.pk]['stop_count'], 0)
+        with self.assertNumQueries(0):
+            route_summary()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Stop.objects.create(
+                route=self.empty, name='Stop X', order=0,
+                latitude=17.5, longitude=78.5, arrival_time=time(9, 0),
+            )
+        summary = {row['id']: row for row in route_summary()}
+        self.assertEqual(summary[self.empty.pk]['stop_count'], 1)
+
+
+class TopologyTests(TestCase):
+    """The snapshot mirrors the tables and is replaced only after a commit."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.route = Route.objects.create(
+            name='Route 1', bus_number='BUS001', start_location='A', end_location='B'
+        )
+        for i in (2, 0, 1):
+            Stop.objects.create(
+                route=cls.route, name=f'Stop {i}', order=i,
+                latitude=17.40 + i * 0.01, longitude=78.40, arrival_time=time(8, i * 5),
+            )
+        RouteSchedule.objects.create(
+            route=cls.route, day_of_week=0, departure_time=time(8, 0), arrival_time=time(9, 0)
+        )
+
+    def setUp(self):
+        invalidate_topology()
+
+    def test_snapshot(self):
+        route = get_topology().routes[self.route.pk]
+        self.assertEqual(route.stop_names, ('Stop 0', 'Stop 1', 'Stop 2'))
+        self.assertEqual(len(route.segment_m), 2)
+        self.assertAlmostEqual(route.cumulative_m[-1], 2224, delta=2)   # 0.02 degrees of latitude
+        self.assertEqual(route.schedule, ((0, time(8, 0), time(9, 0)),))
+        self.assertEqual(route.nearest_stop(17.409, 78.40)[0], 1)
+        self.assertEqual(get_topology().stop_index[route.stop_ids[2]], (self.route.pk, 2))
+        with self.assertNumQueries(0):
+            self.assertIs(get_topology().routes[self.route.pk], route)
+
+    def test_rebuilt_after_commit_only(self):
+        before = get_topology()
+        with self.captureOnCommitCallbacks(execute=True):
+            Stop.objects.create(
+                route=self.route, name='Stop 3', order=3,
+                latitude=17.43, longitude=78.40, arrival_time=time(8, 15),
+            )
+            # still inside the transaction: readers keep the committed snapshot
+            self.assertIs(get_topology(), before)
+        self.assertEqual(get_topology().routes[self.route.pk].stop_count, 4)
+
+
+class RouteBundleTests(TestCase):
+    """Bundles are built lazily per topology version and pruned as they are written."""
+
+    def setUp(self):
+        static_root = tempfile.TemporaryDirectory()
+        self.addCleanup(static_root.cleanup)
+        override = self.settings(STATIC_ROOT=static_root.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.route = Route.objects.create(
+            name='Route 1', bus_number='BUS001', start_location='A', end_location='B'
+        )
+        self.add_stop(0, 'Gate <b>')
+        invalidate_topology()
+
+    def add_stop(self, order, name):
+        Stop.objects.create(
+            route=self.route, name=name, order=order,
+            latitude=17.40 + order * 0.01, longitude=78.40, arrival_time=time(8, order),
+        )
+
+    def test_lazy_build_and_prune(self):
+        url = route_bundle_url()
+        name = url.rsplit('/', 1)[1]
+        path = bundle_root() / name
+        self.assertTrue(path.with_name(name + '.gz').exists())
+        self.assertEqual(json.loads(path.read_bytes())['routes'][0]['stops'][0][:2], ['Gate <b>', '08:00'])
+        self.assertEqual(route_bundle_url(), url)
+
+        for order in range(1, KEEP_BUNDLES + 2):
+            self.add_stop(order, f'Stop {order}')
+            invalidate_topology()
+            self.assertNotEqual(route_bundle_url(), url)
+        self.assertEqual(len(list(bundle_root().glob('routes.*.json'))), KEEP_BUNDLES)
+        self.assertFalse(path.exists())
+
+
+class TimetableTests(TestCase):
+    """Interval lookups, including trips around the Sunday/Monday boundary."""
+
+    @classmethod
+    def setUpTestData(cls):
+        def route(n, day, departure, arrival):
+            route = Route.objects.create(
+                name=f'Route {n}', bus_number=f'BUS00{n}', start_location='A', end_location='B'
+            )
+            RouteSchedule.objects.create(
+                route=route, day_of_week=day, departure_time=departure, arrival_time=arrival
+            )
+            return route
+
+        cls.morning = route(1, 2, time(7, 30), time(9, 0))       # Wednesday
+        cls.late_sunday = route(2, 6, time(23, 0), time(1, 0))   # arrives Monday
+        cls.early_monday = route(3, 0, time(0, 10), time(1, 0))
+
+    def setUp(self):
+        invalidate_topology()
+
+    @staticmethod
+    def at(day, hour, minute=0):
+        return timezone.make_aware(datetime(2026, 10, day, hour, minute))   # 2026-10-19 is a Monday
+
+    def test_active_routes(self):
+        timetable = get_timetable()
+        self.assertEqual(timetable.active_routes(self.at(21, 8)), [self.morning.pk])
+        self.assertEqual(timetable.active_routes(self.at(21, 9, 30)), [])
+        self.assertEqual(timetable.active_routes(self.at(21, 9, 20), grace=30 * 60), [self.morning.pk])
+        self.assertEqual(
+            sorted(timetable.scheduled_routes()),
+            [self.morning.pk, self.late_sunday.pk, self.early_monday.pk],
+        )
+
+    def test_sunday_night_wraps_both_ways(self):
+        timetable = get_timetable()
+        self.assertEqual(
+            timetable.active_routes(self.at(26, 0, 30)), [self.late_sunday.pk, self.early_monday.pk]
+        )
+        # Sunday 23:50: the Monday 00:10 departure is inside a 30 minute grace
+        self.assertEqual(
+            timetable.active_routes(self.at(25, 23, 50), grace=30 * 60),
+            [self.late_sunday.pk, self.early_monday.pk],
+        )
+        self.assertEqual(timetable.active_routes(self.at(25, 23, 50)), [self.late_sunday.pk])
+
+    def test_departures(self):
+        timetable = get_timetable()
+        self.assertEqual(timetable.next_departure(self.morning.pk, self.at(21, 8)), self.at(28, 7, 30))
+        self.assertEqual(timetable.next_departure(self.early_monday.pk, self.at(25, 12)), self.at(26, 0, 10))
+        self.assertEqual(
+            timetable.departures_within(90, self.at(25, 22, 45)),
+            [(self.at(25, 23), self.late_sunday.pk), (self.at(26, 0, 10), self.early_monday.pk)],
+        )
+
+
+FEED = {
+    'routes.txt': """route_id,route_short_name,route_long_name
+R1,BUS101,Loop Line
+R2,BUS102,Cross Line
+""",
+    'stops.txt': """stop_id,stop_name,stop_lat,stop_lon
+DEPOT,Depot,17.4,78.4
+MKT,Market,17.41,78.41
+COL,College,17.42,78.42
+""",
+    'calendar.txt': """service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday
+WK,1,1,1,1,1,0,0
+""",
+    'trips.txt': """route_id,service_id,trip_id
+R1,WK,T1
+R1,WK,T1-late
+R2,WK,T2
+""",
+    # T1 loops back to the depot; T1-late is a second daily trip
+    'stop_times.txt': """trip_id,arrival_time,departure_time,stop_id,stop_sequence
+T1,07:30:00,07:30:00,DEPOT,1
+T1,07:40:00,07:40:00,MKT,2
+T1,07:50:00,07:50:00,COL,3
+T1,08:05:00,08:05:00,DEPOT,4
+T1-late,09:30:00,09:30:00,DEPOT,1
+T1-late,09:40:00,09:40:00,MKT,2
+T2,08:00:00,08:00:00,MKT,1
+T2,08:20:00,08:20:00,COL,2
+""",
+}
+
+
+class GTFSTests(TestCase):
+    """Feeds are validated as a whole, import idempotently and round-trip."""
+
+    def write_feed(self, **overrides):
+        directory = tempfile.mkdtemp()
+        for name, text in dict(FEED, **overrides).items():
+            if text is not None:
+                with open(os.path.join(directory, name), 'w') as handle:
+                    handle.write(text)
+        return directory
+
+    def test_validation_collects_every_problem(self):
+        with self.assertRaises(GTFSError) as caught:
+            read_feed(self.write_feed(**{'calendar.txt': None}))
+        self.assertEqual(caught.exception.errors, ['calendar.txt: file missing'])
+
+        with self.assertRaises(GTFSError) as caught:
+            read_feed(self.write_feed(**{
+                'stops.txt': FEED['stops.txt'] + 'FAR,Far,91,78\n',
+                'trips.txt': FEED['trips.txt'] + 'R9,WK,T9\n',
+                'stop_times.txt': FEED['stop_times.txt'] + 'T1,25:61:00,,COL,5\n',
+            }))
+        self.assertEqual(len(caught.exception.errors), 3)
+        self.assertIn("stops.txt:5: bad coordinates for stop 'FAR'", caught.exception.errors)
+
+    def test_import_is_idempotent_with_loops(self):
+        counts = import_feed(self.write_feed())
+        self.assertEqual(
+            counts,
+            {'routes_created': 2, 'routes_updated': 0, 'stops_created': 6, 'stops_updated': 0,
+             'stops_deleted': 0, 'schedules_written': 10, 'skipped_trips': 5},
+        )
+        loop = Route.objects.get(gtfs_id='R1')
+        self.assertEqual(
+            list(loop.stops.order_by('order').values_list('gtfs_id', flat=True)), ['DEPOT', 'MKT', 'COL', 'DEPOT']
+        )
+        self.assertEqual((loop.start_location, loop.end_location), ('Depot', 'Depot'))
+        stop_ids = set(Stop.objects.values_list('pk', flat=True))
+
+        counts = import_feed(self.write_feed())
+        self.assertEqual(
+            [counts[key] for key in ('stops_created', 'stops_updated', 'stops_deleted', 'schedules_written')],
+            [0, 0, 0, 0],
+        )
+        self.assertEqual(set(Stop.objects.values_list('pk', flat=True)), stop_ids)
+
+    def test_dry_run_rolls_back(self):
+        counts = import_feed(self.write_feed(), dry_run=True)
+        self.assertEqual(counts['routes_created'], 2)
+        self.assertFalse(Route.objects.exists())
+        self.assertFalse(RouteSchedule.objects.exists())
+
+    def test_export_round_trip(self):
+        original = read_feed(self.write_feed())['routes']
+        import_feed(self.write_feed())
+
+        files = dict(feed_files())
+        # shared by both routes and visited twice by the loop, yet listed once
+        self.assertEqual(sorted(files['stops.txt'].splitlines()[1:]), [
+            'COL,College,17.42,78.42', 'DEPOT,Depot,17.4,78.4', 'MKT,Market,17.41,78.41',
+        ])
+        path = os.path.join(tempfile.mkdtemp(), 'feed.zip')
+        export_feed(path)
+        exported = read_feed(path)
+        self.assertEqual(exported['routes'], original)
+        self.assertEqual(exported['skipped_trips'], 0)
 
-# Create your tests here.
+        counts = import_feed(path)
+        self.assertEqual(
+            [counts[key] for key in ('routes_updated', 'stops_created', 'stops_updated', 'schedules_written')],
+            [0, 0, 0, 0],
+        )
@@ -0,0 +1,147 @@
+"""
+WEEKLY TIMETABLE INDEX over RouteSchedule.
+
+Answers, without queries:
+
+    timetable = get_timetable()
+    timetable.active_routes(at)            # route ids scheduled to be running
+    timetable.next_departure(route_id)     # aware datetime or None
+    timetable.departures_within(30)        # [(datetime, route_id), ...]
+
+Design:
+- Every active schedule becomes an interval in seconds-of-week
+  (Monday 00:00 = 0). Trips that arrive after midnight end past the day
+  boundary. Around Sunday night T is also queried as T + 1 week (a
+  Sunday trip still running on Monday) and T - 1 week (an early Monday
+  trip inside the grace window on Sunday).
+- Intervals are sorted by start. "Active at T" bisects to the starts in
+  [T - longest trip, T] and checks only those ends; departures are one
+  bisect into the sorted starts.
+- Built from the topology snapshot and rebuilt when its version changes,
+  so schedule edits (transport.signals) invalidate it too.
+- Times are interpreted in the project TIME_ZONE.
+"""
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .topology import get_topology
+
+
+DAY_SECONDS = 24 * 60 * 60
+WEEK_SECONDS = 7 * DAY_SECONDS
+
+
+def _seconds_of_day(value):
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def _seconds_of_week(moment):
+    local = timezone.localtime(moment)
+    return local.weekday() * DAY_SECONDS + _seconds_of_day(local)
+
+
+class WeeklyTimetable:
+    """Immutable interval index built from a Topology."""
+
+    def __init__(self, topology):
+        self.version = topology.version
+
+        intervals = []
+        for route in topology.routes.values():
+            if not route.is_active:
+                continue
+            for day, departure, arrival in route.schedule:
+                start = day * DAY_SECONDS + _seconds_of_day(departure)
+                end = day * DAY_SECONDS + _seconds_of_day(arrival)
+                if end <= start:
+                    end += DAY_SECONDS   # arrives after midnight
+                intervals.append((start, end, route.id))
+        intervals.sort()
+
+        self._starts = [start for start, _, _ in intervals]
+        self._ends = [end for _, end, _ in intervals]
+        self._route_ids = [route_id for _, _, route_id in intervals]
+        self._longest = max((end - start for start, end, _ in intervals), default=0)
+
+        by_route = {}
+        for start, _, route_id in intervals:
+            by_route.setdefault(route_id, []).append(start)
+        self._route_starts = by_route
+
+    def has_schedule(self, route_id):
+        return route_id in self._route_starts
+
+    def scheduled_routes(self):
+        """Ids of routes that have at least one active schedule."""
+        return list(self._route_starts)
+
+    def active_routes(self, at=None, grace=0):
+        """
+        Route ids scheduled to be running at ``at`` (default: now).
+
+        ``grace`` seconds widen every trip on both sides.
+        """
+        t = _seconds_of_week(at or timezone.now())
+        active = set()
+        for point in (t - WEEK_SECONDS, t, t + WEEK_SECONDS):
+            lo = bisect_left(self._starts, point - grace - self._longest)
+            hi = bisect_right(self._starts, point + grace)
+            for i in range(lo, hi):
+                if self._ends[i] + grace > point:
+                    active.add(self._route_ids[i])
+        return sorted(active)
+
+    def is_running(self, route_id, at=None, grace=0):
+        return route_id in self.active_routes(at, grace)
+
+    def next_departure(self, route_id, after=None):
+        """Next scheduled departure of the route strictly after ``after``."""
+        starts = self._route_starts.get(route_id)
+        if not starts:
+            return None
+        after = after or timezone.now()
+        t = _seconds_of_week(after)
+        i = bisect_right(starts, t)
+        start = starts[i] if i < len(starts) else starts[0] + WEEK_SECONDS
+        return self._at(after, t, start)
+
+    def departures_within(self, minutes, at=None):
+        """[(departure datetime, route_id)] in the next ``minutes``, earliest first."""
+        at = at or timezone.now()
+        t = _seconds_of_week(at)
+        window_end = t + minutes * 60
+
+        found = []
+        for offset in (0, WEEK_SECONDS):
+            lo = bisect_right(self._starts, t - offset)
+            hi = bisect_right(self._starts, window_end - offset)
+            for i in range(lo, hi):
+                found.append((self._at(at, t, self._starts[i] + offset), self._route_ids[i]))
+        return found
+
+    @staticmethod
+    def _at(moment, moment_seconds, week_seconds):
+        base = timezone.localtime(moment).replace(microsecond=0)
+        return base + timedelta(seconds=week_seconds - moment_seconds)
+
+
+_current = None
+_build_lock = threading.Lock()
+
+
+def get_timetable():
+    """Timetable for the current topology, rebuilt after schedule changes."""
+    global _current
+
+    topology = get_topology()
+    timetable = _current
+    if timetable is not None and timetable.version == topology.version:
+        return timetable
+
+    with _build_lock:
+        if _current is None or _current.version != topology.version:
+            _current = WeeklyTimetable(topology)
+        return _current
@@ -0,0 +1,231 @@
+"""
+PRECOMPILED ROUTE TOPOLOGY.
+
+Routes, stops and schedules change a few times a term but are read on
+almost every request. Instead of querying them each time, consumers call
+get_topology() and read an immutable snapshot:
+
+    topology = get_topology()
+    route = topology.routes[route_id]
+    route.stop_lats[i], route.cumulative_m[-1], route.schedule
+
+Design:
+- Built in one pass: one query for routes plus one prefetch each for stops
+  and active schedules.
+- Immutable (frozen dataclasses, tuples, read-only mappings), so readers on
+  any thread never need a lock.
+- Versioned. Saving or deleting a Route, Stop or RouteSchedule bumps the
+  version (transport.signals). The next reader rebuilds the snapshot and
+  swaps it in with a single reference assignment.
+- The version is also written to the Django cache, so with a shared cache
+  backend other worker processes notice within CHECK_INTERVAL seconds.
+- Async views call aget_topology(): the current snapshot is returned on
+  the event loop, only the version check and a rebuild run in a thread.
+"""
+import math
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+
+VERSION_CACHE_KEY = 'transport:topology_version'
+CHECK_INTERVAL = 2.0   # seconds between shared-version checks
+
+EARTH_RADIUS_M = 6371000
+
+
+def _haversine_m(lat1, lon1, lat2, lon2):
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    delta_lat = math.radians(lat2 - lat1)
+    delta_lon = math.radians(lon2 - lon1)
+    a = (
+        math.sin(delta_lat / 2) ** 2 +
+        math.cos(lat1_rad) * math.cos(lat2_rad) *
+        math.sin(delta_lon / 2) ** 2
+    )
+    return EARTH_RADIUS_M * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+@dataclass(frozen=True)
+class RouteTopology:
+    """One route with its stops stored as parallel arrays (ordered by Stop.order)."""
+    id: int
+    name: str
+    bus_number: str
+    start_location: str
+    end_location: str
+    is_active: bool
+    speed_limit_kmh: int
+    gtfs_id: str             # route_id in GTFS feeds (transport.gtfs)
+    stop_ids: tuple
+    stop_names: tuple
+    stop_gtfs_ids: tuple
+    stop_orders: tuple
+    stop_lats: tuple
+    stop_lons: tuple
+    stop_arrivals: tuple     # datetime.time or None
+    segment_m: tuple         # distance from stop i to stop i+1
+    cumulative_m: tuple      # distance from the first stop to stop i
+    schedule: tuple          # (day_of_week, departure_time, arrival_time), active only
+
+    @property
+    def stop_count(self):
+        return len(self.stop_ids)
+
+    def nearest_stop(self, lat, lon):
+        """(index, meters) of the closest stop, or (None, None) without stops."""
+        best, best_m = None, None
+        for i in range(len(self.stop_ids)):
+            meters = _haversine_m(lat, lon, self.stop_lats[i], self.stop_lons[i])
+            if best_m is None or meters < best_m:
+                best, best_m = i, meters
+        return best, best_m
+
+    def as_dict(self):
+        """JSON-friendly representation used by pages and APIs."""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'bus_number': self.bus_number,
+            'start_location': self.start_location,
+            'end_location': self.end_location,
+            'stops': [
+                {
+                    'id': self.stop_ids[i],
+                    'name': self.stop_names[i],
+                    'order': self.stop_orders[i],
+                    'lat': self.stop_lats[i],
+                    'lon': self.stop_lons[i],
+                    'arrival': self.stop_arrivals[i].strftime('%H:%M') if self.stop_arrivals[i] else None,
+                }
+                for i in range(len(self.stop_ids))
+            ],
+        }
+
+
+@dataclass(frozen=True)
+class Topology:
+    """Snapshot of every route. ``active`` lists active routes ordered by name."""
+    version: int
+    routes: MappingProxyType
+    active: tuple
+    stop_index: MappingProxyType   # stop id -> (route id, position in route arrays)
+
+
+def build_topology(version=0):
+    """Load all routes, stops and active schedules into a new Topology."""
+    from django.db.models import Prefetch
+    from .gtfs import route_feed_id, stop_feed_id
+    from .models import Route, RouteSchedule, Stop
+
+    queryset = Route.objects.order_by('name').prefetch_related(
+        Prefetch('stops', queryset=Stop.objects.order_by('order')),
+        Prefetch(
+            'schedules',
+            queryset=RouteSchedule.objects.filter(is_active=True).order_by('day_of_week', 'departure_time'),
+        ),
+    )
+
+    routes, stop_index = {}, {}
+    for route in queryset:
+        stops = list(route.stops.all())
+        lats = tuple(stop.latitude for stop in stops)
+        lons = tuple(stop.longitude for stop in stops)
+        segments = tuple(
+            _haversine_m(lats[i], lons[i], lats[i + 1], lons[i + 1])
+            for i in range(len(stops) - 1)
+        )
+        cumulative = [0.0]
+        for meters in segments:
+            cumulative.append(cumulative[-1] + meters)
+
+        routes[route.id] = RouteTopology(
+            id=route.id,
+            name=route.name,
+            bus_number=route.bus_number,
+            start_location=route.start_location,
+            end_location=route.end_location,
+            is_active=route.is_active,
+            speed_limit_kmh=route.speed_limit_kmh,
+            gtfs_id=route_feed_id(route),
+            stop_ids=tuple(stop.id for stop in stops),
+            stop_names=tuple(stop.name for stop in stops),
+            stop_gtfs_ids=tuple(stop_feed_id(stop) for stop in stops),
+            stop_orders=tuple(stop.order for stop in stops),
+            stop_lats=lats,
+            stop_lons=lons,
+            stop_arrivals=tuple(stop.arrival_time for stop in stops),
+            segment_m=segments,
+            cumulative_m=tuple(cumulative) if stops else (),
+            schedule=tuple(
+                (s.day_of_week, s.departure_time, s.arrival_time) for s in route.schedules.all()
+            ),
+        )
+        for position, stop in enumerate(stops):
+            stop_index[stop.id] = (route.id, position)
+
+    return Topology(
+        version=version,
+        routes=MappingProxyType(routes),
+        active=tuple(r for r in routes.values() if r.is_active),
+        stop_index=MappingProxyType(stop_index),
+    )
+
+
+_current = None
+_local_version = 0
+_shared_version = None
+_last_check = 0.0
+_build_lock = threading.Lock()
+
+
+def get_topology():
+    """Current snapshot, rebuilding it first if a change was signalled."""
+    global _current, _shared_version, _last_check
+
+    now = time.monotonic()
+    if now - _last_check >= CHECK_INTERVAL:
+        _last_check = now
+        shared = cache.get(VERSION_CACHE_KEY)
+        if shared != _shared_version:
+            _shared_version = shared
+            _bump_local()
+
+    snapshot = _current
+    if snapshot is not None and snapshot.version == _local_version:
+        return snapshot
+
+    with _build_lock:
+        if _current is None or _current.version != _local_version:
+            _current = build_topology(version=_local_version)
+        return _current
+
+
+async def aget_topology():
+    """get_topology() for async code; only checks and rebuilds leave the loop."""
+    snapshot = _current
+    if (
+        snapshot is not None and snapshot.version == _local_version
+        and time.monotonic() - _last_check < CHECK_INTERVAL
+    ):
+        return snapshot
+    return await sync_to_async(get_topology, thread_sensitive=False)()
+
+
+def _bump_local():
+    global _local_version
+    _local_version += 1
+
+
+def invalidate_topology():
+    """Mark the snapshot stale here and, via the cache, in other processes."""
+    global _shared_version
+
+    _bump_local()
+    _shared_version = time.time_ns()
+    cache.set(VERSION_CACHE_KEY, _shared_version, None)
@@ -1,3 +1,37 @@
-from django.shortcuts import render
+from pathlib import Path
 
-# Create your views here.
+from django.http import FileResponse, Http404
+from django.utils.cache import patch_vary_headers
+
+from .bundles import bundle_root
+
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=315360000, immutable'
+
+
+def route_bundle_file(request, name):
+    """
+    Serve a route bundle WhiteNoise has not indexed yet.
+
+    WhiteNoise only scans STATIC_ROOT at startup, so a bundle built after a
+    route change is served from here until the next restart. The name is
+    content-hashed, so the same far-future headers apply.
+    """
+    path = bundle_root() / Path(name).name
+    accept = request.headers.get('Accept-Encoding', '')
+
+    encoding = None
+    for suffix, coding in (('.br', 'br'), ('.gz', 'gzip')):
+        candidate = path.with_name(path.name + suffix)
+        if coding in accept and candidate.is_file():
+            path, encoding = candidate, coding
+            break
+    if encoding is None and not path.is_file():
+        raise Http404('No such bundle')
+
+    response = FileResponse(path.open('rb'), content_type='application/json', filename=Path(name).name)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
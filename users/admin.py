@@ -1,8 +1,15 @@
 from django.contrib import admin
+from django.db import transaction
 from django.utils.html import format_html
+from transport.stats import invalidate_route_summary
 from .models import Student, Driver, UserRole
 
 
+def _bulk_changed():
+    """queryset.update() sends no signals: drop the cached route summary here."""
+    transaction.on_commit(invalidate_route_summary)
+
+
 @admin.register(Student)
 class StudentAdmin(admin.ModelAdmin):
     list_display = ['hall_ticket', 'get_user_name', 'active_route', 'is_verified', 'created_at']
@@ -17,7 +24,7 @@ class StudentAdmin(admin.ModelAdmin):
             'description': 'Connected Django user account'
         }),
         ('Student Info', {
-            'fields': ('hall_ticket', 'phone', 'active_route'),
+            'fields': ('hall_ticket', 'phone', 'active_route', 'boarding_stop'),
         }),
         ('Status', {
             'fields': ('is_verified',),
@@ -35,19 +42,21 @@ class StudentAdmin(admin.ModelAdmin):
     def verify_students(self, request, queryset):
         """Mark selected students as verified."""
         updated = queryset.update(is_verified=True)
+        _bulk_changed()
         self.message_user(request, f'{updated} student(s) marked as verified.')
     verify_students.short_description = 'Verify selected students'
     
     def unverify_students(self, request, queryset):
         """Mark selected students as unverified."""
         updated = queryset.update(is_verified=False)
+        _bulk_changed()
         self.message_user(request, f'{updated} student(s) marked as unverified.')
     unverify_students.short_description = 'Unverify selected students'
 
 
 @admin.register(Driver)
 class DriverAdmin(admin.ModelAdmin):
-    list_display = ['license_number', 'get_user_name', 'assigned_route', 'is_active', 'is_verified', 'created_at']
+    list_display = ['license_number', 'get_user_name', 'assigned_route', 'get_recent_score', 'is_active', 'is_verified', 'created_at']
     list_filter = ['is_active', 'is_verified', 'assigned_route', 'created_at']
     search_fields = ['license_number', 'user__username', 'user__first_name', 'user__last_name']
     readonly_fields = ['created_at', 'updated_at']
@@ -76,27 +85,47 @@ class DriverAdmin(admin.ModelAdmin):
         return obj.user.get_full_name() or obj.user.username
     get_user_name.short_description = 'Name'
     
+    def get_queryset(self, request):
+        # 30-day average from the stored scorecards (see tracking.scorecards)
+        from datetime import timedelta
+        from django.db.models import Avg, Q
+        from django.utils import timezone
+
+        since = timezone.localdate() - timedelta(days=30)
+        return super().get_queryset(request).annotate(
+            recent_score=Avg('scorecards__score', filter=Q(scorecards__service_date__gte=since))
+        )
+    
+    def get_recent_score(self, obj):
+        return round(obj.recent_score) if obj.recent_score is not None else '-'
+    get_recent_score.short_description = 'Score (30d)'
+    get_recent_score.admin_order_field = 'recent_score'
+    
     def activate_drivers(self, request, queryset):
         """Activate selected drivers."""
         updated = queryset.update(is_active=True)
+        _bulk_changed()
         self.message_user(request, f'{updated} driver(s) activated.')
     activate_drivers.short_description = 'Activate selected drivers'
     
     def deactivate_drivers(self, request, queryset):
         """Deactivate selected drivers."""
         updated = queryset.update(is_active=False)
+        _bulk_changed()
         self.message_user(request, f'{updated} driver(s) deactivated.')
     deactivate_drivers.short_description = 'Deactivate selected drivers'
     
     def verify_drivers(self, request, queryset):
         """Verify selected drivers."""
         updated = queryset.update(is_verified=True)
+        _bulk_changed()
         self.message_user(request, f'{updated} driver(s) verified.')
     verify_drivers.short_description = 'Verify selected drivers'
     
     def unverify_drivers(self, request, queryset):
         """Unverify selected drivers."""
         updated = queryset.update(is_verified=False)
+        _bulk_changed()
         self.message_user(request, f'{updated} driver(s) unverified.')
     unverify_drivers.short_description = 'Unverify selected drivers'
 
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0002_route_speed_limit'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='boarding_stop',
+            field=models.ForeignKey(blank=True, help_text='Stop where the student boards (used for ETAs)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='boarding_students', to='transport.stop'),
+        ),
+    ]
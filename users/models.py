@@ -37,6 +37,14 @@ class Student(models.Model):
         related_name='students',
         help_text="Currently assigned route"
     )
+    boarding_stop = models.ForeignKey(
+        'transport.Stop',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='boarding_students',
+        help_text="Stop where the student boards (used for ETAs)"
+    )
     is_verified = models.BooleanField(
         default=False,
         db_index=True,
@@ -1,3 +1,30 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from transport.models import Route
+from transport.stats import invalidate_route_summary, route_summary
+from .models import Driver
+
+
+class DriverAdminActionTests(TestCase):
+    """Bulk admin actions bypass signals but still refresh the route summary."""
+
+    def test_deactivate_drivers(self):
+        route = Route.objects.create(
+            name='Route 1', bus_number='BUS001', start_location='A', end_location='B'
+        )
+        driver = Driver.objects.create(
+            user=User.objects.create_user('driver1'), license_number='LIC001', assigned_route=route
+        )
+        invalidate_route_summary()
+        self.assertEqual(route_summary()[0]['active_driver_count'], 1)
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('admin:users_driver_changelist'),
+                {'action': 'deactivate_drivers', '_selected_action': [driver.pk]},
+            )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(route_summary()[0]['active_driver_count'], 0)